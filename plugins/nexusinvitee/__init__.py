@@ -10,12 +10,13 @@ import threading
 from typing import Any, List, Dict, Tuple, Optional
 from datetime import datetime, timedelta
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
-from urllib.parse import urljoin
-from bs4 import BeautifulSoup
+from urllib.parse import urlparse, urlencode
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from apscheduler.triggers.interval import IntervalTrigger
 
 from app.core.config import settings
 from app.plugins import _PluginBase
@@ -26,8 +27,17 @@ from app.db.site_oper import SiteOper
 from app.helper.sites import SitesHelper
 
 from plugins.nexusinvitee.data import DataManager
-from plugins.nexusinvitee.utils import NotificationHelper, SiteHelper
+from plugins.nexusinvitee.utils import NotificationHelper, SiteHelper, IndexerSnapshot
 from plugins.nexusinvitee.module_loader import ModuleLoader
+from plugins.nexusinvitee.incremental import PageCache, diff_invitees
+from plugins.nexusinvitee.session_pool import SessionPool
+from plugins.nexusinvitee.site_health import SiteHealthTracker
+from plugins.nexusinvitee.async_crawl import AsyncCrawler
+from plugins.nexusinvitee.identity import IdentityCache
+from plugins.nexusinvitee.staleness import StalenessScheduler
+from plugins.nexusinvitee.metrics import MetricsStore, RequestRecorder, stage_label
+from plugins.nexusinvitee.models import (SiteSummary, extract_invitees, extract_invite_status, normalize_invitees,
+                                         query_invitees, render_invitees, INVITEE_FILTERS, INVITEE_SORT_KEYS)
 
 class Prescription():
     def __init__(self):
@@ -318,23 +328,6 @@ class Prescription():
             ]
         }
 
-def get_nested_value(data_dict: dict, key_path: List[str], default: Any = None) -> Any:
-    """
-    递归获取嵌套字典中的值
-    :param data_dict: 要查询的字典
-    :param key_path: 键路径列表
-    :param default: 默认返回值
-    :return: 找到的值或默认值
-    """
-    if not data_dict or not isinstance(data_dict, dict):
-        return default
-    
-    if len(key_path) == 1:
-        return data_dict.get(key_path[0], default)
-    
-    next_dict = data_dict.get(key_path[0], {})
-    return get_nested_value(next_dict, key_path[1:], default)
-
 
 class nexusinvitee(_PluginBase):
     # 插件名称
@@ -359,9 +352,15 @@ class nexusinvitee(_PluginBase):
     # 私有属性
     _enabled = False
     _notify = False
+    _incremental = True
+    _async_crawl = False  # 使用共享事件循环并发抓取翻页
     _cron = "0 9 * * *"  # 默认每天早上9点检查一次
+    _smart_schedule = False  # 按站点过期时间分批刷新，代替统一的执行周期
+    _refresh_ttl = 6  # 按需刷新的基础有效期（小时）
     _onlyonce = False
     _nexus_sites = []  # 支持多选的站点列表
+    _max_workers = 4  # 并发刷新的最大站点数，同一主机始终串行
+    _page_invitee_limit = 100  # 详情页每个站点渲染的后宫成员数，其余通过 /invitees 接口分页查看
     
     # 站点助手
     sites: SitesHelper = None
@@ -374,7 +373,20 @@ class nexusinvitee(_PluginBase):
     notify_helper: NotificationHelper = None
     
     # 站点处理器列表
-    _site_handlers = []
+    _handler_registry = None
+
+    # 按站点主机复用的HTTP连接池
+    _session_pool: Optional[SessionPool] = None
+    # 站点健康跟踪（自适应超时和熔断），保存配置重建连接池时保留
+    _health_tracker: Optional[SiteHealthTracker] = None
+    # 异步抓取的共享事件循环，开启异步抓取时创建
+    _async_crawler: Optional[AsyncCrawler] = None
+    # 站点身份缓存（用户ID和Cookie指纹）
+    _identity_cache: Optional[IdentityCache] = None
+    # 按站点的刷新调度
+    _staleness: Optional[StalenessScheduler] = None
+    # 最近的刷新指标（按站点、按请求阶段的耗时和流量）
+    _metrics_store: Optional[MetricsStore] = None
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
@@ -404,23 +416,39 @@ class nexusinvitee(_PluginBase):
         
         # 初始化数据管理器（仅保留数据存储，移除配置存储）
         self.data_manager = DataManager(data_path)
+        self._identity_cache = IdentityCache(self.data_manager.get_identities())
+        self._metrics_store = MetricsStore(self.data_manager.get_metrics())
         
         # 初始化通知助手
         self.notify_helper = NotificationHelper(self)
         
-        # 加载站点处理器
-        self._site_handlers = ModuleLoader.load_site_handlers()
-        logger.info(f"加载了 {len(self._site_handlers)} 个站点处理器")
+        # 构建站点处理器注册表，之后的刷新直接复用，不再重复导入
+        self._handler_registry = ModuleLoader.get_registry(rebuild=True)
+        try:
+            self._handler_registry.warm([site.get("url", "") for site in self._get_indexer_snapshot().sites])
+        except Exception as e:
+            logger.warning(f"预先匹配站点处理器失败: {str(e)}")
+        logger.info(f"加载了 {len(self._handler_registry)} 个站点处理器")
 
         # 停止现有服务
         self.stop_service()
 
+        # 连接池在插件运行期间跨刷新保留，翻页并发的连接也可复用
+        if self._health_tracker is None:
+            self._health_tracker = SiteHealthTracker()
+        self._session_pool = SessionPool(pool_maxsize=4, tracker=self._health_tracker)
+
         # 处理传入的配置参数
         if config:
             self._enabled = config.get("enabled", False)
             self._notify = config.get("notify", False)
+            self._incremental = config.get("incremental", True)
+            self._async_crawl = config.get("async_crawl", False)
             self._cron = config.get("cron", "0 9 * * *")
+            self._smart_schedule = config.get("smart_schedule", False)
+            self._refresh_ttl = self._parse_refresh_ttl(config.get("refresh_ttl"))
             self._onlyonce = config.get("onlyonce", False)
+            self._max_workers = self._parse_max_workers(config.get("max_workers"))
             
             # 处理站点ID
             self._nexus_sites = []
@@ -437,6 +465,15 @@ class nexusinvitee(_PluginBase):
             # 保存配置
             self.__update_config()
         
+        # 刷新调度状态，手动和定时刷新的结果同样会更新各站点的下次刷新时间
+        self._staleness = StalenessScheduler(self.data_manager.get_schedule(), base_ttl=self._refresh_ttl * 3600)
+
+        # 异步抓取使用共享的事件循环，跨刷新保留
+        if self._async_crawl:
+            self._async_crawler = AsyncCrawler()
+            if not self._async_crawler.available:
+                logger.warning("未安装httpx，异步抓取将以线程池方式执行同步处理器")
+
         # 如果启用了插件
         if self._enabled:
             # 检查是否配置了站点
@@ -489,17 +526,38 @@ class nexusinvitee(_PluginBase):
             
             # 2. 重新导入核心模块
             logger.debug("重新导入核心模块...")
+            importlib.import_module('plugins.nexusinvitee.models')
             importlib.import_module('plugins.nexusinvitee.data')
             importlib.import_module('plugins.nexusinvitee.utils')
             importlib.import_module('plugins.nexusinvitee.module_loader')
+            importlib.import_module('plugins.nexusinvitee.incremental')
+            importlib.import_module('plugins.nexusinvitee.site_health')
+            importlib.import_module('plugins.nexusinvitee.session_pool')
+            importlib.import_module('plugins.nexusinvitee.async_crawl')
+            importlib.import_module('plugins.nexusinvitee.identity')
+            importlib.import_module('plugins.nexusinvitee.staleness')
+            importlib.import_module('plugins.nexusinvitee.metrics')
             
             # 3. 更新全局引用以确保使用的是最新版本
             logger.debug("更新全局模块引用...")
-            global DataManager, NotificationHelper, ModuleLoader
+            global DataManager, NotificationHelper, IndexerSnapshot, ModuleLoader, PageCache, diff_invitees
+            global SiteSummary, extract_invitees, extract_invite_status, normalize_invitees
+            global query_invitees, INVITEE_FILTERS, INVITEE_SORT_KEYS, SessionPool, SiteHealthTracker, AsyncCrawler
+            global IdentityCache, StalenessScheduler, MetricsStore, RequestRecorder, stage_label
             try:
                 from plugins.nexusinvitee.data import DataManager
-                from plugins.nexusinvitee.utils import NotificationHelper
+                from plugins.nexusinvitee.utils import NotificationHelper, IndexerSnapshot
                 from plugins.nexusinvitee.module_loader import ModuleLoader
+                from plugins.nexusinvitee.incremental import PageCache, diff_invitees
+                from plugins.nexusinvitee.session_pool import SessionPool
+                from plugins.nexusinvitee.site_health import SiteHealthTracker
+                from plugins.nexusinvitee.async_crawl import AsyncCrawler
+                from plugins.nexusinvitee.identity import IdentityCache
+                from plugins.nexusinvitee.staleness import StalenessScheduler
+                from plugins.nexusinvitee.metrics import MetricsStore, RequestRecorder, stage_label
+                from plugins.nexusinvitee.models import (SiteSummary, extract_invitees, extract_invite_status,
+                                                         normalize_invitees, query_invitees, INVITEE_FILTERS,
+                                                         INVITEE_SORT_KEYS)
                 logger.debug("核心模块引用更新成功")
             except Exception as e:
                 logger.error(f"更新核心模块引用失败: {str(e)}")
@@ -519,8 +577,13 @@ class nexusinvitee(_PluginBase):
         config = {
             "enabled": self._enabled,
             "notify": self._notify,
+            "incremental": self._incremental,
+            "async_crawl": self._async_crawl,
             "cron": self._cron,
+            "smart_schedule": self._smart_schedule,
+            "refresh_ttl": self._refresh_ttl,
             "onlyonce": self._onlyonce,
+            "max_workers": self._max_workers,
             "site_ids": self._nexus_sites
         }
         # 使用父类的update_config方法而不是自己的方法，避免递归
@@ -560,12 +623,24 @@ class nexusinvitee(_PluginBase):
             "methods": ["GET"],
             "summary": "获取被邀请人列表",
             "description": "获取所有站点的被邀请人列表及状态",
+        }, {
+            "path": "/invitees",
+            "endpoint": self.query_invitees,
+            "methods": ["GET"],
+            "summary": "分页查询被邀请人",
+            "description": "按站点、状态筛选并排序，分页返回被邀请人列表",
         }, {
             "path": "/refresh_data",
             "endpoint": self.refresh_data,
             "methods": ["GET"],
             "summary": "刷新数据",
             "description": "强制刷新所有站点数据",
+        }, {
+            "path": "/metrics",
+            "endpoint": self.get_metrics,
+            "methods": ["GET"],
+            "summary": "刷新指标",
+            "description": "获取各站点最近刷新的分阶段耗时、请求数和流量",
         }]
 
     def get_dashboard_meta(self) -> Optional[List[Dict[str, str]]]:
@@ -585,77 +660,24 @@ class nexusinvitee(_PluginBase):
             return None
             
         try:
-            # 从data_manager获取站点数据
-            cached_data = {}
-            site_data = self.data_manager.get_site_data()
-            for site_name, site_info in site_data.items():
-                cached_data[site_name] = site_info
-                
-            last_update = "未知"
-            if cached_data:
-                # 找出最新更新时间
-                update_times = [cache.get("last_update", 0)
-                                for cache in cached_data.values() if cache]
-                if update_times:
-                    last_update = time.strftime(
-                        "%Y-%m-%d %H:%M:%S", time.localtime(max(update_times)))
+            # 仪表盘只需要统计数据，直接读取索引中的站点摘要
+            summaries = self.data_manager.get_site_summaries()
 
-            # 计算所有站点统计信息
-            total_sites = len(cached_data)
-            total_invitees = 0
-            total_low_ratio = 0
-            total_banned = 0
-            total_perm_invites = 0
-            total_temp_invites = 0
-            total_no_data = 0  # 添加无数据计数器
-
-            for site_name, cache in cached_data.items():
-                site_cache_data = cache.get("data", {})
-                invitees = []
-                
-                # 尝试不同的数据结构路径获取邀请列表
-                possible_paths = [
-                    ["invitees"],
-                    ["data", "invitees"],
-                    ["data", "data", "invitees"]
-                ]
-                
-                for path in possible_paths:
-                    result = get_nested_value(site_cache_data, path, [])
-                    if result:
-                        invitees = result
-                        break
-
-                # 统计各项数据
-                total_invitees += len(invitees)
-                
-                # 获取邀请状态
-                invite_status = {}
-                status_paths = [
-                    ["invite_status"],
-                    ["data", "invite_status"],
-                    ["data", "data", "invite_status"]
-                ]
-                
-                for path in status_paths:
-                    result = get_nested_value(site_cache_data, path, {})
-                    if result and isinstance(result, dict):
-                        invite_status = result
-                        break
-
-                # 统计邀请数量
-                total_perm_invites += invite_status.get("permanent_count", 0)
-                total_temp_invites += invite_status.get("temporary_count", 0)
-
-                # 统计用户状态 - 使用ratio_health字段
-                banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-                low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') in ['warning', 'danger'])
-                no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
+            last_update = "未知"
+            last_update_time = self.data_manager.get_last_update_time()
+            if last_update_time:
+                last_update = time.strftime(
+                    "%Y-%m-%d %H:%M:%S", time.localtime(last_update_time))
 
-                # 累加到总数
-                total_banned += banned_count
-                total_low_ratio += low_ratio_count
-                total_no_data += no_data_count
+            # 汇总所有站点统计信息
+            totals = self._sum_site_summaries(summaries.values())
+            total_sites = len(summaries)
+            total_invitees = totals["invitee_count"]
+            total_low_ratio = totals["low_ratio_count"]
+            total_banned = totals["banned_count"]
+            total_perm_invites = totals["permanent_count"]
+            total_temp_invites = totals["temporary_count"]
+            total_no_data = totals["no_data_count"]
 
 
             # 列配置
@@ -917,8 +939,86 @@ class nexusinvitee(_PluginBase):
                 ]
             })
             
+            # 熔断中的主机
+            circuits = self._health_tracker.open_circuits() if self._health_tracker else {}
+            if circuits:
+                circuit_texts = []
+                for host, status in circuits.items():
+                    retry_at = time.strftime("%H:%M", time.localtime(status["retry_at"])) if status.get("retry_at") else "-"
+                    circuit_texts.append(f"{host}（连续失败 {status['consecutive_failures']} 次，{retry_at} 后重试）")
+                elements.append({
+                    "component": "VAlert",
+                    "props": {
+                        "type": "warning",
+                        "variant": "tonal",
+                        "density": "compact",
+                        "class": "mb-2",
+                        "text": "以下站点连接异常，已暂停刷新: " + "；".join(circuit_texts)
+                    }
+                })
+            
+            # 刷新耗时最长的站点，区分网络和解析耗时
+            slow_sites = list(self._metrics_store.summary().items())[:5] if self._metrics_store else []
+            if slow_sites:
+                elements.append({
+                    "component": "VCard",
+                    "props": {
+                        "class": "mb-4",
+                        "variant": "flat"
+                    },
+                    "content": [
+                        {
+                            "component": "VCardTitle",
+                            "text": "刷新耗时"
+                        },
+                        {
+                            "component": "VCardText",
+                            "content": [
+                                {
+                                    "component": "VTable",
+                                    "props": {
+                                        "density": "compact",
+                                        "hover": True
+                                    },
+                                    "content": [
+                                        {
+                                            "component": "thead",
+                                            "content": [
+                                                {
+                                                    "component": "tr",
+                                                    "content": [
+                                                        {"component": "th", "text": header}
+                                                        for header in ("站点", "平均耗时", "网络", "解析", "请求数", "流量", "最慢阶段")
+                                                    ]
+                                                }
+                                            ]
+                                        },
+                                        {
+                                            "component": "tbody",
+                                            "content": [
+                                                {
+                                                    "component": "tr",
+                                                    "content": [
+                                                        {"component": "td", "text": name},
+                                                        {"component": "td", "text": f"{item['avg_total_ms'] / 1000:.1f}s"},
+                                                        {"component": "td", "text": f"{item['avg_network_ms'] / 1000:.1f}s"},
+                                                        {"component": "td", "text": f"{item['avg_parse_ms'] / 1000:.1f}s"},
+                                                        {"component": "td", "text": str(item["avg_requests"])},
+                                                        {"component": "td", "text": SiteHelper.format_size(item["avg_bytes"])},
+                                                        {"component": "td", "text": self._slowest_stage_text(item)}
+                                                    ]
+                                                } for name, item in slow_sites
+                                            ]
+                                        }
+                                    ]
+                                }
+                            ]
+                        }
+                    ]
+                })
+            
             # 如果没有数据，显示提示信息
-            if not cached_data:
+            if not summaries:
                 elements = [{
                     "component": "VAlert",
                     "props": {
@@ -972,7 +1072,7 @@ class nexusinvitee(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -988,7 +1088,7 @@ class nexusinvitee(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -1004,7 +1104,7 @@ class nexusinvitee(_PluginBase):
                                 'component': 'VCol',
                                 'props': {
                                     'cols': 12,
-                                    'md': 4
+                                    'md': 3
                                 },
                                 'content': [
                                     {
@@ -1015,6 +1115,22 @@ class nexusinvitee(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'incremental',
+                                            'label': '增量刷新'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -1050,7 +1166,8 @@ class nexusinvitee(_PluginBase):
                             {
                                 'component': 'VCol',
                                 'props': {
-                                    'cols': 12
+                                    'cols': 12,
+                                    'md': 6
                                 },
                                 'content': [
                                     {
@@ -1061,6 +1178,85 @@ class nexusinvitee(_PluginBase):
                                         }
                                     }
                                 ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'max_workers',
+                                            'label': '最大并发站点数',
+                                            'type': 'number',
+                                            'persistent-hint': True,
+                                            'hint': '同时刷新的站点数量，同一主机的站点始终串行，设为1则逐个刷新'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 3
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'async_crawl',
+                                            'label': '异步抓取',
+                                            'persistent-hint': True,
+                                            'hint': '翻页请求在共享事件循环中并发执行，需要安装httpx'
+                                        }
+                                    }
+                                ]
+                            }
+                        ]
+                    },
+                    {
+                        'component': 'VRow',
+                        'content': [
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VSwitch',
+                                        'props': {
+                                            'model': 'smart_schedule',
+                                            'label': '按需刷新',
+                                            'persistent-hint': True,
+                                            'hint': '开启后不再使用执行周期，每15分钟检查一次，只分批刷新数据已过期的站点'
+                                        }
+                                    }
+                                ]
+                            },
+                            {
+                                'component': 'VCol',
+                                'props': {
+                                    'cols': 12,
+                                    'md': 6
+                                },
+                                'content': [
+                                    {
+                                        'component': 'VTextField',
+                                        'props': {
+                                            'model': 'refresh_ttl',
+                                            'label': '数据有效期(小时)',
+                                            'type': 'number',
+                                            'persistent-hint': True,
+                                            'hint': '按需刷新的基础间隔，数据经常变化的站点会更频繁刷新，长期不变的站点逐步放宽'
+                                        }
+                                    }
+                                ]
                             }
                         ]
                     },
@@ -1090,8 +1286,13 @@ class nexusinvitee(_PluginBase):
         ], {
             "enabled": self._enabled,
             "notify": self._notify,
+            "incremental": self._incremental,
+            "async_crawl": self._async_crawl,
             "cron": "0 9 * * *",
+            "smart_schedule": self._smart_schedule,
+            "refresh_ttl": self._refresh_ttl,
             "onlyonce": False,
+            "max_workers": self._max_workers,
             "site_ids": self._nexus_sites
         }
 
@@ -1102,6 +1303,42 @@ class nexusinvitee(_PluginBase):
         # 简单判断，后续可以添加更多特征
         return "php" in site_url.lower()
 
+    def _invitee_pager(self, site_name: str, total: int) -> List[dict]:
+        """
+        生成详情页后宫成员表格下方的分页链接，每页链接到 /invitees 接口对应的偏移
+        :param site_name: 站点名称
+        :param total: 站点后宫成员总数
+        :return: 页面组件，成员数不超过一页时为空
+        """
+        limit = self._page_invitee_limit
+        if total <= limit:
+            return []
+        page_buttons = []
+        for page, offset in enumerate(range(0, total, limit), start=1):
+            query = urlencode({"site_name": site_name, "offset": offset, "limit": limit,
+                               "apikey": settings.API_TOKEN})
+            page_buttons.append({
+                "component": "VBtn",
+                "props": {
+                    "variant": "tonal" if offset == 0 else "text",
+                    "density": "compact",
+                    "size": "small",
+                    "class": "ma-1",
+                    "href": f"/api/v1/plugin/{self.__class__.__name__}/invitees?{query}",
+                    "target": "_blank"
+                },
+                "text": str(page)
+            })
+        return [{
+            "component": "div",
+            "props": {"class": "d-flex flex-wrap align-center pa-2"},
+            "content": [{
+                "component": "span",
+                "props": {"class": "text-caption text-grey mr-2"},
+                "text": f"共 {total} 人，每页 {limit} 人，当前显示第1页，其余页面通过 /invitees 接口查看:"
+            }] + page_buttons
+        }]
+
     def get_page(self) -> List[dict]:
         """
         详情页面
@@ -1128,48 +1365,16 @@ class nexusinvitee(_PluginBase):
             # 准备页面内容
             page_content = []
             
-            # 添加全局统计信息
+            # 添加全局统计信息，使用刷新时计算好的站点摘要
+            summaries = self.data_manager.get_site_summaries()
+            totals = self._sum_site_summaries(summaries.get(site_name) for site_name in cached_data)
             total_sites = len(cached_data)
-            total_invitees = 0
-            total_low_ratio = 0
-            total_banned = 0
-            total_perm_invites = 0
-            total_temp_invites = 0
-            total_no_data = 0
-
-            for site_name, cache in cached_data.items():
-                site_cache_data = cache.get("data", {})
-                invitees = []
-                
-                # 获取邀请用户列表
-                if "data" in site_cache_data:
-                    invitees = site_cache_data.get("data", {}).get("invitees", [])
-                else:
-                    invitees = site_cache_data.get("invitees", [])
-
-                # 统计各项数据
-                total_invitees += len(invitees)
-                
-                # 统计用户状态
-                banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-                low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') in ['warning', 'danger'])
-                no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
-
-                # 累加到总数
-                total_banned += banned_count
-                total_low_ratio += low_ratio_count
-                total_no_data += no_data_count
-
-                # 获取邀请状态
-                invite_status = {}
-                if "data" in site_cache_data:
-                    invite_status = site_cache_data.get("data", {}).get("invite_status", {})
-                else:
-                    invite_status = site_cache_data.get("invite_status", {})
-
-                # 统计邀请数量
-                total_perm_invites += invite_status.get("permanent_count", 0)
-                total_temp_invites += invite_status.get("temporary_count", 0)
+            total_invitees = totals["invitee_count"]
+            total_low_ratio = totals["low_ratio_count"]
+            total_banned = totals["banned_count"]
+            total_perm_invites = totals["permanent_count"]
+            total_temp_invites = totals["temporary_count"]
+            total_no_data = totals["no_data_count"]
 
             # 添加统计卡片
             page_content.extend([
@@ -1420,51 +1625,12 @@ class nexusinvitee(_PluginBase):
             # 准备站点卡片
             cards = []
             
-            # 计算所有站点统计信息
-            total_sites = len(cached_data)
-            total_invitees = 0
-            total_low_ratio = 0
-            total_banned = 0
-            total_perm_invites = 0
-            total_temp_invites = 0
-            total_no_data = 0
-
-            for site_name, cache in cached_data.items():
-                site_cache_data = cache.get("data", {})
-                invitees = []
-                
-                # 获取邀请用户列表
-                if "data" in site_cache_data:
-                    invitees = site_cache_data.get("data", {}).get("invitees", [])
-                else:
-                    invitees = site_cache_data.get("invitees", [])
-
-                # 统计各项数据
-                total_invitees += len(invitees)
-                
-                # 统计用户状态 - 直接使用ratio_health字段
-                banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-                low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') in ['warning', 'danger'])
-                no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
-
-                # 累加到总数
-                total_banned += banned_count
-                total_low_ratio += low_ratio_count
-                total_no_data += no_data_count
-
-                # 获取邀请状态
-                invite_status = {}
-                if "data" in site_cache_data:
-                    invite_status = site_cache_data.get("data", {}).get("invite_status", {})
-                else:
-                    invite_status = site_cache_data.get("invite_status", {})
-
-                # 统计邀请数量
-                total_perm_invites += invite_status.get("permanent_count", 0)
-                total_temp_invites += invite_status.get("temporary_count", 0)
+            # 计算所有站点统计信息（已在上方从站点摘要汇总）
+            for site_name in cached_data:
+                site_summary = summaries.get(site_name) or SiteSummary()
                 # 向药单打标临药永药
-                self.presc.setP(site_name,invite_status.get("permanent_count", 0))
-                self.presc.setT(site_name,invite_status.get("temporary_count", 0))
+                self.presc.setP(site_name, site_summary.permanent_count)
+                self.presc.setT(site_name, site_summary.temporary_count)
 
 
             # 添加全局统计信息
@@ -1709,111 +1875,26 @@ class nexusinvitee(_PluginBase):
                 ]
             })
 
+            indexer_snapshot = self._get_indexer_snapshot()
             for site_name, cache in cached_data.items():
                 invite_data = cache.get("data", {})
 
                 # 获取站点信息
-                site_info = None
-                for site in self.sites.get_indexers():
-                    if site.get("name") == site_name:
-                        site_info = site
-                        break
+                site_info = indexer_snapshot.get_by_name(site_name)
                 
                 if site_info:
                     # 获取站点数据
                     site_cache_data = cache.get("data", {})
                     
-                    # 尝试不同的数据结构路径获取邀请列表
-                    invitees = []
-                    possible_paths = [
-                        ["invitees"],
-                        ["data", "invitees"],
-                        ["data", "data", "invitees"]
-                    ]
-                    
-                    for path in possible_paths:
-                        result = get_nested_value(site_cache_data, path, [])
-                        if result:
-                            invitees = result
-                            break
-                    
-                    # 同样处理邀请状态
-                    invite_status = {}
-                    status_paths = [
-                        ["invite_status"],
-                        ["data", "invite_status"],
-                        ["data", "data", "invite_status"]
-                    ]
-                    
-                    for path in status_paths:
-                        result = get_nested_value(site_cache_data, path, {})
-                        if result and isinstance(result, dict):
-                            invite_status = result
-
-                    # 计算此站点的统计信息
-                    banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-                    low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') == 'warning' or i.get('ratio_health') == 'danger')
-                    no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
-
-                    # 更新总计数
-                    total_banned += banned_count
-                    total_low_ratio += low_ratio_count
-                    total_no_data += no_data_count
-
-                    for invitee in invitees:
-                        # 检查是否是无数据情况（上传下载都是0）
-                        uploaded = invitee.get('uploaded', '0')
-                        downloaded = invitee.get('downloaded', '0')
-                        is_no_data = False
-                        
-                        # 简化判断逻辑，只关注字符串为"0"、"0.0"、"0B"或空字符串，或者数值为0的情况
-                        if isinstance(uploaded, str) and isinstance(downloaded, str):
-                            uploaded_zero = uploaded == '0' or uploaded == '' or uploaded == '0.0' or uploaded.lower() == '0b'
-                            downloaded_zero = downloaded == '0' or downloaded == '' or downloaded == '0.0' or downloaded.lower() == '0b'
-                            is_no_data = uploaded_zero and downloaded_zero
-                        elif isinstance(uploaded, (int, float)) and isinstance(downloaded, (int, float)):
-                            is_no_data = uploaded == 0 and downloaded == 0
-                        
-                        username = invitee.get('username', '未知')
-                        # 强制输出日志，确保无数据用户被记录
-                        if is_no_data:
-                            logger.info(f"【总览】检测到无数据用户: {username}, 上传={uploaded}, 下载={downloaded}, 当前无数据总计={total_no_data+1}")
-                            total_no_data += 1
-                            continue
-                        
-                        # 处理分享率
-                        ratio_str = invitee.get('ratio', '')
-                        # 处理无限分享率情况 - 增强识别能力
-                        if ratio_str == '∞' or ratio_str.lower() in ['inf.', 'inf', 'infinite', '无限']:
-                            continue  # 无限分享率不计入低分享率
-                        
-                        try:
-                            # 标准化字符串 - 正确处理千分位逗号
-                            # 使用更好的方法完全移除千分位逗号
-                            normalized_ratio = ratio_str
-                            # 循环处理，直到没有千分位逗号
-                            while ',' in normalized_ratio:
-                                # 检查每个逗号是否是千分位分隔符
-                                comma_positions = [pos for pos, char in enumerate(normalized_ratio) if char == ',']
-                                for pos in comma_positions:
-                                    # 如果逗号后面是数字，且前面也是数字，则视为千分位逗号
-                                    if (pos > 0 and pos < len(normalized_ratio) - 1 and 
-                                        normalized_ratio[pos-1].isdigit() and normalized_ratio[pos+1].isdigit()):
-                                        normalized_ratio = normalized_ratio[:pos] + normalized_ratio[pos+1:]
-                                        break
-                                else:
-                                    # 如果没有找到千分位逗号，退出循环
-                                    break
-                            
-                            # 最后，将任何剩余的逗号替换为小数点（可能是小数点表示）
-                            normalized_ratio = normalized_ratio.replace(',', '.')
-                            ratio_val = float(normalized_ratio) if normalized_ratio else 0
-                            if ratio_val < 1 and ratio_val > 0:  # 确保分享率大于0且小于1才算低分享率
-                                low_ratio_count += 1
-                                logger.info(f"【总览】检测到低分享率用户: {invitee.get('username', '未知')}, 分享率={ratio_str}({ratio_val})")
-                        except (ValueError, TypeError) as e:
-                            # 转换错误时记录警告
-                            logger.warning(f"分享率转换失败: {ratio_str}, 错误: {str(e)}")
+                    # 获取邀请列表和邀请状态
+                    invitees = extract_invitees(site_cache_data)
+                    invite_status = extract_invite_status(site_cache_data)
+
+                    # 此站点的统计信息直接读取刷新时计算好的摘要
+                    site_summary = summaries.get(site_name) or SiteSummary.from_site_data(site_cache_data)
+                    banned_count = site_summary.banned_count
+                    low_ratio_count = site_summary.card_low_ratio_count
+                    no_data_count = site_summary.no_data_count
 
                     # 合并站点信息和数据到一张卡片
                     site_card = {
@@ -2618,13 +2699,14 @@ class nexusinvitee(_PluginBase):
                     # 只有在有邀请列表时才添加表格
                     if invitees:
                         table_rows = []
-                        for invitee in invitees:
+                        # 页面只渲染第一页成员，其余分页通过 /invitees 接口查看
+                        _, site_records = query_invitees({site_name: invitees}, limit=self._page_invitee_limit)
+                        for _, record in site_records:
                             # 判断用户是否被ban或分享率较低
-                            is_banned = invitee.get('enabled', '').lower() == 'no'
+                            is_banned = not record.enabled
                             
-                            # 使用ratio_health和ratio_label字段
-                            ratio_health = invitee.get('ratio_health', '')
-                            ratio_label = invitee.get('ratio_label', ['', ''])
+                            # 使用分享率健康度
+                            ratio_health = record.health.value
 
                             # 根据ratio_health设置行样式
                             row_class = ""
@@ -2663,43 +2745,36 @@ class nexusinvitee(_PluginBase):
                                             "component": "VBtn",
                                             "props": {
                                                 "variant": "text",
-                                                "href": invitee.get("profile_url", ""),
+                                                "href": record.profile_url,
                                                 "target": "_blank",
                                                 "density": "compact"
                                             },
-                                            "text": invitee.get("username", "")
+                                            "text": record.username
                                         }]
                                     },
                                     {"component": "td",
-                                        "text": invitee.get("email", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "uploaded", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "downloaded", "")},
+                                        "text": record.email},
+                                    {"component": "td", "text": record.uploaded_text},
+                                    {"component": "td", "text": record.downloaded_text},
                                     {
                                         "component": "td",
                                         "props": {
                                             "class": ratio_class
                                         },
-                                        "text": invitee.get("ratio", "")
+                                        "text": record.ratio_text
                                     },
-                                    {"component": "td", "text": invitee.get(
-                                        "seeding", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "seeding_size", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "seed_magic", "") or invitee.get("magic", "") or invitee.get("seed_time", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "seed_bonus", "") or invitee.get("invitee_bonus", "") or invitee.get("bonus", "")},
-                                    {"component": "td", "text": invitee.get(
-                                        "last_seed_report", "") or invitee.get("last_seen", "")},
+                                    {"component": "td", "text": str(record.seeding)},
+                                    {"component": "td", "text": record.seeding_size_text},
+                                    {"component": "td", "text": record.seed_magic_text},
+                                    {"component": "td", "text": record.seed_bonus_text},
+                                    {"component": "td", "text": record.last_seen_text},
                                     {
                                         "component": "td",
                                         "props": {
-                                            "class": ("text-success" if invitee.get('status') == '已确认' else "") +
-                                                     (" text-error font-weight-bold" if invitee.get('enabled', '').lower() == 'no' else "")
+                                            "class": ("text-success" if record.status == '已确认' else "") +
+                                                     (" text-error font-weight-bold" if is_banned else "")
                                         },
-                                        "text": invitee.get("status", "") + (" (已禁用)" if invitee.get('enabled', '').lower() == 'no' else "")
+                                        "text": record.status + (" (已禁用)" if is_banned else "")
                                     }
                                 ]
                             })
@@ -3109,7 +3184,7 @@ class nexusinvitee(_PluginBase):
                                                     "component": "tbody",
                                                     "content": table_rows
                                                 }]
-                                            }]
+                                            }] + self._invitee_pager(site_name, len(invitees))
                                         }
                                     ]
                                 }]
@@ -3150,31 +3225,52 @@ class nexusinvitee(_PluginBase):
                 }
             }]
 
+    def _stop_scheduler(self):
+        """
+        停止定时服务，连接池和异步抓取器保持可用
+        """
+        if hasattr(self, '_scheduler') and self._scheduler:
+            self._scheduler.remove_all_jobs()
+            if self._scheduler.running:
+                self._scheduler.shutdown()
+            self._scheduler = None
+            logger.info("后宫管理系统服务已停止")
+
     def stop_service(self):
         """
         停止现有服务
         """
         try:
-            if hasattr(self, '_scheduler') and self._scheduler:
-                self._scheduler.remove_all_jobs()
-                if self._scheduler.running:
-                    self._scheduler.shutdown()
-                self._scheduler = None
-                logger.info("后宫管理系统服务已停止")
+            self._stop_scheduler()
+            if self._session_pool:
+                self._session_pool.close()
+                self._session_pool = None
+            if self._async_crawler:
+                self._async_crawler.close()
+                self._async_crawler = None
         except Exception as e:
             logger.error(f"停止后宫管理系统服务失败: {str(e)}")
 
-    def _get_site_invite_data(self, site_name):
+    def _get_indexer_snapshot(self) -> IndexerSnapshot:
+        """
+        获取当前站点配置快照
+        :return: 站点配置快照
+        """
+        return IndexerSnapshot(self.sites.get_indexers())
+
+    def _get_site_invite_data(self, site_name, site_info: Optional[Dict[str, Any]] = None,
+                              page_cache: Optional[PageCache] = None, recorder: Optional[RequestRecorder] = None):
         """
         获取站点邀请页面数据
+        :param site_name: 站点名称
+        :param site_info: 站点配置，刷新时由站点快照直接传入，未传入时重新查找
+        :param page_cache: 页面解析缓存，增量刷新时传入
+        :param recorder: 请求记录器，记录本次刷新各阶段的请求耗时和流量
         """
         try:
             # 获取站点信息
-            site_info = None
-            for indexer in self.sites.get_indexers():
-                if indexer.get("name") == site_name:
-                    site_info = indexer
-                    break
+            if site_info is None:
+                site_info = self._get_indexer_snapshot().get_by_name(site_name)
                     
             if not site_info:
                 logger.error(f"站点 {site_name} 信息不存在")
@@ -3265,8 +3361,18 @@ class nexusinvitee(_PluginBase):
                     }
                 }
 
-            # 构建请求Session
-            session = requests.Session()
+            # 身份缓存：Cookie未变化时复用上次的用户ID，跳过获取用户ID和验证Cookie的请求
+            cached_user_id = None
+            if self._identity_cache and not is_mteam:
+                cached_user_id = self._identity_cache.get(site_name, site_url, site_cookie)
+                if cached_user_id:
+                    logger.debug(f"站点 {site_name} 使用缓存的用户ID: {cached_user_id}")
+
+            # 从连接池获取请求Session，同一主机的连接跨站点、跨刷新复用
+            if self._session_pool:
+                session = self._session_pool.session(site_url, recorder=recorder)
+            else:
+                session = requests.Session()
             
             # 根据站点类型设置不同的请求头
             if is_mteam:
@@ -3312,10 +3418,12 @@ class nexusinvitee(_PluginBase):
                     'sec-fetch-site': 'same-origin'
                 })
                 
-                # 尝试验证Cookie有效性
-                test_url = site_url
-                test_response = session.get(test_url, timeout=(10, 30))
-                if test_response.status_code >= 400:
+                # 尝试验证Cookie有效性，Cookie未变化且已验证过时跳过，失效时由处理器的登录检测发现
+                test_response = None
+                if not cached_user_id:
+                    test_url = site_url
+                    test_response = session.get(test_url, timeout=(10, 30))
+                if test_response is not None and test_response.status_code >= 400:
                     logger.error(f"站点 {site_name} Cookie验证失败，状态码: {test_response.status_code}")
                     return {
                         "error": f"Cookie验证失败，状态码: {test_response.status_code}",
@@ -3330,27 +3438,47 @@ class nexusinvitee(_PluginBase):
             # 使用站点处理器
             logger.info(f"站点 {site_name} 开始处理邀请数据")
             
-            # 根据站点类型选择不同的处理器
-            if is_mteam:
-                logger.info(f"站点 {site_name} 使用M-Team处理器")
-                from plugins.nexusinvitee.sites.mteam import MTeamHandler
-                handler = MTeamHandler()
-            elif "hdchina" in site_url.lower():
-                logger.info(f"站点 {site_name} 使用HDChina处理器")
-                from plugins.nexusinvitee.sites.hdchina import HDChinaHandler
-                handler = HDChinaHandler()
+            # 从注册表中查找匹配的处理器（M-Team等专用处理器优先）
+            registry = self._handler_registry or ModuleLoader.get_registry()
+            handler = registry.get_handler(site_url)
+            if not handler:
+                # 如果找不到合适的处理器，使用通用NexusPHP处理器
+                logger.info(f"站点 {site_name} 未找到专用处理器，使用默认NexusPHP处理器")
+                handler = registry.get_generic_handler()
+            if not handler:
+                return {
+                    "invite_status": {
+                        "can_invite": False,
+                        "permanent_count": 0,
+                        "temporary_count": 0,
+                        "reason": "未找到可用的站点处理器"
+                    }
+                }
+            logger.debug(f"站点 {site_name} 使用处理器: {type(handler).__name__}")
+            handler.page_cache = page_cache
+            handler.cached_user_id = cached_user_id
+            handler.recorder = recorder
+            
+            # 使用处理器解析邀请页面，开启异步抓取时通过共享事件循环执行
+            if self._async_crawler:
+                async_session = self._async_crawler.session(session, tracker=self._health_tracker,
+                                                            max_concurrency=handler.max_page_workers)
+                site_data = self._async_crawler.parse_invite_page(handler, site_info, async_session)
             else:
-                # 查找匹配的处理器
-                handler = ModuleLoader.get_handler_for_site(site_url, self._site_handlers)
-                if not handler:
-                    # 如果找不到合适的处理器，使用通用NexusPHP处理器
-                    logger.info(f"站点 {site_name} 未找到专用处理器，使用默认NexusPHP处理器")
-                    from plugins.nexusinvitee.sites.nexusphp import NexusPhpHandler
-                    handler = NexusPhpHandler()
+                site_data = handler.parse_invite_page(site_info, session)
             
-            # 使用处理器解析邀请页面
-            site_data = handler.parse_invite_page(site_info, session)
+            # 更新身份缓存：检测到未登录或使用缓存的用户ID刷新失败时失效，刷新成功时记录本次的用户ID
+            if self._identity_cache and not is_mteam:
+                failed = self._site_failure_reason(site_data) is not None
+                if handler.login_failed or (cached_user_id and failed):
+                    logger.info(f"站点 {site_name} 登录检测失败或刷新失败，清除缓存的用户ID")
+                    self._identity_cache.invalidate(site_name)
+                elif handler.resolved_user_id and not failed:
+                    self._identity_cache.remember(site_name, site_url, site_cookie, handler.resolved_user_id)
             
+            # 入库前统一转换为类型化的后宫成员记录，显示格式在渲染时生成
+            if isinstance(site_data, dict) and "invitees" in site_data:
+                site_data["invitees"] = normalize_invitees(site_data["invitees"])
             
             # 检查站点数据结构是否正确
             if "invite_status" in site_data:
@@ -3399,6 +3527,12 @@ class nexusinvitee(_PluginBase):
                 else:
                     return {"code": 1, "message": "暂无站点数据"}
 
+            # 保存的记录中流量为字节数、分享率为浮点数，补充旧版接口的显示字段
+            if site_name:
+                site_data = render_invitees(site_data)
+            else:
+                site_data = {name: render_invitees(entry) for name, entry in site_data.items()}
+
             return {
                 "code": 0,
                 "message": "获取成功",
@@ -3411,6 +3545,58 @@ class nexusinvitee(_PluginBase):
             logger.error(f"获取后宫成员失败: {str(e)}")
             return {"code": 1, "message": f"获取后宫成员失败: {str(e)}"}
 
+    def query_invitees(self, apikey: str = None, site_name: str = None, filters: str = None,
+                       sort: str = None, order: str = "asc", offset: int = 0, limit: int = 50) -> dict:
+        """
+        分页查询后宫成员API接口，筛选和排序在服务端完成
+        :param site_name: 站点名称，多个用逗号分隔，为空时查询所有站点
+        :param filters: 筛选条件，多个用逗号分隔：banned(已禁用)、low_ratio(低分享率)、no_data(无数据)
+        :param sort: 排序字段：ratio、uploaded、downloaded、join_time、last_seen、seeding_size、username
+        :param order: asc 或 desc
+        :param offset: 起始位置
+        :param limit: 每页数量，最大500
+        """
+        if apikey and apikey != settings.API_TOKEN:
+            return {"code": 1, "message": "API令牌错误!"}
+
+        try:
+            try:
+                offset = max(0, int(offset))
+                limit = min(max(1, int(limit)), 500)
+            except (TypeError, ValueError):
+                return {"code": 1, "message": "offset/limit 参数错误"}
+            if sort and sort not in INVITEE_SORT_KEYS:
+                return {"code": 1, "message": f"不支持的排序字段: {sort}"}
+            filter_names = [name.strip() for name in (filters or "").split(",") if name.strip()]
+            unknown_filters = [name for name in filter_names if name not in INVITEE_FILTERS]
+            if unknown_filters:
+                return {"code": 1, "message": f"不支持的筛选条件: {', '.join(unknown_filters)}"}
+
+            site_names = [name.strip() for name in (site_name or "").split(",") if name.strip()]
+            if site_names:
+                site_entries = {name: self.data_manager.get_site_data(name) for name in site_names}
+            else:
+                site_entries = self.data_manager.get_site_data()
+            site_invitees = {name: extract_invitees(entry.get("data", {}))
+                             for name, entry in site_entries.items() if entry}
+
+            total, records = query_invitees(site_invitees, filters=filter_names, sort=sort,
+                                            desc=str(order).lower() == "desc", offset=offset, limit=limit)
+            return {
+                "code": 0,
+                "message": "获取成功",
+                "data": {
+                    "total": total,
+                    "offset": offset,
+                    "limit": limit,
+                    "items": [{"site_name": name, **record.to_api_dict()} for name, record in records],
+                    "last_update": self.data_manager.get_last_update_time()
+                }
+            }
+        except Exception as e:
+            logger.error(f"分页查询后宫成员失败: {str(e)}")
+            return {"code": 1, "message": f"分页查询后宫成员失败: {str(e)}"}
+
     def refresh_data(self, apikey: str = None) -> dict:
         """
         强制刷新所有站点数据API接口
@@ -3419,10 +3605,6 @@ class nexusinvitee(_PluginBase):
             return {"code": 1, "message": "API令牌错误!"}
 
         try:
-            # 重新加载站点处理器以确保使用最新的处理逻辑
-            self._site_handlers = ModuleLoader.load_site_handlers()
-            logger.info(f"已重新加载 {len(self._site_handlers)} 个站点处理器")
-            
             # 调用refresh_all_sites方法刷新数据
             result = self.refresh_all_sites()
 
@@ -3438,7 +3620,13 @@ class nexusinvitee(_PluginBase):
                         "last_update": last_update,
                         "site_count": len(site_data),
                         "success": result.get("success", 0),
-                        "error": result.get("error", 0)
+                        "error": result.get("error", 0),
+                        "elapsed": result.get("elapsed", 0),
+                        "timings": result.get("timings", {}),
+                        "incremental": result.get("incremental"),
+                        "connections": result.get("connections"),
+                        "circuits": result.get("circuits"),
+                        "metrics": result.get("metrics")
                     }
                 }
             else:
@@ -3448,106 +3636,168 @@ class nexusinvitee(_PluginBase):
             logger.error(f"强制刷新数据失败: {str(e)}")
             return {"code": 1, "message": f"强制刷新数据失败: {str(e)}"}
 
-    def _get_user_id(self, session: requests.Session, site_info: Dict[str, Any]) -> str:
+    def get_metrics(self, apikey: str = None, site_name: str = None) -> dict:
         """
-        从站点获取用户ID
-        :param session: 请求会话
-        :param site_info: 站点信息
-        :return: 用户ID
+        刷新指标API接口
+        :param site_name: 站点名称，为空时返回所有站点，平均耗时最长的站点在前
         """
+        if apikey and apikey != settings.API_TOKEN:
+            return {"code": 1, "message": "API令牌错误!"}
+
         try:
-            site_url = site_info.get("url", "").strip()
-            site_name = site_info.get("name", "")
-            
-            # 访问个人页面提取ID
-            profile_url = urljoin(site_url, "index.php")
-            response = session.get(profile_url, timeout=(5, 15))
-            response.raise_for_status()
-            html_content = response.text
-            
-            # 尝试从多种常见格式中提取用户ID
-            # 方法1：从class="searchrecord td"中提取
-            soup = BeautifulSoup(html_content, 'html.parser')
-            
-            # 查找欢迎语中的用户名和ID链接
-            welcome_text = soup.select_one('.welcome')
-            if welcome_text:
-                user_link = welcome_text.select_one('a[href*="userdetails.php"]')
-                if user_link:
-                    href = user_link.get('href', '')
-                    id_match = re.search(r'id=(\d+)', href)
-                    if id_match:
-                        return id_match.group(1)
-            
-            # 方法2：从个人资料链接中提取
-            for pattern in [
-                r'userdetails\.php\?id=(\d+)',
-                r'getusertorrentlistajax\.php\?userid=(\d+)',
-                r'<input[^>]*name=["\']passkey["\'][^>]*value=["\']([a-zA-Z0-9]+)["\']',
-                r'passkey=([a-zA-Z0-9]+)',
-                r'usercp\.php\?action=personal&userid=(\d+)',
-                r'id=(\d+)',
-                r'uid=(\d+)'
-            ]:
-                matches = re.search(pattern, html_content)
-                if matches:
-                    return matches.group(1)
-            
-            # 方法3：尝试通过访问具体的用户资料页面
-            try:
-                user_link = None
-                # 找到包含用户名的链接
-                for a_tag in soup.select('a[href*="userdetails.php"], a[href*="user.php"]'):
-                    if a_tag.get_text().strip():
-                        user_link = a_tag
-                        break
-                
-                if user_link:
-                    href = user_link.get('href', '')
-                    if 'id=' in href:
-                        id_match = re.search(r'id=(\d+)', href)
-                        if id_match:
-                            return id_match.group(1)
-                    
-                    # 访问用户链接，从重定向或内容中提取用户ID
-                    user_response = session.get(urljoin(site_url, href), timeout=(5, 15))
-                    user_response.raise_for_status()
-                    user_content = user_response.text
-                    
-                    # 在返回的内容中搜索用户ID
-                    for pattern in [r'userdetails\.php\?id=(\d+)', r'passkey=([a-zA-Z0-9]+)', r'id=(\d+)', r'uid=(\d+)']:
-                        matches = re.search(pattern, user_content)
-                        if matches:
-                            return matches.group(1)
-            except Exception as e:
-                logger.warning(f"通过用户资料页面获取用户ID失败: {str(e)}")
-            
-            # 方法4：尝试从邀请页面获取
-            try:
-                invite_url = urljoin(site_url, "invite.php")
-                invite_response = session.get(invite_url, timeout=(5, 15))
-                invite_response.raise_for_status()
-                invite_content = invite_response.text
-                
-                # 搜索邀请页面中的用户ID
-                for pattern in [r'id=(\d+)', r'uid=(\d+)', r'user(?:id|_id)=(\d+)']:
-                    matches = re.search(pattern, invite_content)
-                    if matches:
-                        return matches.group(1)
-            except Exception as e:
-                logger.warning(f"通过邀请页面获取用户ID失败: {str(e)}")
-            
-            # 未能从任何途径获取用户ID
-            logger.error(f"无法从站点 {site_name} 获取用户ID")
-            return ""
-            
+            if not self._metrics_store:
+                return {"code": 1, "message": "刷新指标未初始化"}
+            if site_name:
+                site_summary = self._metrics_store.site_summary(site_name)
+                if not site_summary:
+                    return {"code": 1, "message": f"站点 {site_name} 暂无刷新指标"}
+                return {"code": 0, "message": "获取成功", "data": {"sites": {site_name: site_summary}}}
+            return {"code": 0, "message": "获取成功", "data": {"sites": self._metrics_store.summary()}}
         except Exception as e:
-            logger.error(f"获取用户ID失败: {str(e)}")
-            return ""
+            logger.error(f"获取刷新指标失败: {str(e)}")
+            return {"code": 1, "message": f"获取刷新指标失败: {str(e)}"}
+
+    @staticmethod
+    def _parse_max_workers(value: Any) -> int:
+        """
+        解析最大并发站点数配置
+        :param value: 配置值
+        :return: 并发数，至少为1
+        """
+        try:
+            return max(1, int(value))
+        except (ValueError, TypeError):
+            return 4
+
+    @staticmethod
+    def _slowest_stage_text(site_summary: Dict[str, Any]) -> str:
+        """
+        获取站点最近刷新中最慢的请求阶段描述
+        :param site_summary: MetricsStore.site_summary 的返回值
+        :return: 描述文本
+        """
+        stages = site_summary.get("stages") or {}
+        if not stages:
+            return "-"
+        item = max(stages.values(), key=lambda x: x["avg_ms"])
+        return f"{item['label']} {item['avg_ms'] / 1000:.1f}s"
+
+    @staticmethod
+    def _parse_refresh_ttl(value: Any) -> int:
+        """
+        解析按需刷新的基础有效期配置
+        :param value: 配置值（小时）
+        :return: 有效期（小时），至少为1
+        """
+        try:
+            return max(1, int(value))
+        except (ValueError, TypeError):
+            return 6
+
+    @staticmethod
+    def _site_failure_reason(site_data: Dict[str, Any]) -> Optional[str]:
+        """
+        判断站点数据是否表示刷新失败
+        :param site_data: _get_site_invite_data 的返回值
+        :return: 失败原因，成功时返回None
+        """
+        if "error" in site_data:
+            # 情况1: _get_site_invite_data 内部捕获到异常
+            return site_data.get('error') or "未知原因导致刷新失败"
+
+        # 情况2: 检查 parse_invite_page 返回的 reason 是否表明失败
+        reason = site_data.get("invite_status", {}).get("reason", "")
+        
+        # 定义表明失败的关键字或模式 (即使没有异常)
+        # 使用 r 前缀确保是原始字符串，避免反斜杠转义问题
+        failure_indicators = [
+            r"访问邀请页面失败",
+            r"无法获取用户ID",
+            r"未登录或Cookie已失效",
+            r"初始化失败",
+            r"网络错误",
+            r"发生错误",
+            r"解析站点.*时发生意外错误",
+            r"站点信息不完整", # 加入对站点信息不完整的检查
+        ]
+        
+        # 使用正则表达式匹配，因为 "解析站点..." 包含变量
+        if reason and any(re.search(indicator, reason, re.IGNORECASE) for indicator in failure_indicators):
+            return reason # 使用 handler 返回的具体原因作为错误消息
+        return None
 
-    def refresh_all_sites(self) -> Dict[str, int]:
+    def _check_circuit(self, site_url: str) -> Optional[str]:
+        """
+        检查站点主机是否处于熔断状态
+        :param site_url: 站点URL
+        :return: 熔断时返回跳过原因，否则返回None
+        """
+        if not self._health_tracker:
+            return None
+        allowed, remaining = self._health_tracker.allow(urlparse(site_url).netloc.lower(), probe=False)
+        if allowed:
+            return None
+        return f"站点连续请求失败已熔断，{max(remaining // 60, 1)} 分钟后重试"
+
+    def _fetch_sites_concurrently(self, sites: List[Dict[str, Any]]
+                                  ) -> Dict[str, Tuple[Dict[str, Any], float, Optional[PageCache], Optional[RequestRecorder]]]:
+        """
+        使用线程池并发获取站点数据
+        同一主机的站点被分到同一个任务中串行执行，保证每个主机同时只有一个请求线程
+        :param sites: 站点配置列表
+        :return: {站点名称: (站点数据, 耗时秒数, 页面解析缓存, 请求记录器)}，未启用增量刷新时页面解析缓存为None，
+                 未发起刷新的站点请求记录器为None
+        """
+        # 按主机分组
+        host_groups: Dict[str, List[Dict[str, Any]]] = {}
+        for site in sites:
+            host = urlparse(site.get("url", "")).netloc.lower() or site.get("name", "")
+            host_groups.setdefault(host, []).append(site)
+
+        def _fetch_host_group(group_sites: List[Dict[str, Any]]
+                              ) -> Dict[str, Tuple[Dict[str, Any], float, Optional[PageCache], Optional[RequestRecorder]]]:
+            group_results = {}
+            for group_site in group_sites:
+                group_site_name = group_site.get("name", "")
+                # 熔断中的站点直接跳过，等待退避时间到期后再试
+                skip_reason = self._check_circuit(group_site.get("url", ""))
+                if skip_reason:
+                    logger.warning(f"站点 {group_site_name} {skip_reason}，跳过本次刷新")
+                    group_results[group_site_name] = ({"error": skip_reason}, 0.0, None, None)
+                    continue
+                logger.debug(f"开始获取站点 {group_site_name} 的后宫数据...")
+                page_cache = PageCache(self.data_manager.get_page_cache(group_site_name)) if self._incremental else None
+                recorder = RequestRecorder()
+                start = time.monotonic()
+                site_data = self._get_site_invite_data(group_site_name, site_info=group_site, page_cache=page_cache,
+                                                       recorder=recorder)
+                elapsed = time.monotonic() - start
+                logger.debug(f"站点 {group_site_name} 数据获取耗时 {elapsed:.2f} 秒")
+                group_results[group_site_name] = (site_data, elapsed, page_cache, recorder)
+            return group_results
+
+        results = {}
+        max_workers = min(self._max_workers, len(host_groups)) or 1
+        logger.info(f"开始并发刷新 {len(sites)} 个站点（{len(host_groups)} 个主机），最大并发数: {max_workers}")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nexusinvitee") as executor:
+            futures = {executor.submit(_fetch_host_group, group): host for host, group in host_groups.items()}
+            for future in as_completed(futures):
+                host = futures[future]
+                try:
+                    results.update(future.result())
+                except Exception as e:
+                    # _get_site_invite_data 内部已捕获异常，这里只兜底线程异常
+                    logger.error(f"主机 {host} 的站点刷新任务异常: {str(e)}")
+                    for group_site in host_groups[host]:
+                        results.setdefault(group_site.get("name", ""),
+                                           ({"error": f"刷新任务异常: {str(e)}"}, 0.0, None, None))
+        return results
+
+    def refresh_all_sites(self, site_names: Optional[List[str]] = None, notify_on_error_only: bool = False) -> Dict[str, Any]:
         """
         刷新所有站点数据
+        :param site_names: 只刷新其中的站点，为None时刷新所有选择的站点
+        :param notify_on_error_only: 只在有站点失败时发送通知，用于按需刷新的分批任务
         """
         try:
             # 设置刷新标志防止重复刷新
@@ -3560,37 +3810,21 @@ class nexusinvitee(_PluginBase):
             # 记录刷新开始 - 说明是增量更新模式
             logger.info("开始增量刷新站点数据，只更新选择的站点，失败时保留旧数据")
             
-            # 重新加载站点处理器
-            self._site_handlers = ModuleLoader.load_site_handlers()
-            logger.info(f"加载了 {len(self._site_handlers)} 个站点处理器")
-            
-            # 获取所有站点配置
-            all_sites = self.sites.get_indexers()
+            # 获取本次刷新的站点配置快照，刷新期间的站点查找均使用快照
+            indexer_snapshot = self._get_indexer_snapshot()
             
             # 筛选站点配置 - 如果_nexus_sites为空，则选择所有站点
-            selected_sites = []
             if not self._nexus_sites:
                 logger.info("未选择任何站点，将使用所有站点")
-                selected_sites = all_sites
-            else:
-                for site in all_sites:
-                    site_id = site.get("id")
-                    # 转换为字符串进行比较
-                    site_id_str = str(site_id)
-                    nexus_sites_str = [str(x) for x in self._nexus_sites]
-                    
-                    # 调试输出当前站点ID
-                    logger.debug(f"检查站点ID: {site_id}，类型: {type(site_id)}")
-                    
-                    if site_id_str in nexus_sites_str:
-                        selected_sites.append(site)
-                        logger.debug(f"匹配到站点: {site.get('name')} (ID: {site_id})")
+            selected_sites = indexer_snapshot.select(self._nexus_sites)
+            if site_names is not None:
+                selected_sites = [site for site in selected_sites if site.get("name", "") in site_names]
             
             if selected_sites:
                 logger.debug(f"将刷新 {len(selected_sites)} 个站点的数据: {', '.join([site.get('name', '') for site in selected_sites])}")
             else:
                 logger.warning("没有发现可供刷新的站点，请检查站点选择配置")
-                logger.debug(f"所有站点ID: {[site.get('id') for site in all_sites]}")
+                logger.debug(f"所有站点ID: {[site.get('id') for site in indexer_snapshot.sites]}")
                 logger.debug(f"选择的站点ID: {self._nexus_sites}")
                 return {"success": 0, "error": 0, "message": "没有发现可供刷新的站点"}
             
@@ -3599,49 +3833,42 @@ class nexusinvitee(_PluginBase):
             error_count = 0
             error_details = []
             
-            # 获取现有数据
-            existing_data = self.data_manager.get_site_data()
+            # 并发获取各站点数据，结果按原站点顺序合并
+            if self._session_pool:
+                self._session_pool.prune()
+            pool_stats_before = self._session_pool.stats() if self._session_pool else {}
+            refresh_start = time.monotonic()
+            fetched_results = self._fetch_sites_concurrently(selected_sites)
+            site_timings = {}
+            site_metrics = {}
+            # 增量刷新统计：实际重新解析/复用的页面和后宫成员数，以及与上次数据相比的变化
+            incremental_stats = {
+                "pages_reprocessed": 0,
+                "pages_reused": 0,
+                "invitees_reprocessed": 0,
+                "invitees_reused": 0,
+                "invitees_added": 0,
+                "invitees_removed": 0,
+                "invitees_changed": 0
+            }
             
-            # 逐个刷新站点数据
+            # 批量写入：所有站点合并完成后一次性落盘
+            self.data_manager.begin_batch()
             for site in selected_sites:
                 site_name = site.get("name", "")
                 
-                logger.debug(f"开始获取站点 {site_name} 的后宫数据...")
+                site_data, elapsed, page_cache, recorder = fetched_results.get(
+                    site_name, ({"error": "未获取到站点数据"}, 0.0, None, None))
+                site_timings[site_name] = round(elapsed, 2)
                 
-                site_data = self._get_site_invite_data(site_name)
-                
-                # --- 修改开始: 增强失败判断逻辑 ---
-                is_successful = True
-                error_msg = ""
-                
-                if "error" in site_data:
-                    # 情况1: _get_site_invite_data 内部捕获到异常
-                    is_successful = False
-                    error_msg = site_data.get('error', '未知错误')
-                else:
-                    # 情况2: 检查 parse_invite_page 返回的 reason 是否表明失败
-                    invite_status = site_data.get("invite_status", {})
-                    reason = invite_status.get("reason", "")
-                    
-                    # 定义表明失败的关键字或模式 (即使没有异常)
-                    # 使用 r 前缀确保是原始字符串，避免反斜杠转义问题
-                    failure_indicators = [
-                        r"访问邀请页面失败",
-                        r"无法获取用户ID",
-                        r"未登录或Cookie已失效",
-                        r"初始化失败",
-                        r"网络错误",
-                        r"发生错误",
-                        r"解析站点.*时发生意外错误",
-                        r"站点信息不完整", # 加入对站点信息不完整的检查
-                    ]
-                    
-                    # 使用正则表达式匹配，因为 "解析站点..." 包含变量
-                    if reason and any(re.search(indicator, reason, re.IGNORECASE) for indicator in failure_indicators):
-                        is_successful = False
-                        error_msg = reason # 使用 handler 返回的具体原因作为错误消息
-                        
-                # --- 修改结束 ---
+                # 判断站点是否刷新失败
+                error_msg = self._site_failure_reason(site_data)
+                is_successful = error_msg is None
+                # 熔断跳过等未发出请求的站点不记录指标
+                if recorder and recorder.records:
+                    site_metrics[site_name] = recorder.summary(elapsed)
+                    if self._metrics_store:
+                        self._metrics_store.add(site_name, site_metrics[site_name], is_successful)
                         
                 if not is_successful:
                     if not error_msg: # 确保总有一个错误消息
@@ -3649,9 +3876,11 @@ class nexusinvitee(_PluginBase):
                     logger.error(f"站点 {site_name} 数据刷新失败: {error_msg}")
                     error_count += 1
                     error_details.append({"site_name": site_name, "msg": error_msg})
+                    if self._staleness:
+                        self._staleness.record_failure(site_name, error_msg)
                     
                     # 保留旧数据逻辑 (保持不变)
-                    old_data = existing_data.get(site_name, {}).get("data", {})
+                    old_data = self.data_manager.get_site_data(site_name).get("data", {})
                     if old_data:
                         old_invitees = old_data.get("invitees", [])
                         old_status = old_data.get("invite_status", {})
@@ -3678,70 +3907,134 @@ class nexusinvitee(_PluginBase):
                         else:
                             logger.info(f"站点 {site_name} 不可邀请原因: {reason}")
 
-                    # 保存站点数据 (保持不变)
+                    # 与上次数据相比的变化，用于增量统计和调整该站点的刷新间隔
+                    old_data = self.data_manager.get_site_data(site_name).get("data", {})
+                    invitee_diff = diff_invitees(old_data.get("invitees", []), invitees)
+                    if self._staleness:
+                        old_status = old_data.get("invite_status", {})
+                        changed = any(invitee_diff.values()) or any(
+                            old_status.get(key) != invite_status.get(key)
+                            for key in ("permanent_count", "temporary_count", "can_invite"))
+                        self._staleness.record_success(site_name, changed)
+
+                    # 合并增量结果：统计与上次数据相比的变化，并保存本次用到的页面指纹
+                    if page_cache is not None:
+                        for key, value in page_cache.stats().items():
+                            incremental_stats[key] += value
+                        for key, value in invitee_diff.items():
+                            incremental_stats[f"invitees_{key}"] += value
+                        self.data_manager.save_page_cache(site_name, page_cache.export())
+
+                    # 保存站点数据 (批量模式下仅更新内存)
                     self.data_manager.update_site_data(site_name, site_data)
                     success_count += 1
             
+            if not self.data_manager.commit_batch():
+                logger.error("写入站点数据失败，本次刷新结果未能保存")
+            if self._identity_cache and self._identity_cache.dirty:
+                self.data_manager.save_identities(self._identity_cache.export())
+            if self._staleness and self._staleness.dirty:
+                self.data_manager.save_schedule(self._staleness.export())
+            if self._metrics_store and self._metrics_store.dirty:
+                self.data_manager.save_metrics(self._metrics_store.export())
+            
             # 发送通知
-            if self._notify:
+            if self._notify and (error_count > 0 or not notify_on_error_only):
                 self._send_refresh_notification(success_count, error_count, error_details)
             
-            logger.info(f"增量刷新完成: 成功 {success_count} 个站点, 失败 {error_count} 个站点")
+            total_elapsed = round(time.monotonic() - refresh_start, 2)
+            logger.info(f"增量刷新完成: 成功 {success_count} 个站点, 失败 {error_count} 个站点, 总耗时 {total_elapsed} 秒")
+            
+            # 记录耗时最长的站点，便于定位拖慢刷新的站点
+            slowest_sites = sorted(site_timings.items(), key=lambda x: x[1], reverse=True)[:3]
+            if slowest_sites:
+                logger.info("耗时最长的站点: " + ", ".join(f"{name}({cost}秒)" for name, cost in slowest_sites))
+                for name, _ in slowest_sites:
+                    metrics = site_metrics.get(name)
+                    if not metrics:
+                        continue
+                    stages = sorted(metrics["stages"].items(), key=lambda x: x[1]["avg_ms"] * x[1]["requests"],
+                                    reverse=True)
+                    logger.info(f"站点 {name}: 请求 {metrics['requests']} 次，{metrics['bytes']} 字节，"
+                                f"网络 {metrics['network_ms']}ms，解析 {metrics['parse_ms']}ms，"
+                                f"耗时最多的阶段: " + ", ".join(
+                                    f"{stage_label(stage)}({item['requests']}次, 平均{item['avg_ms']}ms)"
+                                    for stage, item in stages[:3]))
+            
+            connection_stats = None
+            if self._session_pool:
+                connection_stats = SessionPool.diff(pool_stats_before, self._session_pool.stats())
+                logger.info(f"连接复用: 请求 {connection_stats['requests']} 次，"
+                            f"新建连接 {connection_stats['connections']} 个，"
+                            f"复用率 {connection_stats['reuse_rate']:.0%}")
             
-            return {"success": success_count, "error": error_count}
+            circuits = self._health_tracker.open_circuits() if self._health_tracker else {}
+            if circuits:
+                logger.warning("熔断中的主机: " + ", ".join(
+                    f"{host}(连续失败 {status['consecutive_failures']} 次)" for host, status in circuits.items()))
+            
+            if self._incremental:
+                logger.info(f"增量刷新: 重新解析 {incremental_stats['pages_reprocessed']} 页"
+                            f"（{incremental_stats['invitees_reprocessed']} 人），"
+                            f"复用 {incremental_stats['pages_reused']} 页"
+                            f"（{incremental_stats['invitees_reused']} 人），"
+                            f"新增 {incremental_stats['invitees_added']} 人，"
+                            f"移除 {incremental_stats['invitees_removed']} 人，"
+                            f"变化 {incremental_stats['invitees_changed']} 人")
+            
+            return {
+                "success": success_count,
+                "error": error_count,
+                "elapsed": total_elapsed,
+                "timings": site_timings,
+                "incremental": incremental_stats if self._incremental else None,
+                "connections": connection_stats,
+                "circuits": circuits,
+                "metrics": site_metrics
+            }
             
         finally:
+            # 异常退出时也尽量保存已成功站点的数据
+            if self.data_manager:
+                self.data_manager.commit_batch()
             # 清除刷新标志
             self._refreshing = False
     
+    def refresh_due_sites(self) -> Dict[str, Any]:
+        """
+        按需刷新：只刷新数据已过期的站点，每次最多一批
+        """
+        if not self._staleness:
+            return {"success": 0, "error": 0, "message": "刷新调度未初始化"}
+        site_names = [site.get("name", "") for site in self._get_indexer_snapshot().select(self._nexus_sites)]
+        self._staleness.seed(self.data_manager.get_site_update_times())
+        due_sites = self._staleness.due_sites(site_names)
+        if not due_sites:
+            next_due = self._staleness.next_due(site_names)
+            if next_due:
+                logger.debug(f"没有需要刷新的站点，最早的站点将于 {SiteHelper.format_timestamp(next_due)} 到期")
+            return {"success": 0, "error": 0, "message": "没有需要刷新的站点"}
+        logger.info(f"按需刷新 {len(due_sites)} 个到期站点: {', '.join(due_sites)}")
+        return self.refresh_all_sites(site_names=due_sites, notify_on_error_only=True)
+
     def _send_refresh_notification(self, success_count, error_count,error_details:List=None):
         """
         发送刷新结果通知
         """
         try:
-            # 从data_manager获取站点数据
-            cached_data = {}
-            site_data = self.data_manager.get_site_data()
-            for site_name, site_info in site_data.items():
-                cached_data[site_name] = site_info
-                
-            # 计算所有站点统计信息
-            total_invitees = 0
-            total_low_ratio = 0
-            total_banned = 0
-            total_no_data = 0
+            # 从索引读取各站点统计摘要
+            summaries = self.data_manager.get_site_summaries()
+            for site_name, site_summary in summaries.items():
+                logger.info(f"站点 {site_name} 统计结果: 总人数={site_summary.invitee_count}, "
+                            f"低分享率={site_summary.low_ratio_count}, 已禁用={site_summary.banned_count}, "
+                            f"无数据={site_summary.no_data_count}")
 
-            for site_name, cache in cached_data.items():
-                site_cache_data = cache.get("data", {})
-                invitees = []
-                
-                # 尝试不同的数据结构路径获取邀请列表
-                possible_paths = [
-                    ["invitees"],
-                    ["data", "invitees"],
-                    ["data", "data", "invitees"]
-                ]
-                
-                for path in possible_paths:
-                    result = get_nested_value(site_cache_data, path, [])
-                    if result:
-                        invitees = result
-                        break
-
-                # 统计各项数据
-                total_invitees += len(invitees)
-
-                # 统计用户状态 - 使用ratio_health字段
-                banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-                low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') in ['warning', 'danger'])
-                no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
-
-                # 累加到总数
-                total_banned += banned_count
-                total_low_ratio += low_ratio_count
-                total_no_data += no_data_count
-
-                logger.info(f"站点 {site_name} 统计结果: 总人数={len(invitees)}, 低分享率={low_ratio_count}, 已禁用={banned_count}, 无数据={no_data_count}")
+            # 计算所有站点统计信息
+            totals = self._sum_site_summaries(summaries.values())
+            total_invitees = totals["invitee_count"]
+            total_low_ratio = totals["low_ratio_count"]
+            total_banned = totals["banned_count"]
+            total_no_data = totals["no_data_count"]
             
             title = "后宫管理系统 - 增量刷新结果"
             if success_count > 0 or error_count > 0:
@@ -3777,6 +4070,15 @@ class nexusinvitee(_PluginBase):
         """
         注册插件公共服务
         """
+        if self._enabled and self._smart_schedule:
+            # 按需刷新：定期检查各站点是否到期，到期的站点分批刷新
+            return [{
+                "id": "nexusinvitee",
+                "name": "后宫管理系统",
+                "trigger": IntervalTrigger(minutes=15),
+                "func": self.refresh_due_sites,
+                "kwargs": {}
+            }]
         if self._enabled and self._cron:
             try:
                 # 检查是否为5位cron表达式
@@ -3803,7 +4105,9 @@ class nexusinvitee(_PluginBase):
         """
         return {
             "/get_invitees": {"func": nexusinvitee.get_invitees, "methods": ["GET"], "desc": "获取所有站点邀请数据"},
-            "/refresh": {"func": nexusinvitee.refresh_data, "methods": ["GET"], "desc": "强制刷新站点数据"}
+            "/invitees": {"func": nexusinvitee.query_invitees, "methods": ["GET"], "desc": "分页查询后宫成员"},
+            "/refresh": {"func": nexusinvitee.refresh_data, "methods": ["GET"], "desc": "强制刷新站点数据"},
+            "/metrics": {"func": nexusinvitee.get_metrics, "methods": ["GET"], "desc": "获取站点刷新指标"}
         }
 
     def update_config(self, request: dict) -> Response:
@@ -3814,8 +4118,15 @@ class nexusinvitee(_PluginBase):
             # 读取配置
             self._enabled = request.get("enabled", False)
             self._notify = request.get("notify", False)
+            self._incremental = request.get("incremental", True)
+            self._async_crawl = request.get("async_crawl", False)
             self._cron = request.get("cron", "0 9 * * *")
+            self._smart_schedule = request.get("smart_schedule", False)
+            self._refresh_ttl = self._parse_refresh_ttl(request.get("refresh_ttl"))
             self._onlyonce = request.get("onlyonce", False)
+            self._max_workers = self._parse_max_workers(request.get("max_workers"))
+            if self._staleness:
+                self._staleness.set_base_ttl(self._refresh_ttl * 3600)
             
             # 获取选中站点列表
             self._nexus_sites = []
@@ -3840,8 +4151,8 @@ class nexusinvitee(_PluginBase):
             if self._onlyonce:
                 try:
                     # 定时服务
-                    if hasattr(self, '_scheduler') and self._scheduler:
-                        self.stop_service()  # 先停止已有服务
+                    # 只停止已有的定时服务，连接池和异步抓取器仍供之后的刷新使用
+                    self._stop_scheduler()
                     
                     self._scheduler = BackgroundScheduler(timezone=settings.TZ)
                     logger.debug("立即运行一次开关被打开，将在3秒后执行刷新")
@@ -3874,15 +4185,35 @@ class nexusinvitee(_PluginBase):
         """
         计算用户统计数据
         """
-        banned_count = sum(1 for i in invitees if i.get('enabled', '').lower() == 'no')
-        low_ratio_count = sum(1 for i in invitees if i.get('ratio_health') in ['warning', 'danger'])
-        no_data_count = sum(1 for i in invitees if i.get('ratio_health') == 'neutral')
+        site_summary = SiteSummary.from_site_data({"invitees": invitees})
 
         return {
-            'banned': banned_count,
-            'low_ratio': low_ratio_count,
-            'no_data': no_data_count
+            'banned': site_summary.banned_count,
+            'low_ratio': site_summary.low_ratio_count,
+            'no_data': site_summary.no_data_count
+        }
+
+    @staticmethod
+    def _sum_site_summaries(summaries) -> Dict[str, int]:
+        """
+        汇总多个站点的统计摘要
+        :param summaries: 站点统计摘要，允许包含None
+        :return: {字段名: 合计}
+        """
+        totals = {
+            "invitee_count": 0,
+            "banned_count": 0,
+            "low_ratio_count": 0,
+            "no_data_count": 0,
+            "permanent_count": 0,
+            "temporary_count": 0
         }
+        for site_summary in summaries:
+            if not site_summary:
+                continue
+            for key in totals:
+                totals[key] += getattr(site_summary, key)
+        return totals
 
     def get_config(self, apikey: str) -> Response:
         """
@@ -3896,8 +4227,13 @@ class nexusinvitee(_PluginBase):
             config = {
                 "enabled": self._enabled,
                 "notify": self._notify,
+                "incremental": self._incremental,
+                "async_crawl": self._async_crawl,
                 "cron": self._cron,
+                "smart_schedule": self._smart_schedule,
+                "refresh_ttl": self._refresh_ttl,
                 "onlyonce": self._onlyonce,
+                "max_workers": self._max_workers,
                 "site_ids": self._nexus_sites
             }
             return Response(success=True, message="获取成功", data=config)
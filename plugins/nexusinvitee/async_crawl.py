@@ -0,0 +1,226 @@
+"""
+异步抓取模块
+在共享的事件循环上执行站点处理器，异步处理器的翻页请求在同一个事件循环中多路复用，
+同步处理器通过线程池适配执行，两者可以混合使用
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Any, Awaitable, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from app.log import logger
+from plugins.nexusinvitee.site_health import CircuitOpenError, SiteHealthTracker
+
+# httpx为可选依赖，未安装时所有处理器都通过线程池以同步方式执行
+try:
+    import httpx
+    HAS_HTTPX = True
+except ImportError:
+    httpx = None
+    HAS_HTTPX = False
+
+
+class AsyncSession:
+    """
+    绑定到单个站点的异步请求会话
+    请求头（含Cookie）取自已配置好的同步会话，底层连接由抓取器的共享客户端复用
+    """
+
+    def __init__(self, crawler: "AsyncCrawler", sync_session: requests.Session, max_concurrency: int = 3,
+                 tracker: Optional[SiteHealthTracker] = None):
+        """
+        初始化异步会话
+        :param crawler: 异步抓取器
+        :param sync_session: 已配置好请求头的同步会话，同步处理器和未迁移的请求继续使用
+        :param max_concurrency: 同一站点的最大并发请求数
+        :param tracker: 站点健康跟踪器
+        """
+        self.crawler = crawler
+        self.sync_session = sync_session
+        self.headers = dict(sync_session.headers)
+        self.tracker = tracker
+        self.max_concurrency = max_concurrency
+        # 信号量在事件循环线程中首次请求时创建
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def _to_httpx_timeout(timeout: Any):
+        # requests 的 (连接超时, 读取超时) 转换为 httpx 的超时配置
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return timeout
+
+    async def get(self, url: str, timeout: Any = (10, 30), headers: Optional[Dict[str, str]] = None):
+        """
+        发送GET请求
+        :param url: 请求URL
+        :param timeout: 超时，与 requests 相同的格式
+        :param headers: 额外的请求头
+        :return: httpx 响应对象，具有 status_code、headers、text 等与 requests 相同的属性
+        """
+        host = urlparse(url).netloc.lower()
+        if self.tracker:
+            allowed, remaining = self.tracker.allow(host)
+            if not allowed:
+                raise CircuitOpenError(f"{host} 连续请求失败已熔断，{remaining} 秒后重试")
+            timeout = self.tracker.timeout(host, timeout)
+
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                response = await self.crawler.client.get(url, headers={**self.headers, **(headers or {})},
+                                                         timeout=self._to_httpx_timeout(timeout))
+            except httpx.TransportError as e:
+                if self.tracker:
+                    self.tracker.record_failure(host, type(e).__name__)
+                raise
+        elapsed = time.monotonic() - start
+        if self.tracker:
+            if response.status_code >= 500:
+                self.tracker.record_failure(host, f"HTTP {response.status_code}")
+            else:
+                self.tracker.record_success(host, elapsed)
+        # 与同步会话共用请求记录器
+        recorder = getattr(self.sync_session, "recorder", None)
+        if recorder:
+            recorder.record(url, elapsed, len(response.content))
+        return response
+
+    async def run_sync(self, func: Callable[..., Any], *args) -> Any:
+        """
+        在线程池中执行不会等待事件循环的同步函数，如页面解析
+        :param func: 同步函数
+        :return: 函数返回值
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.crawler.executor, func, *args)
+
+    async def run_handler(self, func: Callable[..., Any], *args) -> Any:
+        """
+        在处理器线程池中执行同步处理器，处理器内部可以通过 crawler.run() 等待异步请求
+        :param func: 同步函数
+        :return: 函数返回值
+        """
+        return await asyncio.get_running_loop().run_in_executor(self.crawler.handler_executor, func, *args)
+
+
+class AsyncCrawler:
+    """
+    共享事件循环和异步HTTP客户端，插件运行期间跨刷新保留
+
+    事件循环运行在独立的后台线程中，刷新线程通过 run() 提交协程并等待结果。
+    """
+
+    def __init__(self, max_connections: int = 64, max_sync_workers: int = 8, run_timeout: float = 600):
+        """
+        初始化异步抓取器
+        :param max_connections: 共享客户端的最大连接数，所有站点共用
+        :param max_sync_workers: 执行同步处理器的线程数
+        :param run_timeout: run() 默认的等待超时秒数
+        """
+        self.max_connections = max_connections
+        self.run_timeout = run_timeout
+        # 同步处理器可能阻塞等待事件循环中的请求，与页面解析使用不同的线程池，避免互相占满导致死锁
+        self.handler_executor = ThreadPoolExecutor(max_workers=max_sync_workers,
+                                                   thread_name_prefix="nexusinvitee-handler")
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="nexusinvitee-parse")
+        self.client = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """
+        是否可以使用异步请求
+        """
+        return HAS_HTTPX
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="nexusinvitee-loop", daemon=True)
+                self._thread.start()
+                if HAS_HTTPX:
+                    # 客户端需要在事件循环线程中创建
+                    asyncio.run_coroutine_threadsafe(self._create_client(), self._loop).result()
+            return self._loop
+
+    async def _create_client(self):
+        self.client = httpx.AsyncClient(
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_connections // 2))
+
+    def run(self, coro: Awaitable, timeout: Optional[float] = None) -> Any:
+        """
+        在共享事件循环中执行协程并等待结果，不能在事件循环线程中调用
+        超时后取消协程并抛出 TimeoutError；抓取器关闭时未完成的协程被取消，抛出 CancelledError
+        :param coro: 协程
+        :param timeout: 等待超时秒数，默认为 run_timeout
+        :return: 协程返回值
+        """
+        loop = self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            return future.result(self.run_timeout if timeout is None else timeout)
+        except FuturesTimeoutError:
+            future.cancel()
+            raise
+
+    def session(self, sync_session: requests.Session, tracker: Optional[SiteHealthTracker] = None,
+                max_concurrency: int = 3) -> AsyncSession:
+        """
+        为站点创建异步会话
+        :param sync_session: 已配置好请求头的同步会话
+        :param tracker: 站点健康跟踪器
+        :param max_concurrency: 同一站点的最大并发请求数
+        :return: 异步会话
+        """
+        self._ensure_loop()
+        return AsyncSession(self, sync_session, max_concurrency=max_concurrency, tracker=tracker)
+
+    def parse_invite_page(self, handler, site_info: Dict[str, Any], session: AsyncSession) -> Dict[str, Any]:
+        """
+        通过处理器的异步接口解析站点，未实现异步接口的处理器在线程池中执行同步接口
+        :param handler: 站点处理器
+        :param site_info: 站点信息
+        :param session: 异步会话
+        :return: 解析结果
+        """
+        return self.run(handler.parse_invite_page_async(site_info, session))
+
+    async def _shutdown(self):
+        # 取消仍在执行的协程并等待其结束，run() 的调用方随即返回，不会一直阻塞
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self.client is not None:
+            await self.client.aclose()
+
+    def close(self):
+        """
+        取消未完成的请求，关闭客户端、事件循环和线程池
+        """
+        with self._lock:
+            loop, self._loop = self._loop, None
+        if loop:
+            try:
+                asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(10)
+            except Exception as e:
+                logger.warning(f"关闭异步客户端失败: {str(e)}")
+            loop.call_soon_threadsafe(loop.stop)
+            if self._thread:
+                self._thread.join(timeout=10)
+            loop.close()
+            self.client = None
+        self.handler_executor.shutdown(wait=False)
+        self.executor.shutdown(wait=False)
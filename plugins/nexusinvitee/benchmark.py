@@ -0,0 +1,625 @@
+"""
+离线基准测试模块
+使用保存到本地的站点页面评估解析性能，不访问真实站点
+
+用法:
+    python -m plugins.nexusinvitee.benchmark parse <页面目录> [--rounds N]
+    python -m plugins.nexusinvitee.benchmark run <用例目录> [--rounds N] [--mode sync|async|both]
+    python -m plugins.nexusinvitee.benchmark stream <页面目录> [--rounds N] [--drain-limit 字节数]
+    python -m plugins.nexusinvitee.benchmark keepalive <用例目录> [--rounds N] [--tls] [--certfile F --keyfile F]
+                                                                [--drain-limit 字节数]
+
+run 子命令的用例目录中每个子目录是一个用例:
+    <用例>/site.json                          站点信息，"handler" 指定处理器类名，其余字段作为 site_info
+    <用例>/usercp.php.html                    按请求路径保存的页面
+    <用例>/invite.php.html
+    <用例>/invite.php@menu=invitee&page=1.html  带查询参数的页面，参数按名称排序，忽略 id
+    <用例>/invite.php@type=new.html
+    <用例>/mybonus.php.html
+    <用例>/api/member/profile.json            M-Team 等API站点的接口响应
+
+插件目录下的 benchmark_cases 是匿名化的示例用例（带翻页的NexusPHP站点，以及 butterfly、hhclub、xiangdao、
+hdkylin、mteam 处理器各一个），可直接作为 run 和 keepalive 的用例目录，nexusphp_pager 也可作为 stream 的页面目录
+
+keepalive 子命令使用同样的用例，对比每次刷新新建会话与使用连接池时替身服务器接受的连接数、耗时和读取字节数，
+--tls 时替身服务器使用HTTPS（未指定证书时通过 openssl 生成临时自签名证书），以体现TLS握手的开销；
+--drain-limit 指定流式读取翻页时为复用连接继续读完的剩余字节数上限，用于比较节省的流量与重新握手的耗时
+"""
+import argparse
+import functools
+import json
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlparse, urlunparse
+
+import requests
+from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+
+from plugins.nexusinvitee.async_crawl import AsyncCrawler
+from plugins.nexusinvitee.metrics import RequestRecorder, stage_label
+from plugins.nexusinvitee.module_loader import ModuleLoader
+from plugins.nexusinvitee.session_pool import SessionPool
+from plugins.nexusinvitee.sites import _ISiteHandler, HTML_PARSER
+from plugins.nexusinvitee.streaming import DEFAULT_DRAIN_LIMIT, fetch_until_table_end
+
+
+def _time_call(func: Callable[[], object], rounds: int) -> float:
+    """
+    多次执行并返回平均耗时
+    :param func: 待测函数
+    :param rounds: 执行次数
+    :return: 平均耗时(毫秒)
+    """
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+
+def _load_pages(fixture_dir: str) -> Dict[str, str]:
+    """
+    读取目录下所有保存的HTML页面
+    :param fixture_dir: 页面目录
+    :return: {相对路径: HTML内容}
+    """
+    pages = {}
+    for root, _, files in os.walk(fixture_dir):
+        for file_name in sorted(files):
+            if not file_name.endswith((".html", ".htm")):
+                continue
+            file_path = os.path.join(root, file_name)
+            with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                pages[os.path.relpath(file_path, fixture_dir)] = f.read()
+    return pages
+
+
+def benchmark_parse(fixture_dir: str, rounds: int = 20) -> List[Dict[str, object]]:
+    """
+    对比 html.parser 全量解析、共享解析层全量解析和只解析表格三种方式的耗时
+    :param fixture_dir: 页面目录
+    :param rounds: 每个页面每种方式的执行次数
+    :return: 每个页面的测试结果
+    """
+    results = []
+    for name, html in _load_pages(fixture_dir).items():
+        baseline = _time_call(lambda: BeautifulSoup(html, "html.parser"), rounds)
+        shared = _time_call(lambda: _ISiteHandler._parse_html(html), rounds)
+        tables_only = _time_call(lambda: _ISiteHandler._parse_html(html, only_tables=True), rounds)
+        results.append({
+            "page": name,
+            "size_kb": round(len(html.encode("utf-8")) / 1024, 1),
+            "html_parser_ms": round(baseline, 2),
+            "shared_ms": round(shared, 2),
+            "tables_only_ms": round(tables_only, 2),
+            "speedup": round(baseline / tables_only, 2) if tables_only else 0
+        })
+    return results
+
+
+def _print_parse_results(results: List[Dict[str, object]]):
+    """
+    打印解析测试结果
+    :param results: benchmark_parse 的返回值
+    """
+    print(f"共享解析层使用的解析器: {HTML_PARSER}")
+    print(f"{'页面':<40}{'大小KB':>10}{'html.parser':>14}{'共享解析':>12}{'仅表格':>10}{'加速比':>10}")
+    for item in results:
+        print(f"{item['page']:<40}{item['size_kb']:>10}{item['html_parser_ms']:>14}"
+              f"{item['shared_ms']:>12}{item['tables_only_ms']:>10}{item['speedup']:>10}")
+
+
+def _fixture_key(path: str, query: str) -> str:
+    """
+    将请求路径和查询参数转换为用例文件名（不含扩展名）
+    :param path: 请求路径
+    :param query: 查询字符串
+    :return: 文件名
+    """
+    path = path.lstrip("/") or "index.php"
+    params = sorted((k, v) for k, v in parse_qsl(query, keep_blank_values=True) if k not in ("id", "userid"))
+    if params:
+        return path + "@" + "&".join(f"{k}={v}" for k, v in params)
+    return path
+
+
+class _FixtureRequestHandler(BaseHTTPRequestHandler):
+    """
+    从用例目录返回保存的页面，找不到对应文件时返回404
+    """
+    fixture_dir = ""
+    # 使用HTTP/1.1以支持keep-alive，与真实站点行为一致
+    protocol_version = "HTTP/1.1"
+    # 响应头和正文分开写入，不关闭Nagle算法时本地回环上每个响应会因延迟确认多等待约40ms
+    disable_nagle_algorithm = True
+
+    def _serve(self):
+        parsed = urlparse(self.path)
+        key = _fixture_key(unquote(parsed.path), parsed.query)
+        candidates = [key, key.split("@")[0]]
+        for candidate in candidates:
+            for ext, content_type in ((".html", "text/html; charset=utf-8"), (".json", "application/json")):
+                file_path = os.path.join(self.fixture_dir, candidate + ext)
+                if os.path.isfile(file_path):
+                    with open(file_path, "rb") as f:
+                        body = f.read()
+                    self.send_response(200)
+                    self.send_header("Content-Type", content_type)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+        self.send_error(404)
+
+    def do_GET(self):
+        self._serve()
+
+    def do_POST(self):
+        # 读取并丢弃请求体，保持连接可复用
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self._serve()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingHTTPServer(ThreadingHTTPServer):
+    """
+    记录接受的连接数，可选使用TLS
+    """
+    daemon_threads = True
+
+    def __init__(self, server_address, handler_class, ssl_context: Optional[ssl.SSLContext] = None):
+        super().__init__(server_address, handler_class)
+        self.ssl_context = ssl_context
+        self.connections = 0
+        self._count_lock = threading.Lock()
+
+    def handle_error(self, request, client_address):
+        # 流式读取提前关闭连接时服务端写入失败，属于预期情况，不打印异常
+        if isinstance(sys.exc_info()[1], (ConnectionError, ssl.SSLError)):
+            return
+        super().handle_error(request, client_address)
+
+    def get_request(self):
+        sock, address = super().get_request()
+        with self._count_lock:
+            self.connections += 1
+        if self.ssl_context:
+            sock = self.ssl_context.wrap_socket(sock, server_side=True)
+        return sock, address
+
+
+class FixtureServer:
+    """
+    本地替身HTTP服务器
+    """
+
+    def __init__(self, fixture_dir: str, ssl_context: Optional[ssl.SSLContext] = None):
+        handler_class = type("FixtureHandler", (_FixtureRequestHandler,), {"fixture_dir": fixture_dir})
+        self.httpd = _CountingHTTPServer(("127.0.0.1", 0), handler_class, ssl_context)
+        scheme = "https" if ssl_context else "http"
+        self.base_url = f"{scheme}://127.0.0.1:{self.httpd.server_address[1]}/"
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def connections(self) -> int:
+        """
+        已接受的连接数，即客户端的TCP（及TLS）握手次数
+        """
+        return self.httpd.connections
+
+    def __enter__(self) -> "FixtureServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _LocalRedirectAdapter(HTTPAdapter):
+    """
+    将请求重定向到本地替身服务器，用于处理器自行拼接的绝对地址（如 M-Team API 域名）
+    """
+
+    def __init__(self, base_url: str, **kwargs):
+        super().__init__(**kwargs)
+        self._base = urlparse(base_url)
+
+    def send(self, request, **kwargs):
+        parsed = urlparse(request.url)
+        request.url = urlunparse((self._base.scheme, self._base.netloc) + tuple(parsed[2:]))
+        return super().send(request, **kwargs)
+
+
+class _RecordingSession(requests.Session):
+    """
+    记录每个请求耗时和阶段的会话，与插件刷新时的连接池会话使用相同的记录方式
+    异步会话和流式读取通过 recorder 属性记录到同一个记录器
+    """
+
+    def __init__(self, recorder: RequestRecorder):
+        super().__init__()
+        self.recorder = recorder
+
+    def request(self, method, url, *args, **kwargs):
+        start = time.perf_counter()
+        response = super().request(method, url, *args, **kwargs)
+        if not kwargs.get("stream"):
+            self.recorder.record(url, time.perf_counter() - start, len(response.content))
+        return response
+
+
+def _find_handler(handler_name: Optional[str], site_url: str) -> Optional[_ISiteHandler]:
+    """
+    按类名或站点URL获取处理器实例
+    :param handler_name: 处理器类名
+    :param site_url: 站点URL
+    :return: 处理器实例
+    """
+    registry = ModuleLoader.get_registry()
+    if handler_name:
+        for handler_class in registry.handlers:
+            if handler_class.__name__ == handler_name:
+                return handler_class()
+        return None
+    return registry.get_handler(site_url) or registry.get_generic_handler()
+
+
+def _prepare_case(case_dir: str, base_url: str) -> Tuple[Dict[str, Any], Optional[str], Optional[_ISiteHandler]]:
+    """
+    读取用例的站点信息并查找处理器
+    :param case_dir: 用例目录
+    :param base_url: 替身服务器地址
+    :return: (站点信息, 指定的处理器类名, 处理器实例)
+    """
+    site_file = os.path.join(case_dir, "site.json")
+    site_config = {}
+    if os.path.isfile(site_file):
+        with open(site_file, "r", encoding="utf-8") as f:
+            site_config = json.load(f)
+
+    site_info = {
+        "name": os.path.basename(case_dir.rstrip(os.sep)),
+        "cookie": "uid=1; pass=benchmark",
+        "ua": "Mozilla/5.0 (benchmark)",
+        "apikey": "benchmark",
+        "token": "benchmark",
+        **{k: v for k, v in site_config.items() if k != "handler"},
+        "url": base_url,
+    }
+    handler_name = site_config.get("handler")
+    return site_info, handler_name, _find_handler(handler_name, site_config.get("match_url") or base_url)
+
+
+def run_case(case_dir: str, rounds: int = 1, crawler: Optional[AsyncCrawler] = None) -> Dict[str, Any]:
+    """
+    使用本地替身服务器端到端运行一个用例
+    :param case_dir: 用例目录
+    :param rounds: 执行次数
+    :param crawler: 异步抓取器，指定时通过处理器的异步接口运行
+    :return: 测试结果
+    """
+    with FixtureServer(case_dir) as server:
+        site_info, handler_name, handler = _prepare_case(case_dir, server.base_url)
+        if not handler:
+            return {"case": site_info["name"], "error": f"未找到处理器 {handler_name}"}
+
+        total_time = 0.0
+        recorder = RequestRecorder()
+        handler.recorder = recorder
+        result = {}
+        for _ in range(rounds):
+            session = _RecordingSession(recorder)
+            session.mount("https://", _LocalRedirectAdapter(server.base_url))
+            session.headers.update({"User-Agent": site_info["ua"], "Cookie": site_info["cookie"]})
+            start = time.perf_counter()
+            if crawler:
+                async_session = crawler.session(session, max_concurrency=handler.max_page_workers)
+                result = crawler.parse_invite_page(handler, site_info, async_session)
+            else:
+                result = handler.parse_invite_page(site_info, session)
+            total_time += time.perf_counter() - start
+            session.close()
+
+    summary = recorder.summary(total_time, rounds)
+    return {
+        "case": site_info["name"],
+        "handler": type(handler).__name__,
+        "mode": "async" if crawler else "sync",
+        "rounds": rounds,
+        "invitees": len(result.get("invitees", [])),
+        "reason": result.get("invite_status", {}).get("reason", ""),
+        "pages_per_sec": round(len(recorder.records) / total_time, 1) if total_time else 0,
+        **summary,
+    }
+
+
+def run_cases(cases_dir: str, rounds: int = 1, mode: str = "sync") -> List[Dict[str, Any]]:
+    """
+    运行目录下的所有用例
+    :param cases_dir: 用例根目录
+    :param rounds: 每个用例的执行次数
+    :param mode: sync 使用同步接口，async 使用异步接口，both 两者都运行以便对比结果
+    :return: 测试结果列表
+    """
+    crawler = AsyncCrawler() if mode in ("async", "both") else None
+    results = []
+    try:
+        for name in sorted(os.listdir(cases_dir)):
+            case_dir = os.path.join(cases_dir, name)
+            if not os.path.isdir(case_dir):
+                continue
+            if mode in ("sync", "both"):
+                results.append(run_case(case_dir, rounds))
+            if crawler:
+                results.append(run_case(case_dir, rounds, crawler))
+    finally:
+        if crawler:
+            crawler.close()
+    return results
+
+
+def _print_run_results(results: List[Dict[str, Any]]):
+    """
+    打印端到端测试结果
+    :param results: run_cases 的返回值
+    """
+    invitee_counts: Dict[str, int] = {}
+    for item in results:
+        if item.get("error"):
+            print(f"[{item['case']}] {item['error']}")
+            continue
+        # both 模式下同一用例的同步和异步结果应当一致
+        if invitee_counts.setdefault(item["case"], item["invitees"]) != item["invitees"]:
+            print(f"[{item['case']}] 警告: 同步与异步接口解析到的后宫成员数不一致 "
+                  f"({invitee_counts[item['case']]} != {item['invitees']})")
+        print(f"[{item['case']}] {item['handler']}({item['mode']}) 后宫成员: {item['invitees']} 请求数: {item['requests']} "
+              f"页面/秒: {item['pages_per_sec']} 总耗时: {item['total_ms']}ms "
+              f"(网络 {item['network_ms']}ms, 解析 {item['parse_ms']}ms)")
+        if item.get("reason"):
+            print(f"    邀请状态: {item['reason']}")
+        for stage, stat in sorted(item["stages"].items()):
+            print(f"    {stage_label(stage):<32} 请求 {stat['requests']:>3}  平均 {stat['avg_ms']:>8}ms  "
+                  f"最长 {stat['max_ms']:>8}ms  {stat['bytes']:>9} 字节")
+
+
+def _make_ssl_context(certfile: Optional[str], keyfile: Optional[str], work_dir: str) -> ssl.SSLContext:
+    """
+    创建替身服务器使用的TLS上下文，未指定证书时使用 openssl 生成临时自签名证书
+    :param certfile: 证书文件
+    :param keyfile: 私钥文件
+    :param work_dir: 临时证书存放目录
+    :return: TLS上下文
+    """
+    if not certfile:
+        certfile = os.path.join(work_dir, "cert.pem")
+        keyfile = os.path.join(work_dir, "key.pem")
+        subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                        "-subj", "/CN=127.0.0.1", "-keyout", keyfile, "-out", certfile],
+                       check=True, capture_output=True)
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile, keyfile)
+    return context
+
+
+def benchmark_stream(fixture_dir: str, rounds: int = 5,
+                     drain_limit: int = DEFAULT_DRAIN_LIMIT) -> List[Dict[str, Any]]:
+    """
+    对比完整下载与流式读取到后宫成员表格结束的下载字节数、连接数和获取+解析耗时
+    :param fixture_dir: 保存的后宫成员翻页页面目录
+    :param rounds: 每个页面每种方式的执行次数
+    :param drain_limit: 流式读取时为复用连接继续读完的剩余字节数上限
+    :return: 每个页面的测试结果
+    """
+    handler = ModuleLoader.get_registry().get_generic_handler()
+    pages = [name for name in _load_pages(fixture_dir) if name.endswith(".html")]
+    results = []
+    with FixtureServer(fixture_dir) as server, requests.Session() as session:
+        for name in pages:
+            url = server.base_url + quote(name[:-len(".html")])
+
+            def _full():
+                response = session.get(url, timeout=(10, 30))
+                start = time.perf_counter()
+                parsed = handler._parse_nexusphp_invite_page(name, response.text, is_next_page=True)
+                return len(response.content), time.perf_counter() - start, len(parsed["invitees"]), False
+
+            def _streamed():
+                response = fetch_until_table_end(session, url, drain_limit=drain_limit, timeout=(10, 30))
+                start = time.perf_counter()
+                parsed = handler._parse_nexusphp_invite_page(name, response.text, is_next_page=True)
+                return response.wire_bytes, time.perf_counter() - start, len(parsed["invitees"]), response.truncated
+
+            item: Dict[str, Any] = {"page": name}
+            for mode, func in (("full", _full), ("stream", _streamed)):
+                connections = server.connections
+                start = time.perf_counter()
+                parse_time = 0.0
+                for _ in range(rounds):
+                    size, elapsed, invitees, truncated = func()
+                    parse_time += elapsed
+                item[mode] = {
+                    "bytes": size,
+                    "total_ms": round((time.perf_counter() - start) * 1000 / rounds, 2),
+                    "parse_ms": round(parse_time * 1000 / rounds, 2),
+                    "invitees": invitees,
+                    "truncated": truncated,
+                    "connections": server.connections - connections,
+                }
+            results.append(item)
+    return results
+
+
+def _print_stream_results(results: List[Dict[str, Any]]):
+    """
+    打印流式读取测试结果
+    :param results: benchmark_stream 的返回值
+    """
+    print(f"{'页面':<40}{'完整字节':>10}{'流式字节':>10}{'完整解析ms':>12}{'流式解析ms':>12}"
+          f"{'完整总ms':>10}{'流式总ms':>10}{'完整连接':>10}{'流式连接':>10}{'成员数':>8}")
+    for item in results:
+        full, stream = item["full"], item["stream"]
+        invitees = str(full["invitees"]) if full["invitees"] == stream["invitees"] \
+            else f"{full['invitees']}!={stream['invitees']}"
+        print(f"{item['page']:<40}{full['bytes']:>10}{stream['bytes']:>10}{full['parse_ms']:>12}"
+              f"{stream['parse_ms']:>12}{full['total_ms']:>10}{stream['total_ms']:>10}"
+              f"{full['connections']:>10}{stream['connections']:>10}{invitees:>8}"
+              f"{'' if stream['truncated'] else '  (未找到后宫成员表格，已完整读取)'}")
+
+
+def _keepalive_round(handler: _ISiteHandler, site_info: Dict[str, Any], session: requests.Session) -> float:
+    """
+    使用指定会话执行一次处理器，模拟一次刷新
+    :param handler: 处理器实例
+    :param site_info: 站点信息
+    :param session: 请求会话
+    :return: 耗时(秒)
+    """
+    # 替身服务器使用自签名证书；不读取环境变量，否则 REQUESTS_CA_BUNDLE 等设置会覆盖 verify=False
+    session.verify = False
+    session.trust_env = False
+    session.headers.update({"User-Agent": site_info["ua"], "Cookie": site_info["cookie"]})
+    start = time.perf_counter()
+    handler.parse_invite_page(site_info, session)
+    return time.perf_counter() - start
+
+
+def benchmark_keepalive(case_dir: str, rounds: int = 5, ssl_context: Optional[ssl.SSLContext] = None,
+                        drain_limit: int = DEFAULT_DRAIN_LIMIT) -> Dict[str, Any]:
+    """
+    对比每次刷新新建会话与使用连接池时的连接数、耗时和读取字节数
+    :param case_dir: 用例目录
+    :param rounds: 模拟的刷新次数
+    :param ssl_context: 替身服务器的TLS上下文，为None时使用HTTP
+    :param drain_limit: 流式读取翻页时为复用连接继续读完的剩余字节数上限
+    :return: 测试结果
+    """
+    result = {"case": os.path.basename(case_dir.rstrip(os.sep)), "rounds": rounds}
+    for mode in ("fresh", "pooled"):
+        with FixtureServer(case_dir, ssl_context) as server:
+            site_info, handler_name, handler = _prepare_case(case_dir, server.base_url)
+            if not handler:
+                return {"case": result["case"], "error": f"未找到处理器 {handler_name}"}
+            handler.stream_drain_limit = drain_limit
+            redirect_adapter = functools.partial(_LocalRedirectAdapter, server.base_url)
+            pool = SessionPool(adapter_factory=redirect_adapter)
+            recorder = RequestRecorder()
+            total_time = 0.0
+            for _ in range(rounds):
+                if mode == "fresh":
+                    # 原有行为：每个站点每次刷新新建会话，连接随会话关闭
+                    session = _RecordingSession(recorder)
+                    session.mount("https://", redirect_adapter())
+                else:
+                    session = pool.session(site_info["url"], recorder=recorder)
+                total_time += _keepalive_round(handler, site_info, session)
+                session.close()
+            pool_stats = pool.stats()
+            pool.close()
+            result[mode] = {
+                "connections": server.connections,
+                "total_ms": round(total_time * 1000 / rounds, 2),
+                "bytes": sum(record[2] for record in recorder.records) // rounds,
+                "reused": pool_stats["reused"] if mode == "pooled" else None,
+            }
+    result["saved_connections"] = result["fresh"]["connections"] - result["pooled"]["connections"]
+    result["saved_ms"] = round(result["fresh"]["total_ms"] - result["pooled"]["total_ms"], 2)
+    return result
+
+
+def _print_keepalive_results(results: List[Dict[str, Any]]):
+    """
+    打印连接复用测试结果
+    :param results: benchmark_keepalive 的返回值列表
+    """
+    for item in results:
+        if item.get("error"):
+            print(f"[{item['case']}] {item['error']}")
+            continue
+        fresh, pooled = item["fresh"], item["pooled"]
+        print(f"[{item['case']}] 刷新 {item['rounds']} 次")
+        print(f"    新建会话  连接 {fresh['connections']:>4}  平均每次 {fresh['total_ms']:>8}ms  "
+              f"读取 {fresh['bytes']:>9} 字节")
+        print(f"    连接池    连接 {pooled['connections']:>4}  平均每次 {pooled['total_ms']:>8}ms  "
+              f"读取 {pooled['bytes']:>9} 字节  复用请求 {pooled['reused']}")
+        print(f"    节省握手 {item['saved_connections']} 次，平均每次刷新节省 {item['saved_ms']}ms")
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="后宫管理系统离线基准测试")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parse_cmd = subparsers.add_parser("parse", help="HTML解析微基准测试")
+    parse_cmd.add_argument("fixtures", help="保存的HTML页面目录")
+    parse_cmd.add_argument("--rounds", type=int, default=20, help="每个页面的执行次数")
+
+    run_cmd = subparsers.add_parser("run", help="使用本地替身服务器端到端运行站点处理器")
+    run_cmd.add_argument("cases", help="用例根目录，每个子目录是一个用例")
+    run_cmd.add_argument("--rounds", type=int, default=1, help="每个用例的执行次数")
+    run_cmd.add_argument("--mode", choices=("sync", "async", "both"), default="sync",
+                         help="使用处理器的同步接口、异步接口或两者都运行")
+
+    stream_cmd = subparsers.add_parser("stream", help="对比完整下载与流式读取后宫成员翻页的字节数和耗时")
+    stream_cmd.add_argument("fixtures", help="保存的后宫成员翻页HTML页面目录")
+    stream_cmd.add_argument("--rounds", type=int, default=5, help="每个页面每种方式的执行次数")
+    stream_cmd.add_argument("--drain-limit", type=int, default=DEFAULT_DRAIN_LIMIT,
+                            help="读完表格后为复用连接继续读取的剩余字节数上限")
+
+    keepalive_cmd = subparsers.add_parser("keepalive", help="对比新建会话与连接池的握手次数和耗时")
+    keepalive_cmd.add_argument("cases", help="用例根目录，每个子目录是一个用例")
+    keepalive_cmd.add_argument("--rounds", type=int, default=5, help="模拟的刷新次数")
+    keepalive_cmd.add_argument("--tls", action="store_true", help="替身服务器使用HTTPS")
+    keepalive_cmd.add_argument("--certfile", help="HTTPS证书文件，未指定时生成临时自签名证书")
+    keepalive_cmd.add_argument("--keyfile", help="HTTPS私钥文件")
+    keepalive_cmd.add_argument("--drain-limit", type=int, default=DEFAULT_DRAIN_LIMIT,
+                               help="流式读取翻页时为复用连接继续读取的剩余字节数上限")
+
+    args = parser.parse_args(argv)
+    if args.command == "stream":
+        results = benchmark_stream(args.fixtures, args.rounds, args.drain_limit)
+        if not results:
+            print(f"目录 {args.fixtures} 中没有HTML页面")
+            return 1
+        _print_stream_results(results)
+    elif args.command == "keepalive":
+        # 替身服务器使用自签名证书，不显示证书校验警告
+        requests.packages.urllib3.disable_warnings()
+        with tempfile.TemporaryDirectory() as work_dir:
+            ssl_context = None
+            if args.tls or args.certfile:
+                ssl_context = _make_ssl_context(args.certfile, args.keyfile or args.certfile, work_dir)
+            results = [benchmark_keepalive(os.path.join(args.cases, name), args.rounds, ssl_context, args.drain_limit)
+                       for name in sorted(os.listdir(args.cases))
+                       if os.path.isdir(os.path.join(args.cases, name))]
+        if not results:
+            print(f"目录 {args.cases} 中没有用例")
+            return 1
+        _print_keepalive_results(results)
+    elif args.command == "run":
+        results = run_cases(args.cases, args.rounds, args.mode)
+        if not results:
+            print(f"目录 {args.cases} 中没有用例")
+            return 1
+        _print_run_results(results)
+    elif args.command == "parse":
+        results = benchmark_parse(args.fixtures, args.rounds)
+        if not results:
+            print(f"目录 {args.fixtures} 中没有HTML页面")
+            return 1
+        _print_parse_results(results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,16 +2,22 @@
 数据管理模块
 """
 import os
+import copy
 import json
 import time
-from typing import Dict, Any, List, Optional
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, List, Optional, Tuple
 
 from app.log import logger
+from plugins.nexusinvitee.models import SiteSummary
 
 
 class DataManager:
     """
     数据管理类
+    按站点分片存储：每个站点一个数据文件，另有一个索引文件记录各站点的分片文件名、最后更新时间和统计摘要
     """
     
     def __init__(self, data_path: str):
@@ -20,39 +26,265 @@ class DataManager:
         :param data_path: 数据目录路径
         """
         self.data_path = data_path
+        # 旧版单文件存储，仅用于迁移
         self.data_file = os.path.join(data_path, "site_data.json")
+        # 分片存储目录及索引文件
+        self.shard_dir = os.path.join(data_path, "site_data")
+        self.index_file = os.path.join(self.shard_dir, "index.json")
+        # 站点身份缓存（用户ID和Cookie指纹）
+        self.identity_file = os.path.join(self.shard_dir, "identities.json")
+        # 按站点的刷新调度状态
+        self.schedule_file = os.path.join(self.shard_dir, "schedule.json")
+        # 最近若干次刷新的请求指标
+        self.metrics_file = os.path.join(self.shard_dir, "metrics.json")
+        # 批量写入状态：批量期间待写入的站点数据
+        self._lock = threading.RLock()
+        self._batch_entries: Optional[Dict[str, Dict[str, Any]]] = None
+        # 读缓存：{文件路径: ((mtime_ns, size), 解析后的数据)}
+        self._cache: Dict[str, Tuple[Tuple[int, int], Any]] = {}
     
-    def load_data(self) -> Dict[str, Any]:
+        self._migrate_legacy_file()
+
+    @staticmethod
+    def _shard_name(site_name: str) -> str:
+        """
+        获取站点分片文件名，站点名称可能包含中文或特殊字符，因此使用哈希值命名
+        :param site_name: 站点名称
+        :return: 分片文件名
         """
-        从文件加载数据
-        :return: 数据字典
+        return hashlib.sha1(site_name.encode("utf-8")).hexdigest()[:16] + ".json"
+
+    @staticmethod
+    def _file_key(file_path: str) -> Optional[Tuple[int, int]]:
+        """
+        获取文件的缓存标识
+        :param file_path: 文件路径
+        :return: (mtime_ns, size)，文件不存在时返回None
         """
-        if not os.path.exists(self.data_file):
-            return {}
+        try:
+            stat = os.stat(file_path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+    
+    def _read_json(self, file_path: str, default: Any) -> Any:
+        """
+        读取JSON文件，文件未变化时使用内存缓存，不再重新解析
+        返回的是缓存的深拷贝，调用方修改返回值不会影响缓存
+        :param file_path: 文件路径
+        :param default: 文件不存在或读取失败时的默认值
+        :return: 解析后的数据
+        """
+        file_key = self._file_key(file_path)
+        if file_key is None:
+            with self._lock:
+                self._cache.pop(file_path, None)
+            return default
+        
+        with self._lock:
+            cached = self._cache.get(file_path)
+            if cached and cached[0] == file_key:
+                return copy.deepcopy(cached[1])
         
         try:
-            with open(self.data_file, 'r', encoding='utf-8') as f:
-                return json.load(f)
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
         except Exception as e:
-            logger.error(f"读取站点数据文件失败: {str(e)}")
-            return {}
+            logger.error(f"读取数据文件 {os.path.basename(file_path)} 失败: {str(e)}")
+            return default
+        
+        with self._lock:
+            self._cache[file_path] = (file_key, copy.deepcopy(data))
+        return data
     
-    def save_data(self, data: Dict[str, Any]) -> bool:
+    def _write_json(self, file_path: str, data: Any) -> bool:
         """
-        保存数据到文件
-        :param data: 数据字典
+        原子写入JSON文件：先写入同目录下的临时文件，再替换目标文件，避免中途崩溃留下残缺文件
+        :param file_path: 文件路径
+        :param data: 要写入的数据
         :return: 是否成功
         """
+        temp_file = None
         try:
             # 确保目录存在
-            os.makedirs(os.path.dirname(self.data_file), exist_ok=True)
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
             
-            with open(self.data_file, 'w', encoding='utf-8') as f:
+            fd, temp_file = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(file_path))
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_file, file_path)
+            temp_file = None
+            
+            # 写入后直接刷新读缓存，无需重新解析；缓存副本，调用方之后修改 data 不会影响缓存
+            with self._lock:
+                self._cache[file_path] = (self._file_key(file_path), copy.deepcopy(data))
             return True
         except Exception as e:
-            logger.error(f"保存站点数据到文件失败: {str(e)}")
+            logger.error(f"保存数据文件 {os.path.basename(file_path)} 失败: {str(e)}")
             return False
+        finally:
+            if temp_file and os.path.exists(temp_file):
+                try:
+                    os.remove(temp_file)
+                except OSError:
+                    pass
+    
+    def _remove_file(self, file_path: str):
+        """
+        删除文件及其缓存
+        :param file_path: 文件路径
+        """
+        with self._lock:
+            self._cache.pop(file_path, None)
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except OSError as e:
+            logger.warning(f"删除数据文件 {os.path.basename(file_path)} 失败: {str(e)}")
+
+    def _migrate_legacy_file(self):
+        """
+        将旧版单文件 site_data.json 迁移为分片存储，迁移完成后旧文件重命名为 .bak 保留
+        """
+        if not os.path.exists(self.data_file) or os.path.exists(self.index_file):
+            return
+
+        try:
+            with open(self.data_file, 'r', encoding='utf-8') as f:
+                legacy_data = json.load(f)
+        except Exception as e:
+            logger.error(f"读取旧版站点数据文件失败，跳过迁移: {str(e)}")
+            return
+
+        if not isinstance(legacy_data, dict):
+            logger.error("旧版站点数据文件格式错误，跳过迁移")
+            return
+
+        if self.save_data(legacy_data):
+            try:
+                os.replace(self.data_file, self.data_file + ".bak")
+            except OSError as e:
+                logger.warning(f"重命名旧版站点数据文件失败: {str(e)}")
+            logger.info(f"已将 {len(legacy_data)} 个站点的数据迁移为分片存储")
+
+    @staticmethod
+    def _index_entry(shard_name: str, entry: Any) -> Dict[str, Any]:
+        """
+        生成站点的索引条目
+        :param shard_name: 分片文件名
+        :param entry: {"data": 站点数据, "last_update": 时间戳}
+        :return: 索引条目
+        """
+        entry = entry if isinstance(entry, dict) else {}
+        return {
+            "file": shard_name,
+            "last_update": entry.get("last_update", 0),
+            "summary": SiteSummary.from_site_data(entry.get("data", {})).to_dict()
+        }
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """
+        读取索引
+        :return: {站点名称: {"file": 分片文件名, "last_update": 时间戳, "summary": 统计摘要}}
+        """
+        index = self._read_json(self.index_file, {})
+        return index if isinstance(index, dict) else {}
+
+    def _load_site_entry(self, site_name: str, index_entry: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        读取单个站点的分片数据
+        :param site_name: 站点名称
+        :param index_entry: 索引中的站点条目
+        :return: {"data": 站点数据, "last_update": 时间戳}
+        """
+        shard_file = os.path.join(self.shard_dir, index_entry.get("file") or self._shard_name(site_name))
+        entry = self._read_json(shard_file, {})
+        return entry if isinstance(entry, dict) else {}
+
+    def load_data(self) -> Dict[str, Any]:
+        """
+        加载所有站点数据
+        :return: {站点名称: {"data": 站点数据, "last_update": 时间戳}}
+        """
+        all_data = {}
+        for site_name, index_entry in self._load_index().items():
+            entry = self._load_site_entry(site_name, index_entry)
+            if entry:
+                all_data[site_name] = entry
+        return all_data
+
+    def save_data(self, data: Dict[str, Any]) -> bool:
+        """
+        用给定数据整体替换所有站点数据
+        :param data: {站点名称: {"data": 站点数据, "last_update": 时间戳}}
+        :return: 是否成功
+        """
+        with self._lock:
+            old_index = self._load_index()
+            index = {}
+            success = True
+            for site_name, entry in data.items():
+                shard_name = self._shard_name(site_name)
+                if not self._write_json(os.path.join(self.shard_dir, shard_name), entry):
+                    success = False
+                    continue
+                index[site_name] = self._index_entry(shard_name, entry)
+
+            if not self._write_json(self.index_file, index):
+                return False
+
+            # 清理已不存在站点的分片文件及页面缓存
+            for site_name, index_entry in old_index.items():
+                if site_name not in index:
+                    self._remove_file(os.path.join(self.shard_dir, index_entry.get("file") or self._shard_name(site_name)))
+                    self._remove_file(self._page_cache_file(site_name))
+            return success
+
+    def begin_batch(self):
+        """
+        开始批量写入，之后的 update_site_data 只记录在内存中，直到 commit_batch 时统一写入
+        """
+        with self._lock:
+            if self._batch_entries is None:
+                self._batch_entries = {}
+    
+    def commit_batch(self) -> bool:
+        """
+        提交批量写入：逐个写入有变化的站点分片，最后只写一次索引
+        :return: 是否成功
+        """
+        with self._lock:
+            if self._batch_entries is None:
+                return True
+            
+            batch_entries = self._batch_entries
+            self._batch_entries = None
+            
+            if not batch_entries:
+                return True
+            
+            logger.debug(f"批量写入 {len(batch_entries)} 个站点的数据")
+            return self._write_site_entries(batch_entries)
+
+    def _write_site_entries(self, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        写入若干站点的分片并更新索引
+        :param entries: {站点名称: {"data": 站点数据, "last_update": 时间戳}}
+        :return: 是否成功
+        """
+        with self._lock:
+            index = dict(self._load_index())
+            success = True
+            for site_name, entry in entries.items():
+                shard_name = self._shard_name(site_name)
+                if not self._write_json(os.path.join(self.shard_dir, shard_name), entry):
+                    success = False
+                    continue
+                index[site_name] = self._index_entry(shard_name, entry)
+
+            return self._write_json(self.index_file, index) and success
     
     def update_site_data(self, site_name: str, site_data: Dict[str, Any]) -> bool:
         """
@@ -61,15 +293,18 @@ class DataManager:
         :param site_data: 站点数据
         :return: 是否成功
         """
-        all_data = self.load_data()
-        
-        # 更新站点数据并添加时间戳
-        all_data[site_name] = {
+        site_entry = {
             "data": site_data,
             "last_update": int(time.time())
         }
         
-        return self.save_data(all_data)
+        with self._lock:
+            # 批量模式下只记录变更，由 commit_batch 统一写入
+            if self._batch_entries is not None:
+                self._batch_entries[site_name] = site_entry
+                return True
+            
+            return self._write_site_entries({site_name: site_entry})
     
     def get_site_data(self, site_name: Optional[str] = None) -> Dict[str, Any]:
         """
@@ -77,23 +312,125 @@ class DataManager:
         :param site_name: 站点名称，如果为None则返回所有站点数据
         :return: 站点数据
         """
-        all_data = self.load_data()
-        
         if site_name:
-            return all_data.get(site_name, {})
-        return all_data
+            index_entry = self._load_index().get(site_name)
+            if not index_entry:
+                return {}
+            return self._load_site_entry(site_name, index_entry)
+        return self.load_data()
     
+    def _page_cache_file(self, site_name: str) -> str:
+        """
+        获取站点页面缓存文件路径，与站点分片文件同名，扩展名为 .pages.json
+        :param site_name: 站点名称
+        :return: 文件路径
+        """
+        return os.path.join(self.shard_dir, self._shard_name(site_name)[:-len(".json")] + ".pages.json")
+
+    def get_page_cache(self, site_name: str) -> Dict[str, Dict[str, Any]]:
+        """
+        获取站点的页面指纹缓存，用于增量刷新
+        :param site_name: 站点名称
+        :return: {页面URL: 缓存条目}
+        """
+        entries = self._read_json(self._page_cache_file(site_name), {})
+        return entries if isinstance(entries, dict) else {}
+
+    def save_page_cache(self, site_name: str, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        保存站点的页面指纹缓存
+        :param site_name: 站点名称
+        :param entries: {页面URL: 缓存条目}
+        :return: 是否成功
+        """
+        if not entries:
+            self._remove_file(self._page_cache_file(site_name))
+            return True
+        return self._write_json(self._page_cache_file(site_name), entries)
+
+    def get_identities(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取站点身份缓存
+        :return: {站点名称: 身份条目}
+        """
+        entries = self._read_json(self.identity_file, {})
+        return entries if isinstance(entries, dict) else {}
+
+    def save_identities(self, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        保存站点身份缓存
+        :param entries: {站点名称: 身份条目}
+        :return: 是否成功
+        """
+        return self._write_json(self.identity_file, entries)
+
+    def get_schedule(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取站点刷新调度状态
+        :return: {站点名称: 调度状态}
+        """
+        entries = self._read_json(self.schedule_file, {})
+        return entries if isinstance(entries, dict) else {}
+
+    def save_schedule(self, entries: Dict[str, Dict[str, Any]]) -> bool:
+        """
+        保存站点刷新调度状态
+        :param entries: {站点名称: 调度状态}
+        :return: 是否成功
+        """
+        return self._write_json(self.schedule_file, entries)
+
+    def get_metrics(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        获取最近的刷新指标
+        :return: {站点名称: [单次刷新指标, ...]}
+        """
+        entries = self._read_json(self.metrics_file, {})
+        return entries if isinstance(entries, dict) else {}
+
+    def save_metrics(self, entries: Dict[str, List[Dict[str, Any]]]) -> bool:
+        """
+        保存最近的刷新指标
+        :param entries: {站点名称: [单次刷新指标, ...]}
+        :return: 是否成功
+        """
+        return self._write_json(self.metrics_file, entries)
+
+    def get_site_update_times(self) -> Dict[str, int]:
+        """
+        获取各站点的最后更新时间，仅读取索引
+        :return: {站点名称: 时间戳}
+        """
+        return {site_name: entry.get("last_update", 0) for site_name, entry in self._load_index().items()
+                if isinstance(entry, dict)}
+
+    def get_site_summaries(self) -> Dict[str, SiteSummary]:
+        """
+        获取所有站点的统计摘要，只读取索引；旧版索引缺少摘要时从分片计算一次并写回索引
+        :return: {站点名称: 统计摘要}
+        """
+        with self._lock:
+            index = self._load_index()
+            missing = [site_name for site_name, index_entry in index.items()
+                       if isinstance(index_entry, dict) and not isinstance(index_entry.get("summary"), dict)]
+            if missing:
+                index = dict(index)
+                for site_name in missing:
+                    entry = self._load_site_entry(site_name, index[site_name])
+                    index[site_name] = {**index[site_name],
+                                        "summary": SiteSummary.from_site_data(entry.get("data", {})).to_dict()}
+                self._write_json(self.index_file, index)
+
+        return {site_name: SiteSummary.from_dict(index_entry.get("summary"))
+                for site_name, index_entry in index.items() if isinstance(index_entry, dict)}
+
     def get_last_update_time(self) -> int:
         """
-        获取最后更新时间
+        获取最后更新时间，仅读取索引
         :return: 时间戳
         """
-        all_data = self.load_data()
-        
-        update_times = []
-        for site_data in all_data.values():
-            if "last_update" in site_data:
-                update_times.append(site_data["last_update"])
+        update_times = [entry.get("last_update", 0) for entry in self._load_index().values()
+                        if isinstance(entry, dict)]
         
         return max(update_times) if update_times else 0
         
@@ -103,10 +440,10 @@ class DataManager:
         :return: 是否成功
         """
         try:
-            if os.path.exists(self.data_file):
+            if os.path.exists(self.index_file):
                 # 直接清空为空字典
                 return self.save_data({})
             return True
         except Exception as e:
             logger.error(f"清空站点数据失败: {str(e)}")
-            return False 
\ No newline at end of file
+            return False
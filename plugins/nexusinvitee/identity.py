@@ -0,0 +1,91 @@
+"""
+站点身份缓存模块
+记录各站点的用户ID及其验证时使用的Cookie指纹，Cookie未变化时跳过获取用户ID和Cookie验证的请求
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, Optional
+
+
+def cookie_fingerprint(site_url: str, cookie: str) -> str:
+    """
+    计算Cookie指纹，只保存哈希值，不在缓存中保存Cookie本身
+    :param site_url: 站点URL
+    :param cookie: Cookie
+    :return: 指纹
+    """
+    return hashlib.sha1(f"{site_url}\n{cookie or ''}".encode("utf-8")).hexdigest()
+
+
+class IdentityCache:
+    """
+    站点身份缓存
+    条目在Cookie变化、超过有效期或检测到未登录时失效，失效后处理器重新获取用户ID
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None, max_age: int = 7 * 86400):
+        """
+        初始化身份缓存
+        :param entries: 上次保存的缓存条目 {站点名称: {"user_id": 用户ID, "cookie": Cookie指纹, "validated_at": 验证时间}}
+        :param max_age: 条目有效期（秒），超过后重新验证
+        """
+        self._entries = {name: entry for name, entry in (entries or {}).items() if isinstance(entry, dict)}
+        self.max_age = max_age
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def get(self, site_name: str, site_url: str, cookie: str) -> Optional[str]:
+        """
+        获取缓存的用户ID
+        :param site_name: 站点名称
+        :param site_url: 站点URL
+        :param cookie: 当前Cookie
+        :return: Cookie未变化且未过期时返回用户ID，否则返回None
+        """
+        with self._lock:
+            entry = self._entries.get(site_name)
+        if not entry or not entry.get("user_id"):
+            return None
+        if entry.get("cookie") != cookie_fingerprint(site_url, cookie):
+            return None
+        if time.time() - entry.get("validated_at", 0) > self.max_age:
+            return None
+        return str(entry["user_id"])
+
+    def remember(self, site_name: str, site_url: str, cookie: str, user_id: str):
+        """
+        记录验证通过的用户ID
+        :param site_name: 站点名称
+        :param site_url: 站点URL
+        :param cookie: 验证时使用的Cookie
+        :param user_id: 用户ID
+        """
+        fingerprint = cookie_fingerprint(site_url, cookie)
+        with self._lock:
+            entry = self._entries.get(site_name) or {}
+            # 同一Cookie的重复验证在有效期过半前不刷新验证时间，避免每次刷新都写文件
+            if (entry.get("user_id") == str(user_id) and entry.get("cookie") == fingerprint
+                    and time.time() - entry.get("validated_at", 0) < self.max_age / 2):
+                return
+            self._entries[site_name] = {"user_id": str(user_id), "cookie": fingerprint,
+                                        "validated_at": int(time.time())}
+            self.dirty = True
+
+    def invalidate(self, site_name: str):
+        """
+        使站点的缓存失效，如检测到未登录时
+        :param site_name: 站点名称
+        """
+        with self._lock:
+            if self._entries.pop(site_name, None) is not None:
+                self.dirty = True
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """
+        导出需要保存的缓存条目
+        :return: 缓存条目
+        """
+        with self._lock:
+            self.dirty = False
+            return dict(self._entries)
@@ -0,0 +1,187 @@
+"""
+增量刷新模块
+为抓取的页面计算指纹，未变化的页面直接复用上次的解析结果
+"""
+import copy
+import hashlib
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+# 与后宫成员数据无关、每次请求都会变化的页面片段
+_VOLATILE_PATTERNS = [
+    re.compile(r'<script\b.*?</script>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<style\b.*?</style>', re.IGNORECASE | re.DOTALL),
+    re.compile(r'<input\b[^>]*type=["\']?hidden["\']?[^>]*>', re.IGNORECASE),
+    re.compile(r'<div\b[^>]*id=["\']?footer["\']?.*$', re.IGNORECASE | re.DOTALL),
+]
+_TAG_PATTERN = re.compile(r'<(/?)table\b', re.IGNORECASE)
+_INFO_BLOCK_PATTERN = re.compile(r'<table\b[^>]*id=["\']?info_block["\']?', re.IGNORECASE)
+
+
+def _strip_info_block(html_content: str) -> str:
+    """
+    去除NexusPHP顶部的用户信息栏（上传量、魔力值等每次都会变化），信息栏内有嵌套表格，需要按层级查找结束位置
+    :param html_content: HTML内容
+    :return: 去除信息栏后的HTML内容
+    """
+    start_match = _INFO_BLOCK_PATTERN.search(html_content)
+    if not start_match:
+        return html_content
+    depth = 0
+    for tag_match in _TAG_PATTERN.finditer(html_content, start_match.start()):
+        depth += -1 if tag_match.group(1) else 1
+        if depth == 0:
+            end = html_content.find(">", tag_match.end())
+            return html_content[:start_match.start()] + html_content[end + 1 if end >= 0 else len(html_content):]
+    return html_content[:start_match.start()]
+
+
+def page_fingerprint(response: requests.Response) -> str:
+    """
+    计算页面指纹，优先使用服务器提供的 ETag / Last-Modified，否则使用去除易变片段后的内容哈希
+    仅适用于解析结果与用户信息栏无关的页面（如后宫成员翻页）
+    :param response: 响应对象
+    :return: 指纹
+    """
+    etag = response.headers.get("ETag")
+    if etag:
+        return f"etag:{etag}"
+    last_modified = response.headers.get("Last-Modified")
+    if last_modified:
+        return f"lm:{last_modified}"
+    content = _strip_info_block(response.text)
+    for pattern in _VOLATILE_PATTERNS:
+        content = pattern.sub("", content)
+    return "sha1:" + hashlib.sha1(content.encode("utf-8", errors="ignore")).hexdigest()
+
+
+def invitee_key(invitee: Dict[str, Any]) -> str:
+    """
+    获取后宫成员的唯一标识
+    :param invitee: 后宫成员数据
+    :return: 标识
+    """
+    return invitee.get("profile_url") or invitee.get("username") or ""
+
+
+def diff_invitees(old_invitees: List[Dict[str, Any]],
+                  new_invitees: List[Dict[str, Any]]) -> Dict[str, int]:
+    """
+    比较两次刷新的后宫成员列表
+    :param old_invitees: 上次保存的列表
+    :param new_invitees: 本次获取的列表
+    :return: {"added": 新增数, "removed": 移除数, "changed": 数据变化数}
+    """
+    old_map = {invitee_key(item): item for item in old_invitees or [] if isinstance(item, dict)}
+    new_map = {invitee_key(item): item for item in new_invitees or [] if isinstance(item, dict)}
+    return {
+        "added": len(new_map.keys() - old_map.keys()),
+        "removed": len(old_map.keys() - new_map.keys()),
+        "changed": sum(1 for key in new_map.keys() & old_map.keys() if new_map[key] != old_map[key]),
+    }
+
+
+class PageCache:
+    """
+    单个站点的页面解析缓存
+    记录每个URL上次的页面指纹和解析结果，本次刷新用到的条目才会被保存，过期的页面自然淘汰
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None):
+        """
+        初始化页面缓存
+        :param entries: 上次保存的缓存条目 {URL: {"fingerprint": 指纹, "etag": ETag, "result": 解析结果}}
+        """
+        self._entries = dict(entries or {})
+        self._used: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self.pages_reused = 0
+        self.pages_parsed = 0
+        self.invitees_reused = 0
+        self.invitees_parsed = 0
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        获取条件请求头，服务器支持时页面未变化会直接返回304
+        :param url: 页面URL
+        :return: 请求头
+        """
+        entry = self._entries.get(url) or {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, reused: bool, result: Dict[str, Any]):
+        """
+        记录一次页面处理
+        :param reused: 是否复用了缓存
+        :param result: 解析结果
+        """
+        count = len(result.get("invitees", [])) if isinstance(result, dict) else 0
+        with self._lock:
+            if reused:
+                self.pages_reused += 1
+                self.invitees_reused += count
+            else:
+                self.pages_parsed += 1
+                self.invitees_parsed += count
+
+    def parse(self, url: str, response: requests.Response,
+              parse_func: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        页面未变化时返回上次的解析结果，否则解析并缓存
+        :param url: 页面URL
+        :param response: 响应对象
+        :param parse_func: 解析函数，参数为HTML内容
+        :return: 解析结果
+        """
+        entry = self._entries.get(url)
+        if entry and response.status_code == 304:
+            fingerprint = entry.get("fingerprint")
+        else:
+            fingerprint = page_fingerprint(response)
+
+        if entry and entry.get("fingerprint") == fingerprint and isinstance(entry.get("result"), dict):
+            # 返回副本，避免调用方修改缓存中的数据
+            result = copy.deepcopy(entry["result"])
+            self.record(True, result)
+        else:
+            result = parse_func(response.text)
+            entry = {
+                "fingerprint": fingerprint,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "result": result,
+            }
+            self.record(False, result)
+
+        with self._lock:
+            self._used[url] = {**entry, "last_used": int(time.time())}
+        return result
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """
+        导出需要保存的缓存条目
+        :return: 本次刷新用到的条目
+        """
+        with self._lock:
+            return dict(self._used)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取本次刷新的统计
+        :return: 统计数据
+        """
+        return {
+            "pages_reprocessed": self.pages_parsed,
+            "pages_reused": self.pages_reused,
+            "invitees_reprocessed": self.invitees_parsed,
+            "invitees_reused": self.invitees_reused,
+        }
@@ -0,0 +1,223 @@
+"""
+刷新指标模块
+按站点、按请求阶段记录耗时、字节数和请求数，区分网络耗时和解析耗时，保留最近若干次刷新用于定位慢站点和慢解析
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlparse
+
+# 常见请求阶段的显示名称，未列出的阶段直接显示阶段标识
+STAGE_LABELS = {
+    "index.php": "首页/Cookie验证",
+    "usercp.php": "获取用户ID",
+    "invite.php": "邀请页",
+    "invite.php@menu=invitee": "后宫列表",
+    "invite.php@page": "后宫翻页",
+    "invite.php@type=new": "发邀页",
+    "mybonus.php": "魔力商店",
+    "userdetails.php": "用户详情",
+    "api/member/profile": "M-Team 用户资料",
+}
+
+
+def request_stage(url: str) -> str:
+    """
+    根据请求URL判断所属阶段，翻页请求归为同一阶段
+    :param url: 请求URL
+    :return: 阶段标识，如 invite.php、invite.php@page、invite.php@type=new
+    """
+    parsed = urlparse(url)
+    path = parsed.path.lstrip("/") or "index.php"
+    params = dict(parse_qsl(parsed.query, keep_blank_values=True))
+    if "page" in params:
+        return path + "@page"
+    for key in ("type", "menu"):
+        if key in params:
+            return f"{path}@{key}={params[key]}"
+    return path
+
+
+def stage_label(stage: str) -> str:
+    """
+    获取阶段的显示名称
+    :param stage: 阶段标识
+    :return: 显示名称
+    """
+    return STAGE_LABELS.get(stage, stage)
+
+
+class RequestRecorder:
+    """
+    记录单个站点一次刷新中的所有请求和页面解析，会话和异步会话共用，线程安全
+    """
+
+    def __init__(self):
+        self.records: List[Tuple[str, float, int]] = []
+        self.parse_records: List[Tuple[str, float]] = []
+        self._lock = threading.Lock()
+
+    def record(self, url: str, elapsed: float, size: int):
+        """
+        记录一次请求
+        :param url: 请求URL
+        :param elapsed: 耗时(秒)，流式读取时包含读取正文的时间
+        :param size: 正文字节数
+        """
+        with self._lock:
+            self.records.append((request_stage(url), elapsed, size))
+
+    def record_parse(self, url: str, elapsed: float):
+        """
+        记录一次页面解析
+        :param url: 页面URL
+        :param elapsed: 解析耗时(秒)
+        """
+        with self._lock:
+            self.parse_records.append((request_stage(url), elapsed))
+
+    def summary(self, total: float, rounds: int = 1) -> Dict[str, Any]:
+        """
+        汇总请求记录
+        :param total: 总耗时(秒)
+        :param rounds: 记录包含的执行次数，结果按每次平均
+        :return: 汇总结果
+        """
+        with self._lock:
+            records = list(self.records)
+            parse_records = list(self.parse_records)
+        rounds = max(rounds, 1)
+        network = sum(record[1] for record in records)
+        if parse_records:
+            parse = sum(record[1] for record in parse_records)
+        else:
+            # 处理器没有记录解析耗时时按总耗时与网络耗时之差估算，这类处理器按顺序请求，估算有效
+            parse = max(total - network, 0)
+        stages: Dict[str, Dict[str, Any]] = {}
+        for stage, elapsed, size in records:
+            item = stages.setdefault(stage, {"requests": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0,
+                                             "parse_ms": 0.0})
+            item["requests"] += 1
+            item["total_ms"] += elapsed * 1000
+            item["max_ms"] = max(item["max_ms"], elapsed * 1000)
+            item["bytes"] += size
+        for stage, elapsed in parse_records:
+            item = stages.setdefault(stage, {"requests": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0,
+                                             "parse_ms": 0.0})
+            item["parse_ms"] += elapsed * 1000
+        return {
+            "requests": len(records) // rounds,
+            "bytes": sum(record[2] for record in records) // rounds,
+            "total_ms": round(total * 1000 / rounds, 2),
+            "network_ms": round(network * 1000 / rounds, 2),
+            # 翻页请求并发时，网络耗时和解析耗时之和可能超过总耗时
+            "parse_ms": round(parse * 1000 / rounds, 2),
+            "stages": {name: {"requests": item["requests"] // rounds,
+                              "avg_ms": round(item["total_ms"] / item["requests"], 2) if item["requests"] else 0,
+                              "max_ms": round(item["max_ms"], 2),
+                              "bytes": item["bytes"] // rounds,
+                              "parse_ms": round(item["parse_ms"] / rounds, 2)}
+                       for name, item in stages.items()},
+        }
+
+
+class MetricsStore:
+    """
+    按站点保留最近若干次刷新的指标
+    """
+
+    def __init__(self, entries: Optional[Dict[str, List[Dict[str, Any]]]] = None, max_samples: int = 20):
+        """
+        初始化指标存储
+        :param entries: 上次保存的指标 {站点名称: [单次刷新指标, ...]}
+        :param max_samples: 每个站点保留的刷新次数
+        """
+        self.max_samples = max_samples
+        self._sites: Dict[str, Deque[Dict[str, Any]]] = {
+            name: deque((sample for sample in samples if isinstance(sample, dict)), maxlen=max_samples)
+            for name, samples in (entries or {}).items() if isinstance(samples, list)
+        }
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def add(self, site_name: str, summary: Dict[str, Any], success: bool):
+        """
+        记录站点的一次刷新
+        :param site_name: 站点名称
+        :param summary: RequestRecorder.summary 的返回值
+        :param success: 刷新是否成功
+        """
+        sample = dict(summary, time=int(time.time()), success=success)
+        with self._lock:
+            samples = self._sites.get(site_name)
+            if samples is None:
+                samples = self._sites[site_name] = deque(maxlen=self.max_samples)
+            samples.append(sample)
+            self.dirty = True
+
+    @staticmethod
+    def _percentile(values: List[float], percent: float) -> float:
+        ordered = sorted(values)
+        return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+    def site_summary(self, site_name: str) -> Optional[Dict[str, Any]]:
+        """
+        汇总站点最近的刷新指标
+        :param site_name: 站点名称
+        :return: 汇总结果，没有记录时返回None
+        """
+        with self._lock:
+            samples = list(self._sites.get(site_name) or [])
+        if not samples:
+            return None
+        count = len(samples)
+        stages: Dict[str, Dict[str, float]] = {}
+        for sample in samples:
+            for stage, item in sample.get("stages", {}).items():
+                total = stages.setdefault(stage, {"requests": 0, "total_ms": 0.0, "max_ms": 0.0, "bytes": 0,
+                                                  "parse_ms": 0.0})
+                total["requests"] += item.get("requests", 0)
+                total["total_ms"] += item.get("avg_ms", 0) * item.get("requests", 0)
+                total["max_ms"] = max(total["max_ms"], item.get("max_ms", 0))
+                total["bytes"] += item.get("bytes", 0)
+                total["parse_ms"] += item.get("parse_ms", 0)
+        return {
+            "samples": count,
+            "failures": sum(1 for sample in samples if not sample.get("success")),
+            "last_time": samples[-1].get("time"),
+            "avg_total_ms": round(sum(sample.get("total_ms", 0) for sample in samples) / count, 2),
+            "p95_total_ms": round(self._percentile([sample.get("total_ms", 0) for sample in samples], 95), 2),
+            "avg_network_ms": round(sum(sample.get("network_ms", 0) for sample in samples) / count, 2),
+            "avg_parse_ms": round(sum(sample.get("parse_ms", 0) for sample in samples) / count, 2),
+            "avg_requests": round(sum(sample.get("requests", 0) for sample in samples) / count, 1),
+            "avg_bytes": sum(sample.get("bytes", 0) for sample in samples) // count,
+            "stages": {stage: {"label": stage_label(stage),
+                               "requests": round(item["requests"] / count, 1),
+                               "avg_ms": round(item["total_ms"] / item["requests"], 2) if item["requests"] else 0,
+                               "max_ms": round(item["max_ms"], 2),
+                               "bytes": int(item["bytes"] // count),
+                               "parse_ms": round(item["parse_ms"] / count, 2)}
+                       for stage, item in stages.items()},
+        }
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """
+        汇总所有站点的刷新指标，平均总耗时最长的站点在前
+        :return: {站点名称: 汇总结果}
+        """
+        with self._lock:
+            site_names = list(self._sites.keys())
+        summaries = {name: self.site_summary(name) for name in site_names}
+        return dict(sorted(((name, item) for name, item in summaries.items() if item),
+                           key=lambda x: x[1]["avg_total_ms"], reverse=True))
+
+    def export(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        导出需要保存的指标
+        :return: {站点名称: [单次刷新指标, ...]}
+        """
+        with self._lock:
+            self.dirty = False
+            return {name: list(samples) for name, samples in self._sites.items()}
@@ -0,0 +1,564 @@
+"""
+数据模型模块
+"""
+import heapq
+import re
+import time
+from dataclasses import dataclass, asdict, field, fields
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+# 兼容旧数据的嵌套结构，按顺序取第一个非空值
+_INVITEE_PATHS = (("invitees",), ("data", "invitees"), ("data", "data", "invitees"))
+_STATUS_PATHS = (("invite_status",), ("data", "invite_status"), ("data", "data", "invite_status"))
+
+# 千分位逗号：前后都是数字的逗号
+_THOUSANDS_COMMA = re.compile(r'(?<=\d),(?=\d)')
+_INFINITE_RATIOS = ('inf.', 'inf', 'infinite', '无限')
+
+# 用一个非常大的数代表无限分享率
+RATIO_INFINITE = 1e20
+
+_SIZE_PATTERN = re.compile(r'([\d.]+)\s*([KMGTPEZY]?i?B)', re.IGNORECASE)
+_SIZE_UNITS = {
+    'B': 1,
+    'KB': 1024, 'KIB': 1024,
+    'MB': 1024 ** 2, 'MIB': 1024 ** 2,
+    'GB': 1024 ** 3, 'GIB': 1024 ** 3,
+    'TB': 1024 ** 4, 'TIB': 1024 ** 4,
+    'PB': 1024 ** 5, 'PIB': 1024 ** 5,
+    'EB': 1024 ** 6, 'EIB': 1024 ** 6,
+    'ZB': 1024 ** 7, 'ZIB': 1024 ** 7,
+    'YB': 1024 ** 8, 'YIB': 1024 ** 8,
+}
+_TIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d', '%Y/%m/%d %H:%M:%S', '%Y/%m/%d')
+
+
+def _get_path(data: Any, path: tuple) -> Any:
+    for key in path:
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def extract_invitees(site_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    从站点数据中获取后宫成员列表
+    :param site_data: 站点数据
+    :return: 后宫成员列表
+    """
+    for path in _INVITEE_PATHS:
+        invitees = _get_path(site_data, path)
+        if invitees:
+            return invitees
+    return []
+
+
+def render_invitees(site_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    为站点数据中的后宫成员补充显示字段，供API返回，不修改传入的数据
+    :param site_data: 站点数据
+    :return: 后宫成员替换为 InviteeRecord.to_api_dict 结果的站点数据副本
+    """
+    for path in _INVITEE_PATHS:
+        invitees = _get_path(site_data, path)
+        if not invitees or not isinstance(invitees, list):
+            continue
+        rendered = [InviteeRecord.from_raw(invitee).to_api_dict()
+                    for invitee in invitees if isinstance(invitee, dict)]
+        # 只复制到后宫成员列表所在的各层字典
+        result = dict(site_data)
+        node = result
+        for key in path[:-1]:
+            node[key] = dict(node[key])
+            node = node[key]
+        node[path[-1]] = rendered
+        return result
+    return site_data
+
+
+def extract_invite_status(site_data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    从站点数据中获取邀请状态
+    :param site_data: 站点数据
+    :return: 邀请状态
+    """
+    for path in _STATUS_PATHS:
+        invite_status = _get_path(site_data, path)
+        if invite_status and isinstance(invite_status, dict):
+            return invite_status
+    return {}
+
+
+def parse_ratio(ratio_str: str) -> float:
+    """
+    将分享率字符串转换为数值，去除千分位逗号，其余逗号视为小数点
+    :param ratio_str: 分享率字符串
+    :return: 分享率，空字符串返回0
+    :raises ValueError: 无法转换时抛出
+    """
+    normalized_ratio = _THOUSANDS_COMMA.sub('', ratio_str).replace(',', '.')
+    return float(normalized_ratio) if normalized_ratio else 0
+
+
+def parse_size(size_str: Any) -> float:
+    """
+    将大小字符串转换为字节数
+    :param size_str: 大小字符串，如 "1.5 GB"、"1,024 KiB"
+    :return: 字节数，无法解析时返回0，无限大返回 RATIO_INFINITE
+    """
+    if isinstance(size_str, (int, float)):
+        return size_str
+    if not size_str or not str(size_str).strip():
+        return 0
+    size_str = str(size_str).strip()
+    if size_str.lower() in ('inf.', 'inf') or size_str == '∞':
+        return RATIO_INFINITE
+
+    # 同时出现逗号和小数点时逗号为千分位，否则逗号视为小数点
+    size_str = size_str.replace(',', '') if '.' in size_str else size_str.replace(',', '.')
+    matches = _SIZE_PATTERN.match(size_str)
+    if not matches:
+        try:
+            return float(size_str)
+        except ValueError:
+            return 0
+    size_num, unit = matches.groups()
+    try:
+        size_value = float(size_num)
+    except ValueError:
+        return 0
+    return size_value * _SIZE_UNITS.get(unit.upper(), 1)
+
+
+def format_size(size_bytes: float) -> str:
+    """
+    格式化字节数为可读字符串
+    :param size_bytes: 字节数
+    :return: 如 "1.50 GB"
+    """
+    try:
+        for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
+            if size_bytes < 1024.0:
+                return f"{size_bytes:.2f} {unit}"
+            size_bytes /= 1024.0
+        return f"{size_bytes:.2f} PB"
+    except TypeError:
+        return "0 B"
+
+
+def parse_time(time_str: Any) -> int:
+    """
+    将时间字符串转换为时间戳
+    :param time_str: 时间字符串
+    :return: 时间戳，无法解析时返回0
+    """
+    if isinstance(time_str, (int, float)):
+        return int(time_str)
+    time_str = str(time_str or "").strip()
+    for time_format in _TIME_FORMATS:
+        try:
+            return int(time.mktime(time.strptime(time_str, time_format)))
+        except ValueError:
+            continue
+    return 0
+
+
+def format_time(timestamp: int) -> str:
+    """
+    格式化时间戳
+    :param timestamp: 时间戳
+    :return: 时间字符串，时间戳为0时返回空字符串
+    """
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timestamp)) if timestamp else ""
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    """
+    将数值字符串（可能带千分位逗号）转换为浮点数
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    value = str(value or "").strip()
+    if not value:
+        return None
+    try:
+        return parse_ratio(value)
+    except ValueError:
+        return None
+
+
+def _format_number(value: Optional[float]) -> str:
+    """
+    格式化数值，整数不显示小数部分
+    """
+    if value is None:
+        return ""
+    if float(value).is_integer():
+        return f"{int(value):,}"
+    return f"{value:,.2f}"
+
+
+class RatioHealth(str, Enum):
+    """
+    分享率健康度
+    """
+    EXCELLENT = "excellent"
+    GOOD = "good"
+    WARNING = "warning"
+    DANGER = "danger"
+    NEUTRAL = "neutral"
+    UNKNOWN = "unknown"
+
+    @classmethod
+    def of(cls, ratio: Optional[float], uploaded: float, downloaded: float) -> "RatioHealth":
+        """
+        根据分享率和流量计算健康度
+        """
+        if uploaded == 0 and downloaded == 0:
+            return cls.NEUTRAL
+        if ratio is None:
+            return cls.UNKNOWN
+        if ratio >= RATIO_INFINITE:
+            return cls.EXCELLENT
+        if ratio >= 1.0:
+            return cls.GOOD
+        if ratio >= 0.5:
+            return cls.WARNING
+        return cls.DANGER
+
+    @property
+    def label(self) -> List[str]:
+        """
+        显示标签 [文字, 颜色]
+        """
+        return _HEALTH_LABELS.get(self, ["", ""])
+
+
+_HEALTH_LABELS = {
+    RatioHealth.EXCELLENT: ["无限", "green"],
+    RatioHealth.GOOD: ["良好", "green"],
+    RatioHealth.WARNING: ["较低", "orange"],
+    RatioHealth.DANGER: ["危险", "red"],
+    RatioHealth.NEUTRAL: ["无数据", "grey"],
+}
+
+
+@dataclass
+class InviteeRecord:
+    """
+    后宫成员记录
+    流量为字节数、分享率为浮点数（RATIO_INFINITE 表示无限）、时间为时间戳，显示格式在渲染时生成
+    """
+    username: str = ""
+    profile_url: str = ""
+    email: str = ""
+    uid: str = ""
+    enabled: bool = True
+    status: str = ""
+    uploaded: int = 0
+    downloaded: int = 0
+    # 分享率，无法识别时为None
+    ratio: Optional[float] = None
+    health: RatioHealth = RatioHealth.UNKNOWN
+    seeding: int = 0
+    seeding_size: int = 0
+    # 做种时间，各站点格式不一，保留原文
+    seed_time: str = ""
+    seed_magic: Optional[float] = None
+    seed_bonus: Optional[float] = None
+    join_time: int = 0
+    last_seen: int = 0
+    # 站点特有的其他字段
+    extra: Dict[str, str] = field(default_factory=dict)
+
+    # 处理器输出中已被上面字段覆盖的键
+    _KNOWN_KEYS = {
+        "username", "profile_url", "email", "uid", "enabled", "status", "uploaded", "downloaded", "ratio",
+        "ratio_value", "ratio_health", "ratio_label", "health", "data_status", "seeding", "seeding_size",
+        "seed_time", "seed_magic", "magic", "seed_bonus", "invitee_bonus", "bonus", "join_time", "join_date",
+        "added", "last_seed_report", "last_seen", "extra",
+    }
+
+    @classmethod
+    def from_raw(cls, raw: Dict[str, Any]) -> "InviteeRecord":
+        """
+        从处理器输出的后宫成员数据（显示字符串）或已保存的记录构建
+        :param raw: 后宫成员数据
+        :return: 后宫成员记录
+        """
+        if "health" in raw:
+            return cls._from_stored(raw)
+
+        uploaded = parse_size(raw.get("uploaded", 0))
+        downloaded = parse_size(raw.get("downloaded", 0))
+
+        ratio_value = raw.get("ratio_value")
+        if isinstance(ratio_value, (int, float)):
+            ratio = float(ratio_value)
+        else:
+            ratio_str = str(raw.get("ratio", "")).strip()
+            if ratio_str == '∞' or ratio_str.lower() in _INFINITE_RATIOS:
+                ratio = RATIO_INFINITE
+            else:
+                try:
+                    ratio = parse_ratio(ratio_str) if ratio_str else None
+                except ValueError:
+                    ratio = None
+
+        try:
+            health = RatioHealth(raw.get("ratio_health"))
+        except ValueError:
+            health = RatioHealth.of(ratio, uploaded, downloaded)
+
+        enabled = raw.get("enabled", True)
+        if not isinstance(enabled, bool):
+            enabled = str(enabled).lower() != 'no'
+
+        try:
+            seeding = int(_parse_number(raw.get("seeding")) or 0)
+        except (TypeError, ValueError, OverflowError):
+            seeding = 0
+
+        seed_magic = _parse_number(raw.get("seed_magic") or raw.get("magic"))
+        seed_bonus = _parse_number(raw.get("seed_bonus") or raw.get("invitee_bonus") or raw.get("bonus"))
+
+        extra = {k: str(v) for k, v in raw.items() if k not in cls._KNOWN_KEYS and v not in (None, "")}
+        last_seen_str = raw.get("last_seed_report") or raw.get("last_seen")
+        last_seen = parse_time(last_seen_str)
+        if last_seen_str and not last_seen:
+            # 无法识别的时间（如"从未"）保留原文
+            extra["last_seen_text"] = str(last_seen_str)
+
+        return cls(
+            username=str(raw.get("username", "")),
+            profile_url=str(raw.get("profile_url", "") or ""),
+            email=str(raw.get("email", "") or ""),
+            uid=str(raw.get("uid", "") or ""),
+            enabled=enabled,
+            status=str(raw.get("status", "") or ""),
+            uploaded=int(min(uploaded, RATIO_INFINITE)),
+            downloaded=int(min(downloaded, RATIO_INFINITE)),
+            ratio=ratio,
+            health=health,
+            seeding=seeding,
+            seeding_size=int(min(parse_size(raw.get("seeding_size", 0)), RATIO_INFINITE)),
+            seed_time=str(raw.get("seed_time", "") or ""),
+            seed_magic=seed_magic,
+            seed_bonus=seed_bonus,
+            join_time=parse_time(raw.get("join_time") or raw.get("join_date") or raw.get("added")),
+            last_seen=last_seen,
+            extra=extra,
+        )
+
+    @classmethod
+    def _from_stored(cls, data: Dict[str, Any]) -> "InviteeRecord":
+        """
+        从 to_dict 保存的记录恢复，不需要再解析字符串
+        """
+        names = {f.name for f in fields(cls)}
+        record = cls(**{k: v for k, v in data.items() if k in names})
+        try:
+            record.health = RatioHealth(record.health)
+        except ValueError:
+            record.health = RatioHealth.UNKNOWN
+        return record
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为保存用的字典，省略默认值以减小数据文件
+        """
+        defaults = InviteeRecord()
+        data = {}
+        for f in fields(self):
+            value = getattr(self, f.name)
+            if f.name in ("username", "health") or value != getattr(defaults, f.name):
+                data[f.name] = value.value if isinstance(value, Enum) else value
+        return data
+
+    def to_api_dict(self) -> Dict[str, Any]:
+        """
+        转换为API返回的字典：在保存字段之外附带显示字段，兼容按旧格式读取流量、分享率和健康度的调用方
+        """
+        data = self.to_dict()
+        data.update({
+            "uploaded_text": self.uploaded_text,
+            "downloaded_text": self.downloaded_text,
+            "ratio_text": self.ratio_text,
+            "ratio_health": self.health.value,
+            "ratio_label": self.health.label,
+        })
+        return data
+
+    @property
+    def no_traffic(self) -> bool:
+        """
+        上传下载是否都为0
+        """
+        return self.uploaded == 0 and self.downloaded == 0
+
+    @property
+    def ratio_text(self) -> str:
+        """
+        分享率显示文字
+        """
+        if self.ratio is None:
+            return ""
+        if self.ratio >= RATIO_INFINITE:
+            return "∞"
+        return f"{self.ratio:,.3f}"
+
+    @property
+    def uploaded_text(self) -> str:
+        return format_size(self.uploaded)
+
+    @property
+    def downloaded_text(self) -> str:
+        return format_size(self.downloaded)
+
+    @property
+    def seeding_size_text(self) -> str:
+        return format_size(self.seeding_size)
+
+    @property
+    def seed_magic_text(self) -> str:
+        return _format_number(self.seed_magic) if self.seed_magic is not None else self.seed_time
+
+    @property
+    def seed_bonus_text(self) -> str:
+        return _format_number(self.seed_bonus)
+
+    @property
+    def last_seen_text(self) -> str:
+        return format_time(self.last_seen) or self.extra.get("last_seen_text", "")
+
+
+def normalize_invitees(invitees: Any) -> List[Dict[str, Any]]:
+    """
+    将处理器输出的后宫成员列表转换为保存用的记录
+    :param invitees: 后宫成员列表
+    :return: 记录字典列表
+    """
+    if not isinstance(invitees, list):
+        return []
+    return [InviteeRecord.from_raw(invitee).to_dict() for invitee in invitees if isinstance(invitee, dict)]
+
+
+@dataclass
+class SiteSummary:
+    """
+    站点统计摘要，在站点数据写入时计算并保存在索引中，页面渲染时无需遍历后宫成员
+    """
+    invitee_count: int = 0
+    banned_count: int = 0
+    # 按 ratio_health 统计的低分享率人数（warning/danger）
+    low_ratio_count: int = 0
+    # 按 ratio_health 统计的无数据人数（neutral）
+    no_data_count: int = 0
+    # 站点卡片显示的低分享率人数：在 low_ratio_count 基础上再计入有流量且分享率在 (0, 1) 之间的成员
+    card_low_ratio_count: int = 0
+    permanent_count: int = 0
+    temporary_count: int = 0
+    can_invite: bool = False
+
+    @classmethod
+    def from_site_data(cls, site_data: Dict[str, Any]) -> "SiteSummary":
+        """
+        根据站点数据计算统计摘要
+        :param site_data: 站点数据
+        :return: 统计摘要
+        """
+        records = [InviteeRecord.from_raw(i) for i in extract_invitees(site_data) if isinstance(i, dict)]
+        invite_status = extract_invite_status(site_data)
+
+        banned_count = sum(1 for r in records if not r.enabled)
+        low_ratio_count = sum(1 for r in records if r.health in (RatioHealth.WARNING, RatioHealth.DANGER))
+        no_data_count = sum(1 for r in records if r.health == RatioHealth.NEUTRAL)
+        extra_low_ratio = sum(1 for r in records
+                              if not r.no_traffic and r.ratio is not None and 0 < r.ratio < 1)
+
+        return cls(
+            invitee_count=len(records),
+            banned_count=banned_count,
+            low_ratio_count=low_ratio_count,
+            no_data_count=no_data_count,
+            card_low_ratio_count=low_ratio_count + extra_low_ratio,
+            permanent_count=invite_status.get("permanent_count", 0) or 0,
+            temporary_count=invite_status.get("temporary_count", 0) or 0,
+            can_invite=bool(invite_status.get("can_invite", False)),
+        )
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SiteSummary":
+        """
+        从索引中保存的字典恢复统计摘要，忽略未知字段
+        :param data: 字典
+        :return: 统计摘要
+        """
+        names = {f.name for f in fields(cls)}
+        return cls(**{k: v for k, v in (data or {}).items() if k in names})
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        转换为可保存的字典
+        """
+        return asdict(self)
+
+
+# 后宫成员查询支持的排序字段
+INVITEE_SORT_KEYS = {
+    "ratio": lambda r: r.ratio,
+    "uploaded": lambda r: r.uploaded,
+    "downloaded": lambda r: r.downloaded,
+    "join_time": lambda r: r.join_time or None,
+    "last_seen": lambda r: r.last_seen or None,
+    "seeding_size": lambda r: r.seeding_size,
+    "username": lambda r: r.username.lower(),
+}
+
+# 后宫成员查询支持的筛选条件，多个条件之间为“或”关系
+INVITEE_FILTERS = {
+    "banned": lambda r: not r.enabled,
+    "low_ratio": lambda r: r.health in (RatioHealth.WARNING, RatioHealth.DANGER),
+    "no_data": lambda r: r.health == RatioHealth.NEUTRAL,
+}
+
+
+def query_invitees(site_invitees: Dict[str, List[Dict[str, Any]]], filters: Optional[List[str]] = None,
+                   sort: Optional[str] = None, desc: bool = False,
+                   offset: int = 0, limit: int = 50) -> Tuple[int, List[Tuple[str, InviteeRecord]]]:
+    """
+    按条件筛选、排序并分页查询后宫成员
+    :param site_invitees: {站点名称: 后宫成员列表}
+    :param filters: 筛选条件，见 INVITEE_FILTERS
+    :param sort: 排序字段，见 INVITEE_SORT_KEYS，为空时保持站点内原有顺序
+    :param desc: 是否降序
+    :param offset: 起始位置
+    :param limit: 返回数量
+    :return: (符合条件的总数, [(站点名称, 后宫成员记录)])
+    """
+    predicates = [INVITEE_FILTERS[name] for name in filters or [] if name in INVITEE_FILTERS]
+    matched = []
+    for site_name, invitees in site_invitees.items():
+        for invitee in invitees or []:
+            if not isinstance(invitee, dict):
+                continue
+            record = InviteeRecord.from_raw(invitee)
+            if predicates and not any(predicate(record) for predicate in predicates):
+                continue
+            matched.append((site_name, record))
+
+    offset, limit = max(0, offset), max(0, limit)
+    sort_key = INVITEE_SORT_KEYS.get(sort or "")
+    if not sort_key:
+        return len(matched), matched[offset:offset + limit]
+
+    # 缺少排序值的成员始终排在最后；只需要部分排序结果
+    present = [item for item in matched if sort_key(item[1]) is not None]
+    missing = [item for item in matched if sort_key(item[1]) is None]
+    select = heapq.nlargest if desc else heapq.nsmallest
+    ordered = select(offset + limit, present, key=lambda item: sort_key(item[1]))
+    if len(ordered) < offset + limit:
+        ordered.extend(missing[:offset + limit - len(ordered)])
+    return len(matched), ordered[offset:offset + limit]
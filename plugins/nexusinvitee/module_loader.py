@@ -4,16 +4,113 @@
 import os
 import importlib
 import inspect
-from typing import List, Type, Dict, Any
+import threading
+from typing import List, Type, Dict, Any, Optional
+from urllib.parse import urlparse
 
 from app.log import logger
 from plugins.nexusinvitee.sites import _ISiteHandler
 
 
+class HandlerRegistry:
+    """
+    站点处理器注册表
+    处理器类只在构建时加载一次，站点域名到处理器类的匹配结果缓存在索引中，之后的分发只需一次字典查找
+    """
+
+    # 通用处理器，仅在所有专用处理器都不匹配时使用
+    GENERIC_HANDLER = "NexusPhpHandler"
+
+    def __init__(self, handlers: List[Type[_ISiteHandler]]):
+        # 专用处理器按名称排序，通用处理器排在最后，保证匹配顺序稳定
+        self.handlers = sorted(handlers, key=lambda h: (h.__name__ == self.GENERIC_HANDLER, h.__name__))
+        self._host_index: Dict[str, Optional[Type[_ISiteHandler]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.handlers)
+
+    @staticmethod
+    def _host_key(site_url: str) -> str:
+        """
+        获取站点URL的域名索引键
+        :param site_url: 站点URL
+        :return: 小写域名，无法解析时返回原URL
+        """
+        site_url = (site_url or "").strip().lower()
+        return urlparse(site_url).netloc or site_url
+
+    def get_handler_class(self, site_url: str) -> Optional[Type[_ISiteHandler]]:
+        """
+        获取匹配站点的处理器类
+        :param site_url: 站点URL
+        :return: 处理器类，没有匹配时返回None
+        """
+        host = self._host_key(site_url)
+        if host in self._host_index:
+            return self._host_index[host]
+
+        handler_class = None
+        for candidate in self.handlers:
+            if candidate.match(site_url):
+                handler_class = candidate
+                break
+
+        with self._lock:
+            self._host_index[host] = handler_class
+        if handler_class:
+            logger.debug(f"站点 {host} 匹配处理器: {handler_class.__name__}")
+        return handler_class
+
+    def get_handler(self, site_url: str) -> Optional[_ISiteHandler]:
+        """
+        获取匹配站点的处理器实例
+        :param site_url: 站点URL
+        :return: 处理器实例，没有匹配时返回None
+        """
+        handler_class = self.get_handler_class(site_url)
+        return handler_class() if handler_class else None
+
+    def get_generic_handler(self) -> Optional[_ISiteHandler]:
+        """
+        获取通用NexusPHP处理器实例
+        :return: 处理器实例
+        """
+        for handler_class in self.handlers:
+            if handler_class.__name__ == self.GENERIC_HANDLER:
+                return handler_class()
+        return None
+
+    def warm(self, site_urls: List[str]):
+        """
+        预先计算站点的处理器匹配结果
+        :param site_urls: 站点URL列表
+        """
+        for site_url in site_urls:
+            if site_url:
+                self.get_handler_class(site_url)
+
+
 class ModuleLoader:
     """
     模块加载器类
     """
+
+    # 已构建的处理器注册表，插件重载时随模块一起被清除
+    _registry: Optional[HandlerRegistry] = None
+    _registry_lock = threading.Lock()
+
+    @classmethod
+    def get_registry(cls, rebuild: bool = False) -> HandlerRegistry:
+        """
+        获取站点处理器注册表，首次调用或指定重建时加载处理器
+        :param rebuild: 是否重新加载处理器
+        :return: 处理器注册表
+        """
+        with cls._registry_lock:
+            if cls._registry is None or rebuild:
+                cls._registry = HandlerRegistry(cls.load_site_handlers())
+            return cls._registry
     
     @staticmethod
     def load_site_handlers() -> List[Type[_ISiteHandler]]:
@@ -29,7 +126,7 @@ class ModuleLoader:
             return []
         
         # 遍历sites目录下的所有py文件
-        for filename in os.listdir(sites_dir):
+        for filename in sorted(os.listdir(sites_dir)):
             if not filename.endswith(".py") or filename == "__init__.py":
                 continue
             
@@ -39,13 +136,13 @@ class ModuleLoader:
                 # 动态导入模块
                 module = importlib.import_module(f"plugins.nexusinvitee.sites.{module_name}")
                 
-                # 查找模块中继承了_ISiteHandler的类
-                for name, obj in inspect.getmembers(module):
-                    if (inspect.isclass(obj) and 
-                        issubclass(obj, _ISiteHandler) and 
-                        obj != _ISiteHandler):
+                # 查找模块中定义的继承了_ISiteHandler的类，忽略从其他模块导入的类
+                for name, obj in inspect.getmembers(module, inspect.isclass):
+                    if (issubclass(obj, _ISiteHandler) and
+                        obj != _ISiteHandler and
+                        obj.__module__ == module.__name__):
                         handlers.append(obj)
-                        logger.info(f"加载站点处理器: {obj.__name__}")
+                        logger.debug(f"加载站点处理器: {obj.__name__}")
             
             except Exception as e:
                 logger.error(f"加载站点处理器模块 {module_name} 失败: {str(e)}")
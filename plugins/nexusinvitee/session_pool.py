@@ -0,0 +1,208 @@
+"""
+HTTP连接池模块
+按站点主机复用连接，避免每次刷新、每个处理器请求都重新进行TCP和TLS握手
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from plugins.nexusinvitee.metrics import RequestRecorder
+from plugins.nexusinvitee.site_health import CircuitOpenError, SiteHealthTracker
+
+
+class _PooledSession(requests.Session):
+    """
+    使用共享连接池的会话
+    请求头和Cookie等状态仍然是会话独有的，关闭会话时不关闭共享的连接池
+    设置了健康跟踪器时，按主机调整超时、记录请求结果，熔断中的主机直接失败
+    设置了请求记录器时，记录每个请求的阶段、耗时和字节数；流式请求由读取方在读完后记录
+    """
+    tracker: Optional[SiteHealthTracker] = None
+    recorder: Optional[RequestRecorder] = None
+
+    def request(self, method, url, *args, **kwargs):
+        if self.tracker is None and self.recorder is None:
+            return super().request(method, url, *args, **kwargs)
+
+        host = urlparse(url).netloc.lower()
+        if self.tracker:
+            allowed, remaining = self.tracker.allow(host)
+            if not allowed:
+                raise CircuitOpenError(f"{host} 连续请求失败已熔断，{remaining} 秒后重试")
+            if kwargs.get("timeout"):
+                kwargs["timeout"] = self.tracker.timeout(host, kwargs["timeout"])
+
+        start = time.monotonic()
+        try:
+            response = super().request(method, url, *args, **kwargs)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if self.tracker:
+                self.tracker.record_failure(host, type(e).__name__)
+            raise
+        elapsed = time.monotonic() - start
+        if self.tracker:
+            if response.status_code >= 500:
+                self.tracker.record_failure(host, f"HTTP {response.status_code}")
+            else:
+                self.tracker.record_success(host, elapsed)
+        if self.recorder and not kwargs.get("stream"):
+            self.recorder.record(url, elapsed, len(response.content))
+        return response
+
+    def close(self):
+        self.adapters.clear()
+
+
+class SessionPool:
+    """
+    按站点主机管理的连接池，插件运行期间跨刷新保留
+
+    每个站点主机对应一个 HTTPAdapter，其中按实际请求的主机（如 M-Team 的 API 域名）各维护一个连接池。
+    每次获取的会话都是新的，同一主机的多个站点不会互相影响请求头和Cookie，但底层连接是复用的。
+    """
+
+    def __init__(self, pool_connections: int = 4, pool_maxsize: int = 4, max_idle: int = 3600,
+                 adapter_factory: Optional[Callable[..., HTTPAdapter]] = None,
+                 tracker: Optional[SiteHealthTracker] = None):
+        """
+        初始化连接池
+        :param pool_connections: 每个站点主机缓存的目标主机连接池数量
+        :param pool_maxsize: 每个目标主机保留的最大连接数，应不小于处理器的翻页并发数
+        :param max_idle: 站点主机超过该秒数未使用时释放其连接
+        :param adapter_factory: 创建适配器的函数，默认为 HTTPAdapter，基准测试用于替换为本地重定向适配器
+        :param tracker: 站点健康跟踪器，为None时不调整超时也不熔断
+        """
+        self.tracker = tracker
+        self.adapter_factory = adapter_factory or HTTPAdapter
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.max_idle = max_idle
+        self._adapters: Dict[str, HTTPAdapter] = {}
+        self._last_used: Dict[str, float] = {}
+        # 已释放的连接池的累计统计
+        self._retired = {"requests": 0, "connections": 0}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _host_key(site_url: str) -> str:
+        """
+        获取站点URL对应的主机标识
+        :param site_url: 站点URL
+        :return: 主机标识
+        """
+        return urlparse(site_url or "").netloc.lower()
+
+    def _get_adapter(self, host: str) -> HTTPAdapter:
+        with self._lock:
+            adapter = self._adapters.get(host)
+            if adapter is None:
+                adapter = self.adapter_factory(pool_connections=self.pool_connections,
+                                               pool_maxsize=self.pool_maxsize)
+                self._adapters[host] = adapter
+            self._last_used[host] = time.monotonic()
+            return adapter
+
+    def session(self, site_url: str, recorder: Optional[RequestRecorder] = None) -> requests.Session:
+        """
+        获取使用共享连接池的会话
+        :param site_url: 站点URL
+        :param recorder: 请求记录器，为None时不记录请求指标
+        :return: 请求会话
+        """
+        adapter = self._get_adapter(self._host_key(site_url))
+        session = _PooledSession()
+        session.tracker = self.tracker
+        session.recorder = recorder
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @staticmethod
+    def _adapter_counters(adapter: HTTPAdapter) -> Dict[str, int]:
+        """
+        汇总适配器中各连接池的请求数和新建连接数
+        :param adapter: 适配器
+        :return: {"requests": 请求数, "connections": 新建连接数}
+        """
+        counters = {"requests": 0, "connections": 0}
+        managers = [adapter.poolmanager] + list(adapter.proxy_manager.values())
+        for manager in managers:
+            if manager is None:
+                continue
+            pools = manager.pools
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is None:
+                    continue
+                counters["requests"] += getattr(pool, "num_requests", 0)
+                counters["connections"] += getattr(pool, "num_connections", 0)
+        return counters
+
+    def prune(self) -> int:
+        """
+        释放长时间未使用的站点主机连接
+        :return: 释放的站点主机数
+        """
+        now = time.monotonic()
+        with self._lock:
+            idle_hosts = [host for host, last_used in self._last_used.items() if now - last_used > self.max_idle]
+            adapters = [self._adapters.pop(host) for host in idle_hosts]
+            for host in idle_hosts:
+                self._last_used.pop(host, None)
+        for adapter in adapters:
+            self._retire(adapter)
+        return len(adapters)
+
+    def _retire(self, adapter: HTTPAdapter):
+        counters = self._adapter_counters(adapter)
+        with self._lock:
+            self._retired["requests"] += counters["requests"]
+            self._retired["connections"] += counters["connections"]
+        adapter.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取连接复用统计（累计值）
+        :return: {"hosts": 站点主机数, "requests": 请求数, "connections": 新建连接数, "reused": 复用连接的请求数}
+        """
+        with self._lock:
+            adapters = list(self._adapters.values())
+            totals = dict(self._retired)
+        for adapter in adapters:
+            for key, value in self._adapter_counters(adapter).items():
+                totals[key] += value
+        return {
+            "hosts": len(adapters),
+            "requests": totals["requests"],
+            "connections": totals["connections"],
+            "reused": max(totals["requests"] - totals["connections"], 0),
+        }
+
+    @staticmethod
+    def diff(before: Dict[str, Any], after: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        计算两次统计之间的差值，用于单次刷新的连接复用统计
+        :param before: 刷新前的统计
+        :param after: 刷新后的统计
+        :return: 差值统计，附带复用率
+        """
+        result = {key: max(after.get(key, 0) - (before or {}).get(key, 0), 0)
+                  for key in ("requests", "connections", "reused")}
+        result["hosts"] = after.get("hosts", 0)
+        result["reuse_rate"] = round(result["reused"] / result["requests"], 3) if result["requests"] > 0 else 0
+        return result
+
+    def close(self):
+        """
+        关闭所有连接
+        """
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+            self._last_used.clear()
+        for adapter in adapters:
+            self._retire(adapter)
@@ -0,0 +1,201 @@
+"""
+站点健康跟踪模块
+按主机记录请求耗时，根据观测到的P95耗时收紧超时时间，连续失败时熔断，失效的站点直接跳过并按退避时间重试
+"""
+import math
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+
+# 熔断状态
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """
+    主机处于熔断状态，请求未发出
+    """
+
+
+class _HostState:
+    """
+    单个主机的请求统计和熔断状态
+    """
+
+    def __init__(self, sample_size: int):
+        self.latencies = deque(maxlen=sample_size)
+        self.consecutive_failures = 0
+        self.state = CIRCUIT_CLOSED
+        self.open_until = 0.0
+        self.backoff = 0.0
+        self.last_error = ""
+        self.last_failure = 0.0
+        # 半开状态下已放行、尚未返回结果的试探请求
+        self.probe_in_flight = False
+        self.probe_started = 0.0
+
+
+class SiteHealthTracker:
+    """
+    按主机统计请求耗时和失败次数
+
+    - 超时：样本足够时，读取超时取 P95 耗时的若干倍，不超过调用方指定的超时
+    - 熔断：连续失败达到阈值后熔断，在退避时间内的请求直接失败；退避时间到期后只放行一个请求试探，
+      试探返回前其他请求直接失败，成功则恢复，失败则退避时间加倍
+    """
+
+    def __init__(self, failure_threshold: int = 3, base_backoff: float = 300, max_backoff: float = 6 * 3600,
+                 sample_size: int = 50, min_samples: int = 5, timeout_factor: float = 3.0,
+                 min_timeout: float = 5.0, probe_timeout: float = 120):
+        """
+        初始化健康跟踪器
+        :param failure_threshold: 触发熔断的连续失败次数
+        :param base_backoff: 首次熔断的退避秒数
+        :param max_backoff: 最大退避秒数
+        :param sample_size: 每个主机保留的耗时样本数
+        :param min_samples: 开始自适应超时所需的最少样本数
+        :param timeout_factor: 读取超时相对P95耗时的倍数
+        :param min_timeout: 自适应读取超时的下限秒数
+        :param probe_timeout: 试探请求超过该秒数仍未返回结果时，允许放行新的试探请求
+        """
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.sample_size = sample_size
+        self.min_samples = min_samples
+        self.timeout_factor = timeout_factor
+        self.min_timeout = min_timeout
+        self.probe_timeout = probe_timeout
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _get_state(self, host: str) -> _HostState:
+        state = self._hosts.get(host)
+        if state is None:
+            state = self._hosts[host] = _HostState(self.sample_size)
+        return state
+
+    @staticmethod
+    def _percentile(samples, percent: float) -> float:
+        ordered = sorted(samples)
+        index = max(math.ceil(len(ordered) * percent / 100) - 1, 0)
+        return ordered[index]
+
+    def timeout(self, host: str, requested: Any) -> Any:
+        """
+        根据主机的历史耗时计算本次请求的超时
+        :param host: 主机
+        :param requested: 调用方指定的超时，秒数或 (连接超时, 读取超时)
+        :return: 超时时间，不会超过调用方指定的值
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or len(state.latencies) < self.min_samples:
+                return requested
+            p95 = self._percentile(state.latencies, 95)
+        adaptive = max(p95 * self.timeout_factor, self.min_timeout)
+        if isinstance(requested, tuple):
+            connect, read = requested
+            return (min(connect, adaptive) if connect else adaptive,
+                    min(read, adaptive) if read else adaptive)
+        return min(requested, adaptive) if requested else adaptive
+
+    def allow(self, host: str, probe: bool = True) -> Tuple[bool, int]:
+        """
+        判断主机当前是否允许请求，退避时间到期后转为半开状态，只放行一个试探请求
+        :param host: 主机
+        :param probe: 是否作为试探请求放行；只检查状态、不发出请求时传False，不占用试探名额
+        :return: (是否允许, 距离重试的剩余秒数)
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state or state.state == CIRCUIT_CLOSED:
+                return True, 0
+            now = time.time()
+            if state.state == CIRCUIT_OPEN:
+                remaining = state.open_until - now
+                if remaining > 0:
+                    return False, math.ceil(remaining)
+                state.state = CIRCUIT_HALF_OPEN
+                state.probe_in_flight = False
+            # 试探请求返回前拒绝其他请求；试探请求长时间未返回结果（如异常未被记录）时视为丢失
+            if state.probe_in_flight and now - state.probe_started < self.probe_timeout:
+                return False, max(math.ceil(state.probe_started + self.probe_timeout - now), 1)
+            if probe:
+                state.probe_in_flight = True
+                state.probe_started = now
+            return True, 0
+
+    def record_success(self, host: str, elapsed: float):
+        """
+        记录一次成功请求
+        :param host: 主机
+        :param elapsed: 耗时(秒)
+        """
+        with self._lock:
+            state = self._get_state(host)
+            state.latencies.append(elapsed)
+            state.consecutive_failures = 0
+            state.state = CIRCUIT_CLOSED
+            state.backoff = 0.0
+            state.probe_in_flight = False
+
+    def record_failure(self, host: str, error: str):
+        """
+        记录一次失败请求，达到阈值或半开试探失败时熔断
+        :param host: 主机
+        :param error: 失败原因
+        """
+        with self._lock:
+            state = self._get_state(host)
+            state.consecutive_failures += 1
+            state.last_error = error
+            state.last_failure = time.time()
+            state.probe_in_flight = False
+            if state.state == CIRCUIT_HALF_OPEN or (state.state == CIRCUIT_CLOSED
+                                                   and state.consecutive_failures >= self.failure_threshold):
+                state.backoff = min(state.backoff * 2 if state.backoff else self.base_backoff, self.max_backoff)
+                state.state = CIRCUIT_OPEN
+                state.open_until = time.time() + state.backoff
+
+    def host_status(self, host: str) -> Optional[Dict[str, Any]]:
+        """
+        获取主机的健康状态
+        :param host: 主机
+        :return: 健康状态，没有请求记录时返回None
+        """
+        with self._lock:
+            state = self._hosts.get(host)
+            if not state:
+                return None
+            return {
+                "state": state.state,
+                "consecutive_failures": state.consecutive_failures,
+                "retry_at": int(state.open_until) if state.state != CIRCUIT_CLOSED else None,
+                "backoff": int(state.backoff),
+                "p95_ms": round(self._percentile(state.latencies, 95) * 1000) if state.latencies else None,
+                "samples": len(state.latencies),
+                "last_error": state.last_error,
+            }
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有主机的健康状态
+        :return: {主机: 健康状态}
+        """
+        with self._lock:
+            hosts = list(self._hosts.keys())
+        return {host: self.host_status(host) for host in sorted(hosts)}
+
+    def open_circuits(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取非正常状态的主机
+        :return: {主机: 健康状态}
+        """
+        return {host: status for host, status in self.snapshot().items()
+                if status and status["state"] != CIRCUIT_CLOSED}
@@ -2,14 +2,33 @@
 NexusPHP站点邀请系统解析器基类
 """
 import re
+import time
 from abc import ABCMeta, abstractmethod
-from typing import Dict, Optional, Any
+from typing import Callable, Dict, Optional, Any
 
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from urllib.parse import urljoin
 
 from app.log import logger
+from plugins.nexusinvitee.async_crawl import AsyncSession
+from plugins.nexusinvitee.incremental import PageCache
+from plugins.nexusinvitee.metrics import RequestRecorder
+from plugins.nexusinvitee.models import parse_size
+from plugins.nexusinvitee.streaming import DEFAULT_DRAIN_LIMIT, fetch_until_table_end
+
+# 优先使用lxml解析HTML，未安装时回退到内置的html.parser
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+# 只解析表格元素，用于仅需要后宫成员表格的页面
+TABLE_STRAINER = SoupStrainer("table")
+
+# 检测到未登录时的失败原因，插件据此判断刷新失败
+LOGIN_FAILED_REASON = "访问邀请页面时未登录或Cookie已失效"
 
 
 class _ISiteHandler(metaclass=ABCMeta):
@@ -18,6 +37,22 @@ class _ISiteHandler(metaclass=ABCMeta):
     """
     # 站点类型标识
     site_schema = ""
+    # 同一站点的最大并发请求数，同步翻页的线程数和异步会话的并发数都受此限制
+    max_page_workers = 3
+    # 流式读取翻页时，读完表格后剩余内容不超过该字节数则继续读完，以便复用连接
+    stream_drain_limit = DEFAULT_DRAIN_LIMIT
+    # 页面解析缓存，增量刷新时由插件在调用 parse_invite_page 前设置
+    page_cache: Optional[PageCache] = None
+    # 异步会话，通过 parse_invite_page_async 调用时设置，可用于在共享事件循环中并发请求
+    async_session: Optional[AsyncSession] = None
+    # 身份缓存中的用户ID，Cookie未变化时由插件设置，处理器据此跳过获取用户ID的请求
+    cached_user_id: Optional[str] = None
+    # 本次解析使用的用户ID，解析完成后由插件写入身份缓存
+    resolved_user_id: Optional[str] = None
+    # 本次解析是否检测到未登录，插件据此使身份缓存失效
+    login_failed: bool = False
+    # 请求记录器，由插件在调用 parse_invite_page 前设置，用于记录页面解析耗时
+    recorder: Optional[RequestRecorder] = None
     
     @classmethod
     @abstractmethod
@@ -39,6 +74,108 @@ class _ISiteHandler(metaclass=ABCMeta):
         """
         pass
 
+    async def parse_invite_page_async(self, site_info: Dict[str, Any], session: AsyncSession) -> Dict[str, Any]:
+        """
+        异步解析站点邀请页面，默认在线程池中执行同步的 parse_invite_page
+        需要大量并发请求的处理器可以重写此方法，或在同步流程中通过 self.async_session 提交异步请求
+        :param site_info: 站点信息
+        :param session: 异步会话
+        :return: 解析结果
+        """
+        self.async_session = session
+        return await session.run_handler(self.parse_invite_page, site_info, session.sync_session)
+
+    async def _get_page_async(self, session: AsyncSession, url: str, **kwargs):
+        """
+        异步获取可增量处理的页面，存在缓存时附带条件请求头
+        :param session: 异步会话
+        :param url: 页面URL
+        :return: 响应对象
+        """
+        if self.page_cache is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **self.page_cache.conditional_headers(url)}
+        return await session.get(url, **kwargs)
+
+    @staticmethod
+    def _parse_html(html_content: str, only_tables: bool = False) -> BeautifulSoup:
+        """
+        解析HTML内容，所有站点处理器统一通过此方法构建BeautifulSoup对象
+        :param html_content: HTML内容
+        :param only_tables: 是否只解析表格元素，适用于只需要后宫成员表格的翻页内容
+        :return: BeautifulSoup对象
+        """
+        return BeautifulSoup(html_content, HTML_PARSER, parse_only=TABLE_STRAINER if only_tables else None)
+
+    def _get_page(self, session: requests.Session, url: str, until_invitee_table: bool = False,
+                  **kwargs) -> requests.Response:
+        """
+        获取可增量处理的页面，存在缓存时附带条件请求头
+        :param session: 请求会话
+        :param url: 页面URL
+        :param until_invitee_table: 是否流式读取，读到后宫成员表格结束即停止，适用于只需要表格的翻页
+        :return: 响应对象
+        """
+        if self.page_cache is not None:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **self.page_cache.conditional_headers(url)}
+        if until_invitee_table:
+            return fetch_until_table_end(session, url, drain_limit=self.stream_drain_limit, **kwargs)
+        return session.get(url, **kwargs)
+
+    def _parse_page(self, url: str, response: requests.Response,
+                    parse_func: Callable[[str], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        解析可增量处理的页面，未启用增量刷新时直接解析
+        :param url: 页面URL
+        :param response: 响应对象
+        :param parse_func: 解析函数，参数为HTML内容
+        :return: 解析结果
+        """
+        start = time.perf_counter()
+        try:
+            if self.page_cache is None:
+                return parse_func(response.text)
+            return self.page_cache.parse(url, response, parse_func)
+        finally:
+            self._record_parse(url, start)
+
+    def _record_parse(self, url: str, start: float):
+        """
+        记录页面解析耗时，翻页并发请求时无法从总耗时中扣除网络耗时得到解析耗时，因此直接测量
+        :param url: 页面URL
+        :param start: 开始解析时的 time.perf_counter()
+        """
+        if self.recorder:
+            self.recorder.record_parse(url, time.perf_counter() - start)
+
+    def _check_login(self, site_name: str, html_content: str, soup: Optional[BeautifulSoup] = None) -> bool:
+        """
+        检查页面是否处于登录状态，Cookie失效时站点会返回登录表单或登录提示
+        检测到未登录时设置 login_failed，插件据此使身份缓存失效并保留旧数据
+        :param site_name: 站点名称
+        :param html_content: 页面HTML内容
+        :param soup: 已解析的页面，未提供时重新解析
+        :return: 是否已登录
+        """
+        if soup is None:
+            soup = self._parse_html(html_content)
+        login_elements = soup.select('form[action*="takelogin.php"], input[name="password"], div.error:-soup-contains("需要登录")')
+        login_text_match = re.search(r'(需要登录|请登录|login required|please log in)', html_content, re.IGNORECASE)
+        if login_elements or login_text_match:
+            self.login_failed = True
+            logger.error(f"站点 {site_name} 检查失败: {LOGIN_FAILED_REASON}")
+            return False
+        return True
+
+    def _resolve_user_id(self, session: requests.Session, site_url: str) -> Optional[str]:
+        """
+        获取用户ID，优先使用身份缓存，未命中时访问个人信息页面
+        :param session: 请求会话
+        :param site_url: 站点URL
+        :return: 用户ID
+        """
+        self.resolved_user_id = self.cached_user_id or self._get_user_id(session, site_url)
+        return self.resolved_user_id
+
     @staticmethod
     def _get_user_id(session: requests.Session, site_url: str) -> Optional[str]:
         """
@@ -54,7 +191,7 @@ class _ISiteHandler(metaclass=ABCMeta):
             response.raise_for_status()
             
             # 解析页面获取用户ID
-            soup = BeautifulSoup(response.text, 'html.parser')
+            soup = _ISiteHandler._parse_html(response.text)
             
             # 方法1: 从个人信息链接获取
             user_link = soup.select_one('a[href*="userdetails.php"]')
@@ -82,77 +219,7 @@ class _ISiteHandler(metaclass=ABCMeta):
         :param size_str: 大小字符串
         :return: 字节数
         """
-        if not size_str or size_str.strip() == '':
-            logger.warning(f"空的大小字符串")
-            return 0
-
-        # 处理特殊情况
-        if size_str.lower() == 'inf.' or size_str.lower() == 'inf' or size_str == '∞':
-            logger.info(f"识别到无限大值: {size_str}")
-            return 1e20  # 使用一个非常大的数值代替无穷大
-
-        try:
-            # 标准化字符串，替换逗号为点
-            size_str = size_str.replace(',', '.')
-
-            # 分离数字和单位
-            # 正则表达式匹配数字部分和单位部分
-            matches = re.match(
-                r'([\d.]+)\s*([KMGTPEZY]?i?B)', size_str, re.IGNORECASE)
-
-            if not matches:
-                # 尝试匹配仅有数字的情况
-                try:
-                    return float(size_str)
-                except ValueError:
-                    logger.warning(f"无法解析大小字符串: {size_str}")
-                    return 0
-
-            size_num, unit = matches.groups()
-
-            # 尝试转换数字
-            try:
-                size_value = float(size_num)
-            except ValueError:
-                logger.warning(f"无法转换大小值为浮点数: {size_num}")
-                return 0
-
-            # 单位转换
-            unit = unit.upper()
-
-            units = {
-                'B': 1,
-                'KB': 1024,
-                'KIB': 1024,
-                'MB': 1024 ** 2,
-                'MIB': 1024 ** 2,
-                'GB': 1024 ** 3,
-                'GIB': 1024 ** 3,
-                'TB': 1024 ** 4,
-                'TIB': 1024 ** 4,
-                'PB': 1024 ** 5,
-                'PIB': 1024 ** 5,
-                'EB': 1024 ** 6,
-                'EIB': 1024 ** 6,
-                'ZB': 1024 ** 7,
-                'ZIB': 1024 ** 7,
-                'YB': 1024 ** 8,
-                'YIB': 1024 ** 8
-            }
-
-            # 处理简写单位
-            if unit in ['K', 'M', 'G', 'T', 'P', 'E', 'Z', 'Y']:
-                unit = unit + 'B'
-
-            if unit not in units:
-                logger.warning(f"未知的大小单位: {unit}")
-                return size_value  # 假设是字节
-
-            return size_value * units[unit]
-
-        except Exception as e:
-            logger.warning(f"转换大小字符串到字节时出错 '{size_str}': {str(e)}")
-            return 0
+        return parse_size(size_str)
 
     @staticmethod
     def _calculate_ratio(uploaded: str, downloaded: str) -> str:
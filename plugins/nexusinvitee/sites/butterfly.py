@@ -9,7 +9,7 @@ import requests
 from bs4 import BeautifulSoup
 
 from app.log import logger
-from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.sites import LOGIN_FAILED_REASON, _ISiteHandler
 
 
 class ButterflyHandler(_ISiteHandler):
@@ -36,7 +36,7 @@ class ButterflyHandler(_ISiteHandler):
         site_url_lower = site_url.lower()
         for feature in butterfly_features:
             if feature in site_url_lower:
-                logger.info(f"匹配到蝶粉站点特征: {feature}")
+                logger.debug(f"匹配到蝶粉站点特征: {feature}")
                 return True
         
         return False
@@ -66,7 +66,7 @@ class ButterflyHandler(_ISiteHandler):
         
         try:
             # 获取用户ID
-            user_id = self._get_user_id(session, site_url)
+            user_id = self._resolve_user_id(session, site_url)
             if not user_id:
                 logger.error(f"站点 {site_name} 无法获取用户ID")
                 result["invite_status"]["reason"] = "无法获取用户ID，请检查站点Cookie是否有效"
@@ -77,8 +77,12 @@ class ButterflyHandler(_ISiteHandler):
             response = session.get(invite_url, timeout=(10, 30))
             response.raise_for_status()
             
-            # 解析邀请页面
-            invite_result = self._parse_butterfly_invite_page(site_name, site_url, response.text)
+            # 解析邀请页面，解析结果同时用于查找翻页链接
+            invite_soup = self._parse_html(response.text)
+            if not self._check_login(site_name, response.text, soup=invite_soup):
+                result["invite_status"]["reason"] = LOGIN_FAILED_REASON
+                return result
+            invite_result = self._parse_butterfly_invite_page(site_name, site_url, response.text, soup=invite_soup)
             
             # 获取魔力值商店页面，尝试解析邀请价格
             try:
@@ -153,7 +157,7 @@ class ButterflyHandler(_ISiteHandler):
                 max_pages = 100  # 防止无限循环
                 
                 # 从首页中查找下一页链接
-                soup = BeautifulSoup(response.text, 'html.parser')
+                soup = invite_soup
                 
                 # 继续获取后续页面，直到没有更多数据或达到最大页数
                 while current_page < max_pages:
@@ -182,10 +186,10 @@ class ButterflyHandler(_ISiteHandler):
                         next_response.raise_for_status()
                         
                         # 更新soup以便下次查找翻页链接
-                        soup = BeautifulSoup(next_response.text, 'html.parser')
+                        soup = self._parse_html(next_response.text)
                         
                         # 解析下一页数据
-                        next_page_result = self._parse_butterfly_invite_page(site_name, site_url, next_response.text, is_next_page=True)
+                        next_page_result = self._parse_butterfly_invite_page(site_name, site_url, next_response.text, is_next_page=True, soup=soup)
                         
                         # 如果没有找到任何后宫成员，说明已到达最后一页
                         if not next_page_result["invitees"]:
@@ -248,7 +252,8 @@ class ButterflyHandler(_ISiteHandler):
             result["invite_status"]["reason"] = f"解析邀请页面失败: {str(e)}"
             return result
     
-    def _parse_butterfly_invite_page(self, site_name: str, site_url: str, html_content: str, is_next_page: bool = False, is_send_page: bool = False) -> Dict[str, Any]:
+    def _parse_butterfly_invite_page(self, site_name: str, site_url: str, html_content: str, is_next_page: bool = False, is_send_page: bool = False,
+                                     soup: Optional[BeautifulSoup] = None) -> Dict[str, Any]:
         """
         解析蝶粉站点邀请页面HTML内容
         :param site_name: 站点名称
@@ -256,6 +261,7 @@ class ButterflyHandler(_ISiteHandler):
         :param html_content: HTML内容
         :param is_next_page: 是否是翻页内容，如果是则只提取后宫成员数据
         :param is_send_page: 是否是发送邀请页面
+        :param soup: 已解析的页面，传入时不再重复解析
         :return: 解析结果
         """
         result = {
@@ -268,8 +274,9 @@ class ButterflyHandler(_ISiteHandler):
             "invitees": []
         }
         
-        # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 初始化BeautifulSoup对象，已解析时直接复用
+        if soup is None:
+            soup = self._parse_html(html_content)
         
         # 检查是否有特殊标题，如"我的后宫"或"邀請系統"等
         special_title = False
@@ -704,7 +711,7 @@ class ButterflyHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 1. 查找当前魔力值
             # 查找包含魔力值的文本，常见格式如 "魔力值: 1,234" "积分/魔力值/欢乐值: 1,234" 等
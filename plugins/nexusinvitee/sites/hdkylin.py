@@ -8,10 +8,9 @@ from urllib.parse import urljoin
 import traceback
 
 import requests
-from bs4 import BeautifulSoup
 
 from app.log import logger
-from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.sites import LOGIN_FAILED_REASON, _ISiteHandler
 
 
 class HdkylinHandler(_ISiteHandler):
@@ -30,7 +29,7 @@ class HdkylinHandler(_ISiteHandler):
         """
         # 仅通过域名精确匹配
         if "hdkyl.in" in site_url.lower():
-            logger.info(f"匹配到麒麟站点: {site_url}")
+            logger.debug(f"匹配到麒麟站点: {site_url}")
             return True
         return False
 
@@ -71,7 +70,7 @@ class HdkylinHandler(_ISiteHandler):
                 # 尝试访问站点首页获取 info_block 来提取 user_id 和初始信息
                 index_response = session.get(site_url, timeout=(10, 30))
                 index_response.raise_for_status()
-                index_soup = BeautifulSoup(index_response.text, 'html.parser')
+                index_soup = self._parse_html(index_response.text)
                 info_block = index_soup.select_one('#info_block')
                 
                 if info_block:
@@ -82,6 +81,7 @@ class HdkylinHandler(_ISiteHandler):
                        match_id = re.search(r'id=(\d+)', invite_link_tag['href'])
                        if match_id:
                            user_id = match_id.group(1)
+                           self.resolved_user_id = user_id
                            logger.info(f"站点 {site_name} 从 info_block 提取到用户ID: {user_id}")
                            invite_page_url = urljoin(site_url, f"invite.php?id={user_id}")
                        else:
@@ -91,7 +91,7 @@ class HdkylinHandler(_ISiteHandler):
 
                 # 如果无法从 info_block 获取 user_id，尝试通用方法
                 if not user_id:
-                    user_id = self._get_user_id(session, site_url)
+                    user_id = self._resolve_user_id(session, site_url)
                     if user_id:
                         logger.info(f"站点 {site_name} 通过通用方法获取到用户ID: {user_id}")
                         invite_page_url = urljoin(site_url, f"invite.php?id={user_id}")
@@ -110,7 +110,10 @@ class HdkylinHandler(_ISiteHandler):
                 invite_response = session.get(invite_page_url, timeout=(10, 30))
                 invite_response.raise_for_status()
                 invite_page_html = invite_response.text
-                invite_soup = BeautifulSoup(invite_page_html, 'html.parser')
+                invite_soup = self._parse_html(invite_page_html)
+                if not self._check_login(site_name, invite_page_html, soup=invite_soup):
+                    result["invite_status"]["reason"] = LOGIN_FAILED_REASON
+                    return result
 
                 # 解析 info_block (如果首页没取到，这里再取一次)
                 if not info_block_text:
@@ -196,7 +199,7 @@ class HdkylinHandler(_ISiteHandler):
                 bonus_url = urljoin(site_url, "mybonus.php")
                 bonus_response = session.get(bonus_url, timeout=(10, 30))
                 bonus_response.raise_for_status()
-                bonus_soup = BeautifulSoup(bonus_response.text, 'html.parser')
+                bonus_soup = self._parse_html(bonus_response.text)
 
                 # --- 解析当前魔力值 ---
                 # 更精确地定位包含魔力值的文本节点
@@ -304,7 +307,7 @@ class HdkylinHandler(_ISiteHandler):
 
     # 辅助方法：从页面解析邀请状态 (移植自NexusPhpHandler._parse_nexusphp_invite_page)
     def _parse_invite_status_from_page(self, site_name: str, html_content: str) -> Dict[str, Any]:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._parse_html(html_content)
         invite_status = {"can_invite": False, "reason": "", "permanent_count": 0, "temporary_count": 0}
 
         # 1. 检查 info_block (如果存在)
@@ -400,7 +403,7 @@ class HdkylinHandler(_ISiteHandler):
 
     # 辅助方法：解析被邀请人表格 (移植自NexusPhpHandler._parse_nexusphp_invite_page)
     def _parse_invitee_table(self, site_name: str, html_content: str, site_url: str) -> List[Dict[str, Any]]:
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._parse_html(html_content, only_tables=True)
         invitees = []
         # 麒麟站使用 table[border="1"] 作为主要用户表格
         invitee_tables = soup.select('table[border="1"]')
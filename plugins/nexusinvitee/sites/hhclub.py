@@ -7,11 +7,10 @@ from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
 
 from app.log import logger
 from app.db.site_oper import SiteOper
-from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.sites import LOGIN_FAILED_REASON, _ISiteHandler
 
 
 class HHClubHandler(_ISiteHandler):
@@ -38,7 +37,7 @@ class HHClubHandler(_ISiteHandler):
         site_url_lower = site_url.lower()
         for feature in hhclub_features:
             if feature in site_url_lower:
-                logger.info(f"匹配到憨憨站点特征: {feature}")
+                logger.debug(f"匹配到憨憨站点特征: {feature}")
                 return True
         
         return False
@@ -71,7 +70,7 @@ class HHClubHandler(_ISiteHandler):
         
         try:
             # 获取用户ID
-            user_id = self._get_user_id(session, site_url)
+            user_id = self._resolve_user_id(session, site_url)
             if not user_id:
                 logger.error(f"站点 {site_name} 无法获取用户ID")
                 result["invite_status"]["reason"] = "无法获取用户ID，请检查站点Cookie是否有效"
@@ -94,6 +93,9 @@ class HHClubHandler(_ISiteHandler):
                 invite_url = urljoin(site_url, f"invite.php?id={user_id}")
                 response = session.get(invite_url, timeout=(10, 30))
                 response.raise_for_status()
+                if not self._check_login(site_name, response.text):
+                    result["invite_status"]["reason"] = LOGIN_FAILED_REASON
+                    return result
                 invite_button_info = self._check_hhclub_invite_permission(site_name, response.text)
                 result["invite_status"]["can_invite"] = invite_button_info["can_invite"]
                 if result["invite_status"]["can_invite"]:
@@ -214,7 +216,7 @@ class HHClubHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 方法1: 查找包含"邀请"的行（原有逻辑）
             invite_row = soup.select_one('td.rowhead:-soup-contains("邀请") + td.rowfollow')
@@ -303,7 +305,7 @@ class HHClubHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 首先检查是否有"对不起"消息 - 如果有，一定是不可邀请
             # 尝试多种可能的选择器来匹配"对不起"消息
@@ -417,7 +419,7 @@ class HHClubHandler(_ISiteHandler):
         }
 
         # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._parse_html(html_content)
 
         # 检查是否有"没有被邀者"的提示信息
         no_invitee_div = soup.select_one('div:-soup-contains("没有被邀者")')
@@ -670,7 +672,7 @@ class HHClubHandler(_ISiteHandler):
         }
         
         # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._parse_html(html_content)
         
         try:
             # 1. 查找当前魔力值 - 憨憨站点特定格式
@@ -725,7 +727,7 @@ class HHClubHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 查找用户信息面板
             user_panel = soup.select_one('#user-info-panel')
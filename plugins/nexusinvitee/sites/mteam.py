@@ -8,6 +8,7 @@ import re
 
 from app.log import logger
 from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.models import RATIO_INFINITE
 
 
 class MTeamHandler(_ISiteHandler):
@@ -37,7 +38,7 @@ class MTeamHandler(_ISiteHandler):
         site_url_lower = site_url.lower()
         for feature in mteam_features:
             if feature in site_url_lower:
-                logger.info(f"匹配到M-Team站点特征: {feature}")
+                logger.debug(f"匹配到M-Team站点特征: {feature}")
                 return True
         
         return False
@@ -258,8 +259,10 @@ class MTeamHandler(_ISiteHandler):
             # --- 修正结束 ---
 
             # 使用修正后的 headers 发送 POST 请求，不带 uid 参数，不显式设置 Content-Type
-            # 注意：这里直接用 requests.post 而不是 session.post，避免 session 默认 headers 干扰
-            response = requests.post(profile_url, headers=request_headers, timeout=(10, 30), proxies=session.proxies)
+            # 注意：session 默认 headers 会干扰该接口，值为 None 的请求头会被 requests 移除，
+            # 这样既不带 session 默认 headers，又能复用 session 的连接池
+            request_headers = {**{key: None for key in session.headers}, **request_headers}
+            response = session.post(profile_url, headers=request_headers, timeout=(10, 30))
             
             if response.status_code != 200:
                 logger.error(f"站点 {site_name} 获取用户信息失败，状态码: {response.status_code}")
@@ -351,20 +354,22 @@ class MTeamHandler(_ISiteHandler):
                 status = "待确认"
                     
                     # 创建用户记录
+            # 流量直接输出字节数，无需在入库时再解析显示字符串
             user = {
                 "username": invitee.get("username", ""),
                 "email": invitee.get("email", ""),
-                "uploaded": self._format_size(uploaded),
-                "downloaded": self._format_size(downloaded),
+                "uploaded": int(uploaded),
+                "downloaded": int(downloaded),
+                "ratio_value": uploaded / downloaded if downloaded > 0 else RATIO_INFINITE,
                         "ratio": ratio,
                         "status": status,
                 "enabled": "Yes" if status == "已确认" else "No",
                 "uid": invitee.get("uid", ""),
                 # 由于API返回数据中没有这些字段，设置为默认值
-                        "seed_bonus": "0",
-                        "seeding": "0",
-                        "seeding_size": "0 B",
-                        "seed_magic": "0",
+                        "seed_bonus": 0,
+                        "seeding": 0,
+                        "seeding_size": 0,
+                        "seed_magic": 0,
                 "last_seen": ""
             }
             result.append(user)
@@ -389,25 +394,6 @@ class MTeamHandler(_ISiteHandler):
             # 即使更新失败，仍然返回True，因为这不影响主要功能
             return True
 
-    def _format_size(self, size_bytes: float) -> str:
-        """
-        格式化文件大小
-        :param size_bytes: 字节数
-        :return: 格式化后的大小字符串
-        """
-        try:
-            if not isinstance(size_bytes, (int, float)):
-                return str(size_bytes)
-                
-            for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                if size_bytes < 1024.0:
-                    return f"{size_bytes:.2f} {unit}"
-                size_bytes /= 1024.0
-            return f"{size_bytes:.2f} PB"
-        except Exception as e:
-            logger.warning(f"格式化大小失败: {str(e)}")
-            return "0 B"
-    
     def _calculate_ratio_health(self, ratio_str, uploaded, downloaded):
         """
         计算分享率健康度
@@ -1,16 +1,20 @@
 """
 标准NexusPHP站点处理
 """
+import asyncio
 import re
+import time
 from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 import traceback
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import requests
 from bs4 import BeautifulSoup
 
 from app.log import logger
-from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.async_crawl import AsyncSession
+from plugins.nexusinvitee.sites import LOGIN_FAILED_REASON, _ISiteHandler
 
 
 class NexusPhpHandler(_ISiteHandler):
@@ -99,15 +103,16 @@ class NexusPhpHandler(_ISiteHandler):
         early_check_failed = False
         early_failure_reason = ""
         html_content = "" # Initialize html_content
+        invite_soup = None # Parsed invite page, shared by the login check and the parser
         user_id = None # Initialize user_id
 
         # === Stage 1: Early Connection and Authentication Checks ===
         try:
             logger.debug(f"站点 {site_name} 开始进行早期连接和认证检查...")
 
-            # 1. Get User ID (accesses usercp.php)
+            # 1. Get User ID (accesses usercp.php unless cached for the current cookie)
             try:
-                user_id = self._get_user_id(session, site_url)
+                user_id = self._resolve_user_id(session, site_url)
                 if not user_id:
                     early_failure_reason = "无法获取用户ID，请检查Cookie或站点是否可访问"
                     logger.error(f"站点 {site_name} 检查失败: {early_failure_reason}")
@@ -143,13 +148,11 @@ class NexusPhpHandler(_ISiteHandler):
 
                         # Check page content for login prompts
                         html_content = response.text # Store content for later use if check passes
-                        soup_check = BeautifulSoup(html_content, 'html.parser')
-                        login_elements = soup_check.select('form[action*="takelogin.php"], input[name="password"], div.error:-soup-contains("需要登录")')
-                        login_text_match = re.search(r'(需要登录|请登录|login required|please log in)', html_content, re.IGNORECASE)
-
-                        if login_elements or login_text_match:
-                            early_failure_reason = "访问邀请页面时未登录或Cookie已失效"
-                            logger.error(f"站点 {site_name} 检查失败: {early_failure_reason}")
+                        parse_start = time.perf_counter()
+                        invite_soup = self._parse_html(html_content) # 登录检查与后续解析共用同一次解析结果
+                        self._record_parse(invite_url, parse_start)
+                        if not self._check_login(site_name, html_content, soup=invite_soup):
+                            early_failure_reason = LOGIN_FAILED_REASON
                             early_check_failed = True
                         else:
                              logger.debug(f"站点 {site_name} 邀请页面访问成功且已登录。")
@@ -177,7 +180,12 @@ class NexusPhpHandler(_ISiteHandler):
             try:
                 logger.debug(f"站点 {site_name} 早期检查通过，开始执行页面解析...")
                 # Parse Invite Page (using html_content from Stage 1)
-                invite_result = self._parse_nexusphp_invite_page(site_name, html_content)
+                parse_start = time.perf_counter()
+                invite_result = self._parse_nexusphp_invite_page(site_name, html_content, soup=invite_soup)
+                self._record_parse(invite_url, parse_start)
+                # 首页同时包含邀请状态，每次都需要重新解析
+                if self.page_cache is not None:
+                    self.page_cache.record(False, invite_result)
 
                 # Update result with parsed data
                 result["invite_status"].update({
@@ -249,44 +257,56 @@ class NexusPhpHandler(_ISiteHandler):
                         previous_page_invitee_ids = first_page_invitee_ids
                         logger.debug(f"站点 {site_name} 首页收集到 {len(previous_page_invitee_ids)} 个用户ID用于重复检测")
                     
-                    while next_page < max_pages:
-                        # ... (pagination logic unchanged) ...
-                        next_page_url = urljoin(site_url, f"invite.php?id={user_id}&menu=invitee&page={next_page}")
-                        logger.debug(f"站点 {site_name} 正在获取第 {next_page+1} 页后宫成员数据: {next_page_url}")
-                        try:
-                            next_response = session.get(next_page_url, timeout=(10, 30))
-                            next_response.raise_for_status()
-                            next_page_result = self._parse_nexusphp_invite_page(site_name, next_response.text, is_next_page=True)
+                    # 优先从首页分页栏读取总页数，并发获取剩余页面
+                    last_page = self._get_invitee_last_page(html_content)
+                    if last_page:
+                        logger.debug(f"站点 {site_name} 从分页栏识别到共 {last_page+1} 页后宫成员，开始并发获取")
+                        result["invitees"].extend(
+                            self._fetch_invitee_pages(session, site_name, site_url, user_id,
+                                                      min(last_page, max_pages - 1), previous_page_invitee_ids))
+                    else:
+                        logger.debug(f"站点 {site_name} 未找到分页栏，按顺序逐页获取")
+                        while next_page < max_pages:
+                            # ... (pagination logic unchanged) ...
+                            next_page_url = urljoin(site_url, f"invite.php?id={user_id}&menu=invitee&page={next_page}")
+                            logger.debug(f"站点 {site_name} 正在获取第 {next_page+1} 页后宫成员数据: {next_page_url}")
+                            try:
+                                next_response = self._get_page(session, next_page_url, until_invitee_table=True,
+                                                               timeout=(10, 30))
+                                next_response.raise_for_status()
+                                next_page_result = self._parse_page(
+                                    next_page_url, next_response,
+                                    lambda text: self._parse_nexusphp_invite_page(site_name, text, is_next_page=True))
                             
-                            # --- Repetition Check START ---
-                            if not next_page_result["invitees"]:
-                                logger.debug(f"站点 {site_name} 第 {next_page+1} 页没有后宫成员数据，停止获取")
-                                break
+                                # --- Repetition Check START ---
+                                if not next_page_result["invitees"]:
+                                    logger.debug(f"站点 {site_name} 第 {next_page+1} 页没有后宫成员数据，停止获取")
+                                    break
                                 
-                            # Extract identifiers (e.g., profile URLs or usernames) for comparison
-                            # Using profile_url is generally more reliable
-                            current_page_invitee_ids = {invitee.get('profile_url') or invitee.get('username') for invitee in next_page_result["invitees"]}
+                                # Extract identifiers (e.g., profile URLs or usernames) for comparison
+                                # Using profile_url is generally more reliable
+                                current_page_invitee_ids = {invitee.get('profile_url') or invitee.get('username') for invitee in next_page_result["invitees"]}
                             
-                            # Check if the current page content is identical to the previous one
-                            if previous_page_invitee_ids and current_page_invitee_ids == previous_page_invitee_ids:
-                                logger.warning(f"站点 {site_name} 检测到第 {next_page+1} 页内容与上一页重复，停止翻页")
-                                break
+                                # Check if the current page content is identical to the previous one
+                                if previous_page_invitee_ids and current_page_invitee_ids == previous_page_invitee_ids:
+                                    logger.warning(f"站点 {site_name} 检测到第 {next_page+1} 页内容与上一页重复，停止翻页")
+                                    break
                                 
-                            # 只有在内容不重复时，才添加到结果中
-                            result["invitees"].extend(next_page_result["invitees"])
-                            logger.debug(f"站点 {site_name} 第 {next_page+1} 页解析到 {len(next_page_result['invitees'])} 个后宫成员")
+                                # 只有在内容不重复时，才添加到结果中
+                                result["invitees"].extend(next_page_result["invitees"])
+                                logger.debug(f"站点 {site_name} 第 {next_page+1} 页解析到 {len(next_page_result['invitees'])} 个后宫成员")
                             
-                            # Update previous page identifiers for the next iteration
-                            previous_page_invitee_ids = current_page_invitee_ids
-                            # --- Repetition Check END ---
+                                # Update previous page identifiers for the next iteration
+                                previous_page_invitee_ids = current_page_invitee_ids
+                                # --- Repetition Check END ---
                             
-                            if len(next_page_result["invitees"]) < 50:
-                                logger.info(f"站点 {site_name} 第 {next_page+1} 页后宫成员数量少于50人，停止获取")
+                                if len(next_page_result["invitees"]) < 50:
+                                    logger.info(f"站点 {site_name} 第 {next_page+1} 页后宫成员数量少于50人，停止获取")
+                                    break
+                                next_page += 1
+                            except Exception as e:
+                                logger.warning(f"站点 {site_name} 获取第 {next_page+1} 页数据失败: {str(e)}")
                                 break
-                            next_page += 1
-                        except Exception as e:
-                            logger.warning(f"站点 {site_name} 获取第 {next_page+1} 页数据失败: {str(e)}")
-                            break
                 else:
                      logger.info(f"站点 {site_name} 首页后宫成员数量少于50人({len(result['invitees'])}人)，不再查找后续页面")
 
@@ -295,7 +315,9 @@ class NexusPhpHandler(_ISiteHandler):
                 try:
                     send_response = session.get(send_invite_url, timeout=(10, 30))
                     send_response.raise_for_status()
+                    parse_start = time.perf_counter()
                     send_page_result = self._parse_nexusphp_invite_page(site_name, send_response.text)
+                    self._record_parse(send_invite_url, parse_start)
                     send_reason = send_page_result["invite_status"].get("reason")
                     send_can_invite = send_page_result["invite_status"].get("can_invite")
                     # (logic to update status based on send_page_result kept exactly as before) ...
@@ -342,7 +364,7 @@ class NexusPhpHandler(_ISiteHandler):
                         details_html = details_response.text
                         
                         # Parse the user details page content
-                        soup_pter = BeautifulSoup(details_html, 'html.parser')
+                        soup_pter = self._parse_html(details_html)
                         
                         # Look for the specific VIP image tag on the userdetails page
                         vip_indicator = soup_pter.select_one('img[src*="pic/user_class/vip.png"], img[title*="挪威森林猫 VIP"]')
@@ -389,12 +411,113 @@ class NexusPhpHandler(_ISiteHandler):
         # If parsing was successful (not early_check_failed and no parsing error)
         return result
     
-    def _parse_nexusphp_invite_page(self, site_name: str, html_content: str, is_next_page: bool = False) -> Dict[str, Any]:
+    def _get_invitee_last_page(self, html_content: str) -> Optional[int]:
+        """
+        从后宫成员列表首页的分页栏中读取最后一页的页码
+        :param html_content: 首页HTML内容
+        :return: 最后一页页码（从0开始），未找到分页栏时返回None
+        """
+        page_numbers = []
+        for href in re.findall(r'href=["\']([^"\']*menu=invitee[^"\']*)["\']', html_content, re.IGNORECASE):
+            page_match = re.search(r'[?&;]page=(\d+)', href)
+            if page_match:
+                page_numbers.append(int(page_match.group(1)))
+        return max(page_numbers) if page_numbers else None
+
+    def _fetch_invitee_pages(self, session: requests.Session, site_name: str, site_url: str, user_id: str,
+                             last_page: int, first_page_ids: set) -> List[Dict[str, Any]]:
+        """
+        并发获取后宫成员列表的第2页至最后一页
+        :param session: 请求会话
+        :param site_name: 站点名称
+        :param site_url: 站点URL
+        :param user_id: 用户ID
+        :param last_page: 最后一页页码（从0开始）
+        :param first_page_ids: 首页用户标识集合，用于重复检测
+        :return: 按页码顺序合并后的后宫成员列表
+        """
+        def _fetch_page(page: int) -> List[Dict[str, Any]]:
+            page_url = urljoin(site_url, f"invite.php?id={user_id}&menu=invitee&page={page}")
+            logger.debug(f"站点 {site_name} 正在获取第 {page+1} 页后宫成员数据: {page_url}")
+            page_response = self._get_page(session, page_url, until_invitee_table=True, timeout=(10, 30))
+            page_response.raise_for_status()
+            return self._parse_page(
+                page_url, page_response,
+                lambda text: self._parse_nexusphp_invite_page(site_name, text, is_next_page=True))["invitees"]
+
+        pages = list(range(1, last_page + 1))
+        page_results: Dict[int, List[Dict[str, Any]]] = {}
+        if self.async_session is not None and self.async_session.crawler.available:
+            # 在共享事件循环中并发获取，所有站点的翻页请求共用连接，不再为每个站点单独开线程
+            page_results = self.async_session.crawler.run(
+                self._fetch_invitee_pages_async(self.async_session, site_name, site_url, user_id, pages))
+        else:
+            with ThreadPoolExecutor(max_workers=min(self.max_page_workers, len(pages)) or 1) as executor:
+                futures = {executor.submit(_fetch_page, page): page for page in pages}
+                for future in as_completed(futures):
+                    page = futures[future]
+                    try:
+                        page_results[page] = future.result()
+                    except Exception as e:
+                        logger.warning(f"站点 {site_name} 获取第 {page+1} 页数据失败: {str(e)}")
+
+        # 按页码顺序合并，遇到缺页、空页或与上一页重复时停止，与顺序翻页的结果保持一致
+        invitees = []
+        previous_page_ids = first_page_ids
+        for page in pages:
+            page_invitees = page_results.get(page)
+            if not page_invitees:
+                logger.debug(f"站点 {site_name} 第 {page+1} 页没有后宫成员数据，停止合并")
+                break
+            current_page_ids = {invitee.get('profile_url') or invitee.get('username') for invitee in page_invitees}
+            if previous_page_ids and current_page_ids == previous_page_ids:
+                logger.warning(f"站点 {site_name} 检测到第 {page+1} 页内容与上一页重复，停止合并")
+                break
+            invitees.extend(page_invitees)
+            previous_page_ids = current_page_ids
+            logger.debug(f"站点 {site_name} 第 {page+1} 页解析到 {len(page_invitees)} 个后宫成员")
+        return invitees
+
+    async def _fetch_invitee_pages_async(self, session: AsyncSession, site_name: str, site_url: str, user_id: str,
+                                         pages: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        在事件循环中并发获取后宫成员列表页面，页面解析放到线程池中执行，避免阻塞其他站点的请求
+        :param session: 异步会话
+        :param site_name: 站点名称
+        :param site_url: 站点URL
+        :param user_id: 用户ID
+        :param pages: 页码列表（从0开始）
+        :return: {页码: 后宫成员列表}，获取失败的页面不包含在内
+        """
+        async def _fetch_page(page: int) -> List[Dict[str, Any]]:
+            page_url = urljoin(site_url, f"invite.php?id={user_id}&menu=invitee&page={page}")
+            logger.debug(f"站点 {site_name} 正在异步获取第 {page+1} 页后宫成员数据: {page_url}")
+            page_response = await self._get_page_async(session, page_url, timeout=(10, 30))
+            # httpx 的 raise_for_status 对304也会抛出异常，页面未变化时由页面解析缓存复用上次的结果
+            if page_response.status_code >= 400:
+                page_response.raise_for_status()
+            page_result = await session.run_sync(
+                self._parse_page, page_url, page_response,
+                lambda text: self._parse_nexusphp_invite_page(site_name, text, is_next_page=True))
+            return page_result["invitees"]
+
+        page_results = {}
+        results = await asyncio.gather(*(_fetch_page(page) for page in pages), return_exceptions=True)
+        for page, page_result in zip(pages, results):
+            if isinstance(page_result, Exception):
+                logger.warning(f"站点 {site_name} 获取第 {page+1} 页数据失败: {str(page_result)}")
+            else:
+                page_results[page] = page_result
+        return page_results
+    
+    def _parse_nexusphp_invite_page(self, site_name: str, html_content: str, is_next_page: bool = False,
+                                    soup: Optional[BeautifulSoup] = None) -> Dict[str, Any]:
         """
         解析NexusPHP邀请页面HTML内容
         :param site_name: 站点名称
         :param html_content: HTML内容
         :param is_next_page: 是否是翻页内容，如果是则只提取后宫成员数据
+        :param soup: 已解析的页面，传入时不再重复解析
         :return: 解析结果
         """
         result = {
@@ -407,8 +530,9 @@ class NexusPhpHandler(_ISiteHandler):
             "invitees": []
         }
         
-        # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 初始化BeautifulSoup对象，翻页内容只需要后宫成员表格
+        if soup is None:
+            soup = self._parse_html(html_content, only_tables=is_next_page)
         
         # 检查是否有特殊标题，如"我的后宫"或"邀請系統"等
         special_title = False
@@ -1053,7 +1177,7 @@ class NexusPhpHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 1. 查找当前魔力值
             # 先尝试从特定HTML元素中提取魔力值
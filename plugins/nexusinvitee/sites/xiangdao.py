@@ -6,10 +6,9 @@ from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
 
 from app.log import logger
-from plugins.nexusinvitee.sites import _ISiteHandler
+from plugins.nexusinvitee.sites import LOGIN_FAILED_REASON, _ISiteHandler
 
 
 class XiangdaoHandler(_ISiteHandler):
@@ -35,7 +34,7 @@ class XiangdaoHandler(_ISiteHandler):
         site_url_lower = site_url.lower()
         for feature in xiangdao_features:
             if feature in site_url_lower:
-                logger.info(f"匹配到象岛站点特征: {feature}")
+                logger.debug(f"匹配到象岛站点特征: {feature}")
                 return True
         
         return False
@@ -65,7 +64,7 @@ class XiangdaoHandler(_ISiteHandler):
         
         try:
             # 获取用户ID
-            user_id = self._get_user_id(session, site_url)
+            user_id = self._resolve_user_id(session, site_url)
             if not user_id:
                 logger.error(f"站点 {site_name} 无法获取用户ID")
                 result["invite_status"]["reason"] = "无法获取用户ID，请检查站点Cookie是否有效"
@@ -94,6 +93,9 @@ class XiangdaoHandler(_ISiteHandler):
             invite_url = urljoin(site_url, f"invite.php?id={user_id}")
             response = session.get(invite_url, timeout=(10, 30))
             response.raise_for_status()
+            if not self._check_login(site_name, response.text):
+                result["invite_status"]["reason"] = LOGIN_FAILED_REASON
+                return result
             
             # 检查邀请权限
             invite_button_info = self._check_xiangdao_invite_permission(site_name, response.text)
@@ -243,7 +245,7 @@ class XiangdaoHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 查找包含"邀请"的行
             invite_row = soup.select_one('td.rowhead:-soup-contains("邀请") + td.rowfollow')
@@ -301,7 +303,7 @@ class XiangdaoHandler(_ISiteHandler):
         
         try:
             # 初始化BeautifulSoup对象
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = self._parse_html(html_content)
             
             # 检查邀请按钮文本，判断邀请权限
             invite_button = soup.select_one('form[action*="invite.php"] input[type="submit"]')
@@ -341,8 +343,8 @@ class XiangdaoHandler(_ISiteHandler):
             "invitees": []
         }
         
-        # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        # 后宫成员页面只需要表格，仅解析表格元素
+        soup = self._parse_html(html_content, only_tables=True)
         
         # 查找后宫用户表格
         invitee_table = soup.select_one('table[border="1"]')
@@ -554,7 +556,7 @@ class XiangdaoHandler(_ISiteHandler):
         }
         
         # 初始化BeautifulSoup对象
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = self._parse_html(html_content)
         
         try:
             # 1. 查找当前魔力值 - 象岛特定格式
@@ -0,0 +1,150 @@
+"""
+站点刷新调度模块
+按站点记录下次刷新时间，根据数据变化频率调整刷新间隔、失败时退避，每次只刷新到期的少量站点，把请求分散到一天中
+"""
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class StalenessScheduler:
+    """
+    按站点的数据过期时间调度刷新
+
+    - 间隔：初始为基础有效期；数据有变化时减半，连续无变化时逐步延长，限制在基础有效期的 1/4 到 4 倍之间
+    - 失败：按失败次数指数退避重试，不超过最大间隔，成功后恢复
+    - 分散：每个站点的间隔带有按站点名称固定的偏移，到期站点按过期时间先后分批刷新
+    """
+
+    def __init__(self, entries: Optional[Dict[str, Dict[str, Any]]] = None, base_ttl: int = 6 * 3600,
+                 retry_base: int = 1800, jitter: float = 0.1, batch_size: int = 5):
+        """
+        初始化调度器
+        :param entries: 上次保存的调度状态 {站点名称: {"next_due": 下次刷新时间, "interval": 刷新间隔, ...}}
+        :param base_ttl: 基础有效期（秒）
+        :param retry_base: 首次失败后的重试间隔（秒）
+        :param jitter: 间隔的最大偏移比例
+        :param batch_size: 每批最多刷新的站点数
+        """
+        self._entries = {name: dict(entry) for name, entry in (entries or {}).items() if isinstance(entry, dict)}
+        self.set_base_ttl(base_ttl)
+        self.retry_base = retry_base
+        self.jitter = jitter
+        self.batch_size = batch_size
+        self.dirty = False
+        self._lock = threading.Lock()
+
+    def set_base_ttl(self, base_ttl: int):
+        """
+        设置基础有效期，已有站点的刷新间隔在下次刷新时按新的范围调整
+        :param base_ttl: 基础有效期（秒），至少10分钟
+        """
+        self.base_ttl = max(int(base_ttl), 600)
+        self.min_ttl = self.base_ttl // 4
+        self.max_ttl = self.base_ttl * 4
+
+    def _offset(self, site_name: str) -> float:
+        """
+        按站点名称计算固定的间隔偏移比例，同时到期的站点下次不会再集中到同一时间
+        :param site_name: 站点名称
+        :return: [-jitter, jitter] 之间的比例
+        """
+        digest = hashlib.md5(site_name.encode("utf-8")).digest()
+        return (int.from_bytes(digest[:4], "big") / 0xFFFFFFFF * 2 - 1) * self.jitter
+
+    def _interval(self, entry: Dict[str, Any]) -> int:
+        interval = entry.get("interval") or self.base_ttl
+        return int(min(max(interval, self.min_ttl), self.max_ttl))
+
+    def seed(self, update_times: Dict[str, int]):
+        """
+        为没有调度状态的站点按上次更新时间计算下次刷新时间，从未刷新的站点立即到期
+        :param update_times: {站点名称: 上次更新时间}
+        """
+        with self._lock:
+            for site_name, last_update in update_times.items():
+                if site_name in self._entries:
+                    continue
+                next_due = (last_update + self.base_ttl * (1 + self._offset(site_name))) if last_update else 0
+                self._entries[site_name] = {"next_due": int(next_due), "interval": self.base_ttl, "failures": 0}
+                self.dirty = True
+
+    def due_sites(self, site_names: List[str], now: Optional[float] = None,
+                  limit: Optional[int] = None) -> List[str]:
+        """
+        获取已到期的站点，过期最久的优先
+        :param site_names: 候选站点名称
+        :param now: 当前时间，默认为系统时间
+        :param limit: 最多返回的站点数，默认为批大小
+        :return: 本批需要刷新的站点名称
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            due = [(self._entries.get(name, {}).get("next_due", 0), name) for name in site_names]
+        due = sorted(item for item in due if item[0] <= now)
+        return [name for _, name in due[:limit or self.batch_size]]
+
+    def next_due(self, site_names: List[str]) -> Optional[int]:
+        """
+        获取候选站点中最早的下次刷新时间
+        :param site_names: 候选站点名称
+        :return: 时间戳，没有候选站点时返回None
+        """
+        with self._lock:
+            times = [self._entries.get(name, {}).get("next_due", 0) for name in site_names]
+        return int(min(times)) if times else None
+
+    def record_success(self, site_name: str, changed: bool, now: Optional[float] = None):
+        """
+        记录一次成功刷新，根据数据是否变化调整刷新间隔
+        :param site_name: 站点名称
+        :param changed: 与上次数据相比是否有变化
+        :param now: 刷新时间，默认为系统时间
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.setdefault(site_name, {})
+            interval = self._interval(entry)
+            interval = interval / 2 if changed else interval * 1.25
+            entry["interval"] = int(min(max(interval, self.min_ttl), self.max_ttl))
+            entry["failures"] = 0
+            entry["last_success"] = int(now)
+            entry["next_due"] = int(now + entry["interval"] * (1 + self._offset(site_name)))
+            entry.pop("last_error", None)
+            self.dirty = True
+
+    def record_failure(self, site_name: str, error: str = "", now: Optional[float] = None):
+        """
+        记录一次失败刷新，按连续失败次数退避
+        :param site_name: 站点名称
+        :param error: 失败原因
+        :param now: 刷新时间，默认为系统时间
+        """
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._entries.setdefault(site_name, {})
+            entry["failures"] = entry.get("failures", 0) + 1
+            backoff = min(self.retry_base * 2 ** (entry["failures"] - 1), self.max_ttl)
+            entry["last_error"] = error
+            entry["next_due"] = int(now + backoff * (1 + self._offset(site_name)))
+            self.dirty = True
+
+    def status(self, site_name: str) -> Optional[Dict[str, Any]]:
+        """
+        获取站点的调度状态
+        :param site_name: 站点名称
+        :return: 调度状态，没有记录时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(site_name)
+            return dict(entry) if entry else None
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """
+        导出需要保存的调度状态
+        :return: 调度状态
+        """
+        with self._lock:
+            self.dirty = False
+            return {name: dict(entry) for name, entry in self._entries.items()}
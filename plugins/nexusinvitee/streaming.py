@@ -0,0 +1,144 @@
+"""
+流式页面获取模块
+边下载边查找后宫成员表格，表格结束后不再解码和解析页面底部的群聊区、脚本和页脚；
+剩余内容不多时仍然读完以便复用连接，只有页脚非常大时才提前关闭连接
+"""
+import codecs
+import re
+import time
+from typing import Optional
+
+import requests
+
+_TABLE_TAG_PATTERN = re.compile(r'<(/?)table\b([^>]*)>', re.IGNORECASE)
+# NexusPHP 的后宫成员表格带有 border="1" 属性
+_TARGET_TABLE_PATTERN = re.compile(r'\bborder\s*=\s*["\']?1\b', re.IGNORECASE)
+# NexusPhpHandler 只从带用户名列的表格中解析后宫成员，邀请发送状态等表格不作为结束标志
+_INVITEE_HEADER_PATTERN = re.compile(r'用户名|用戶名|username', re.IGNORECASE)
+# 单个标签的最大长度，用于确定下次扫描的起始位置
+_MAX_TAG_LENGTH = 1024
+# 提前结束时继续读完剩余内容的上限：重新建立连接（TCP+TLS握手）通常比多读几百KB更慢，
+# 只有剩余内容超过该值时才放弃连接复用
+DEFAULT_DRAIN_LIMIT = 1024 * 1024
+
+
+class TableEndScanner:
+    """
+    增量扫描HTML，找到后宫成员表格的结束位置
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._target_start: Optional[int] = None
+        self._target_depth = 0
+        self._scan_pos = 0
+        self.end: Optional[int] = None
+
+    def feed(self, html_content: str) -> Optional[int]:
+        """
+        扫描新增的内容
+        :param html_content: 目前已读取的全部内容
+        :return: 表格结束位置，尚未结束时返回None
+        """
+        if self.end is not None:
+            return self.end
+        last_end = self._scan_pos
+        for match in _TABLE_TAG_PATTERN.finditer(html_content, self._scan_pos):
+            last_end = match.end()
+            if not match.group(1):
+                if self._target_start is None and _TARGET_TABLE_PATTERN.search(match.group(2)):
+                    self._target_start = match.start()
+                    self._target_depth = self._depth
+                self._depth += 1
+                continue
+            self._depth = max(self._depth - 1, 0)
+            if self._target_start is not None and self._depth == self._target_depth:
+                if _INVITEE_HEADER_PATTERN.search(html_content, self._target_start, match.end()):
+                    self.end = match.end()
+                    return self.end
+                # 不是后宫成员表格，继续查找下一个
+                self._target_start = None
+        # 未完整读取的标签可能位于末尾，下次从最后一个完整标签或末尾附近开始扫描
+        self._scan_pos = max(last_end, len(html_content) - _MAX_TAG_LENGTH, self._scan_pos)
+        return None
+
+
+class StreamedResponse:
+    """
+    流式读取的响应，提供处理器和页面缓存用到的 requests.Response 属性
+    """
+
+    def __init__(self, response: requests.Response, text: str, body_bytes: int, wire_bytes: int, truncated: bool):
+        self._response = response
+        self.status_code = response.status_code
+        self.reason = response.reason
+        self.headers = response.headers
+        self.url = response.url
+        self.encoding = response.encoding
+        self.text = text
+        # 读取的解压后正文字节数（含为复用连接而读完的剩余内容），以及实际从网络读取的字节数
+        self.body_bytes = body_bytes
+        self.wire_bytes = wire_bytes
+        self.truncated = truncated
+
+    @property
+    def content(self) -> bytes:
+        return self.text.encode(self.encoding or "utf-8", errors="replace")
+
+    def raise_for_status(self):
+        self._response.raise_for_status()
+
+
+def fetch_until_table_end(session: requests.Session, url: str, chunk_size: int = 16 * 1024,
+                          drain_limit: int = DEFAULT_DRAIN_LIMIT, **kwargs) -> StreamedResponse:
+    """
+    流式获取页面，读到后宫成员表格结束即停止解码和扫描；找不到表格时读取完整页面
+    :param session: 请求会话
+    :param url: 页面URL
+    :param chunk_size: 每次读取的字节数
+    :param drain_limit: 提前结束时剩余内容不超过该字节数则读完，以便连接可以复用；否则直接关闭连接。
+                        未提供 Content-Length 时最多读取该字节数，仍未读完则关闭连接
+    :return: 响应对象
+    """
+    start = time.monotonic()
+    response = session.get(url, stream=True, **kwargs)
+    # 连接池会话不记录流式请求，读取完成后按实际读取的字节数记录
+    recorder = getattr(session, "recorder", None)
+    try:
+        if response.status_code != 200:
+            if recorder:
+                recorder.record(url, time.monotonic() - start, len(response.content))
+            return StreamedResponse(response, response.text, len(response.content), len(response.content), False)
+
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        scanner = TableEndScanner()
+        text = ""
+        body_bytes = 0
+        end = None
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            body_bytes += len(chunk)
+            text += decoder.decode(chunk)
+            end = scanner.feed(text)
+            if end is not None:
+                break
+
+        if end is None:
+            text += decoder.decode(b"", final=True)
+        else:
+            text = text[:end]
+            # 剩余内容不多时读完，连接可以放回连接池复用
+            content_length = response.headers.get("Content-Length", "")
+            if not content_length.isdigit() or int(content_length) - response.raw.tell() <= drain_limit:
+                drained = 0
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    drained += len(chunk)
+                    if drained > drain_limit:
+                        break
+                body_bytes += drained
+        wire_bytes = response.raw.tell() if hasattr(response.raw, "tell") else body_bytes
+        if recorder:
+            recorder.record(url, time.monotonic() - start, body_bytes)
+        return StreamedResponse(response, text, body_bytes, wire_bytes, end is not None)
+    finally:
+        # 已读完的连接已放回连接池；提前结束且未读完的连接无法复用，直接关闭
+        response.close()
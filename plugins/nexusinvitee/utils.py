@@ -3,11 +3,12 @@
 """
 import time
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, Dict, List
 
 from app.core.event import eventmanager
 from app.schemas.types import NotificationType, EventType
 from app.log import logger
+from plugins.nexusinvitee.models import format_size
 
 
 class NotificationHelper:
@@ -91,14 +92,7 @@ class SiteHelper:
         :param size_bytes: 字节数
         :return: 格式化后的大小字符串
         """
-        try:
-            for unit in ['B', 'KB', 'MB', 'GB', 'TB']:
-                if size_bytes < 1024.0:
-                    return f"{size_bytes:.2f} {unit}"
-                size_bytes /= 1024.0
-            return f"{size_bytes:.2f} PB"
-        except:
-            return "0 B"
+        return format_size(size_bytes)
     
     @staticmethod
     def is_nexusphp(site_url: str) -> bool:
@@ -107,4 +101,44 @@ class SiteHelper:
         :param site_url: 站点URL
         :return: 是否为NexusPHP站点
         """
-        return "php" in site_url.lower() 
\ No newline at end of file
+        return "php" in site_url.lower() 
+
+
+class IndexerSnapshot:
+    """
+    站点配置快照
+    一次获取站点列表后按名称建立索引，刷新和页面渲染期间的站点查找均为字典查找
+    """
+
+    def __init__(self, indexers: Optional[List[Dict[str, Any]]] = None):
+        """
+        初始化站点配置快照
+        :param indexers: 站点配置列表
+        """
+        self.sites: List[Dict[str, Any]] = list(indexers or [])
+        self._by_name: Dict[str, Dict[str, Any]] = {}
+        for site in self.sites:
+            # 与原先的顺序查找保持一致，重名时取第一个
+            self._by_name.setdefault(site.get("name", ""), site)
+
+    def __len__(self) -> int:
+        return len(self.sites)
+
+    def get_by_name(self, site_name: str) -> Optional[Dict[str, Any]]:
+        """
+        按站点名称获取站点配置
+        :param site_name: 站点名称
+        :return: 站点配置
+        """
+        return self._by_name.get(site_name)
+
+    def select(self, site_ids: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """
+        按站点ID筛选站点，保持站点列表原有顺序
+        :param site_ids: 站点ID列表，为空时返回所有站点
+        :return: 站点配置列表
+        """
+        if not site_ids:
+            return list(self.sites)
+        wanted = {str(site_id) for site_id in site_ids}
+        return [site for site in self.sites if str(site.get("id")) in wanted]
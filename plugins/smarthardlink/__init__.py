@@ -1,5 +1,4 @@
 import datetime
-import hashlib
 import os
 import re
 import threading
@@ -20,6 +19,9 @@ from app.plugins import _PluginBase
 from app.schemas.types import EventType, NotificationType
 from app.utils.system import SystemUtils
 
+from plugins.smarthardlink.hash_index import FileKey, HashIndex
+from plugins.smarthardlink.hash_pool import HashPool, sha1_file
+
 lock = threading.Lock()
 
 
@@ -54,12 +56,24 @@ class smarthardlink(_PluginBase):
     _exclude_extensions = ""
     _exclude_keywords = ""
     _hash_buffer_size = 65536  # 计算哈希时的缓冲区大小，默认64KB
+    _hash_workers = 4  # 计算哈希的线程总数
+    _hash_device_workers = 1  # 同一设备（磁盘）上同时计算哈希的线程数，机械硬盘建议为1
     _dry_run = True  # 默认为试运行模式，不实际创建硬链接
     _hash_cache = {}  # 保存文件哈希值的缓存
+    _hash_index: Optional[HashIndex] = None  # 跨运行保存的哈希索引，运行期间打开
     _process_count = 0  # 处理的文件计数
     _hardlink_count = 0  # 创建的硬链接计数
     _saved_space = 0  # 节省的空间统计，单位字节
     _skipped_hardlinks_count = 0 # 新增：跳过的已存在硬链接计数
+    _bytes_read = 0  # 计算哈希实际读取的字节数，多个线程同时更新，通过 _stats_lock 保护
+    _stats_lock = threading.Lock()
+    _bytes_skipped = 0  # 因大小唯一或部分指纹不同而无需读取的字节数
+    _prefiltered_count = 0  # 部分指纹不同、无需完整计算哈希的文件计数
+    # 部分指纹：读取文件头尾各 _partial_edge_size 字节，以及中间均匀分布的 _partial_samples 个采样块
+    _partial_edge_size = 4 * 1024 * 1024
+    _partial_samples = 8
+    _partial_sample_size = 1024 * 1024
+    _partial_min_size = 64 * 1024 * 1024  # 小于此大小的文件直接计算完整哈希
 
     # 退出事件
     _event = threading.Event()
@@ -99,6 +113,8 @@ class smarthardlink(_PluginBase):
                 logger.warning(f"无法将配置中的 hash_buffer_size '{hash_buffer_size_val}' 解析为整数，使用默认值 65536")
                 self._hash_buffer_size = 65536
             # --- 加固结束 ---
+            self._hash_workers = self._parse_worker_count(config.get("hash_workers"), 4)
+            self._hash_device_workers = self._parse_worker_count(config.get("hash_device_workers"), 1)
             self._dry_run = bool(config.get("dry_run"))
 
         # 停止现有任务
@@ -143,6 +159,8 @@ class smarthardlink(_PluginBase):
                 "exclude_extensions": self._exclude_extensions,
                 "exclude_keywords": self._exclude_keywords,
                 "hash_buffer_size": self._hash_buffer_size,
+                "hash_workers": self._hash_workers,
+                "hash_device_workers": self._hash_device_workers,
                 "dry_run": self._dry_run,
             }
         )
@@ -226,31 +244,161 @@ class smarthardlink(_PluginBase):
         else:
             return f"{size_bytes / (1024 * 1024 * 1024):.2f} GB"
 
-    def calculate_file_hash(self, file_path):
+    def calculate_file_hash(self, file_path, file_key: Optional[FileKey] = None):
         """
         计算文件的SHA1哈希值
+        :param file_key: 文件标识，指定时优先从哈希索引中读取未变化文件的哈希值
         """
         # 检查缓存
         if file_path in self._hash_cache:
             return self._hash_cache[file_path]
+        if self._hash_index and file_key:
+            file_hash = self._hash_index.get_full(file_key)
+            if file_hash:
+                self._hash_cache[file_path] = file_hash
+                return file_hash
 
         try:
-            hash_sha1 = hashlib.sha1()
-            with open(file_path, "rb") as f:
-                while True:
-                    data = f.read(self._hash_buffer_size)
-                    if not data:
-                        break
-                    hash_sha1.update(data)
-            
-            file_hash = hash_sha1.hexdigest()
-            # 保存到缓存
+            file_hash = sha1_file(file_path, self._hash_buffer_size, on_read=self._count_bytes_read)
+            # 保存到缓存，每个路径只由一个线程计算，无需加锁
             self._hash_cache[file_path] = file_hash
+            if self._hash_index and file_key:
+                self._hash_index.put_full(file_key, file_hash)
             return file_hash
         except Exception as e:
             logger.error(f"计算文件 {file_path} 哈希值失败: {str(e)}")
             return None
 
+    def _count_bytes_read(self, size: int):
+        """
+        累计计算哈希读取的字节数，在哈希线程中调用
+        """
+        with self._stats_lock:
+            self._bytes_read += size
+
+    @staticmethod
+    def _parse_worker_count(value: Any, default: int) -> int:
+        """
+        解析线程数配置，无效时使用默认值
+        """
+        try:
+            return max(int(value), 1) if value else default
+        except (ValueError, TypeError):
+            logger.warning(f"无法将配置中的线程数 '{value}' 解析为整数，使用默认值 {default}")
+            return default
+
+    def _hash_progress(self, stage: str):
+        """
+        生成哈希线程池的进度回调，按本阶段读取的字节数计算速度
+        :param stage: 阶段名称
+        """
+        start_time = time.monotonic()
+        start_bytes = self._bytes_read
+
+        def report(done: int, total: int):
+            bytes_read = self._bytes_read - start_bytes
+            speed = int(bytes_read / max(time.monotonic() - start_time, 0.001))
+            logger.info(f"{stage}：已处理 {done}/{total} 个文件 ({(done/total*100):.1f}%)，"
+                        f"读取 {self._format_size(bytes_read)}，速度 {self._format_size(speed)}/s")
+        return report
+
+    def _partial_ranges(self, file_size: int) -> List[Tuple[int, int]]:
+        """
+        计算部分指纹需要读取的区域
+        :param file_size: 文件大小
+        :return: [(偏移, 长度), ...]，按偏移排序且互不重叠
+        """
+        edge = self._partial_edge_size
+        sample = self._partial_sample_size
+        ranges = [(0, edge)]
+        middle = file_size - 2 * edge - sample
+        for i in range(1, self._partial_samples + 1):
+            ranges.append((edge + middle * i // (self._partial_samples + 1), sample))
+        ranges.append((file_size - edge, edge))
+        return ranges
+
+    def _partial_scheme(self) -> str:
+        """
+        部分指纹的采样方式，采样参数变化后索引中的旧指纹不再使用
+        """
+        return f"{self._partial_edge_size}/{self._partial_samples}/{self._partial_sample_size}"
+
+    def calculate_partial_hash(self, file_path: str, file_size: int,
+                               file_key: Optional[FileKey] = None) -> Optional[str]:
+        """
+        计算文件的部分指纹（头尾和采样块的SHA1），用于在完整计算哈希前排除内容不同的同大小文件
+        指纹相同不代表内容相同，创建硬链接前仍需比较完整哈希
+        :param file_key: 文件标识，指定时优先从哈希索引中读取未变化文件的指纹
+        """
+        if self._hash_index and file_key:
+            partial_hash = self._hash_index.get_partial(file_key, self._partial_scheme())
+            if partial_hash:
+                return partial_hash
+        try:
+            partial_hash = sha1_file(file_path, self._hash_buffer_size, self._partial_ranges(file_size),
+                                     on_read=self._count_bytes_read)
+            if self._hash_index and file_key:
+                self._hash_index.put_partial(file_key, partial_hash, self._partial_scheme())
+            return partial_hash
+        except Exception as e:
+            logger.error(f"计算文件 {file_path} 部分指纹失败: {str(e)}")
+            return None
+
+    def _open_hash_index(self) -> Optional[HashIndex]:
+        """
+        打开插件数据目录下的哈希索引，打开失败时本次运行不使用索引
+        """
+        try:
+            data_path = self.get_data_path()
+            os.makedirs(data_path, exist_ok=True)
+            return HashIndex(os.path.join(data_path, "hash_index.db"))
+        except Exception as e:
+            logger.warning(f"打开哈希索引失败，本次运行将重新计算所有哈希: {str(e)}")
+            return None
+
+    def _close_hash_index(self, prune: bool):
+        """
+        关闭哈希索引
+        :param prune: 是否清理已不存在的文件记录，扫描未正常完成时不清理
+        """
+        if not self._hash_index:
+            return
+        try:
+            if prune:
+                pruned = self._hash_index.prune()
+                if pruned:
+                    logger.info(f"哈希索引清理了 {pruned} 条已不存在的文件记录")
+            self._hash_index.close()
+        except Exception as e:
+            logger.warning(f"关闭哈希索引失败: {str(e)}")
+        finally:
+            self._hash_index = None
+
+    @staticmethod
+    def _iter_files(scan_dir: str):
+        """
+        遍历目录下的普通文件，不跟随符号链接
+        使用 os.scandir，文件类型取自目录项，调用方只需对符合条件的文件 stat 一次
+        :return: 生成 os.DirEntry
+        """
+        stack = [scan_dir]
+        while stack:
+            current_dir = stack.pop()
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                stack.append(entry.path)
+                            elif entry.is_file(follow_symlinks=False):
+                                yield entry
+                        except OSError as e:
+                            logger.error(f"获取文件信息失败 {entry.path}: {str(e)}")
+            except OSError as e:
+                if current_dir == scan_dir:
+                    raise
+                logger.warning(f"无法读取目录 {current_dir}: {str(e)}")
+
     def is_excluded(self, file_path: str) -> bool:
         """
         检查文件是否应该被排除
@@ -301,6 +449,8 @@ class smarthardlink(_PluginBase):
         run_start_time = datetime.datetime.now() # Record start time for duration
         run_status = "失败" # Default status
         error_message = ""
+        scan_complete = False  # 所有扫描目录都已完整遍历，此时才清理哈希索引中不存在的文件
+        index_stats = {"hits": 0, "misses": 0}
         try:
             # 重置计数器
             self._process_count = 0
@@ -308,6 +458,9 @@ class smarthardlink(_PluginBase):
             self._saved_space = 0
             self._hash_cache = {}
             self._skipped_hardlinks_count = 0 # 重置跳过计数
+            self._bytes_read = 0
+            self._bytes_skipped = 0
+            self._prefiltered_count = 0
             
             logger.info("开始扫描目录并处理重复文件 ...")
             logger.warning("提醒：本插件仍处于开发试验阶段，请确保数据安全")
@@ -329,90 +482,162 @@ class smarthardlink(_PluginBase):
                     "space_saved": self._saved_space,
                     "space_saved_formatted": self._format_size(self._saved_space),
                     "mode": "试运行" if self._dry_run else "实际运行",
+                    "bytes_read": self._bytes_read,
+                    "bytes_skipped": self._bytes_skipped,
                     "error": error_message
                 })
                 # --- 历史保存结束 ---
                 return
             
             scan_dirs = self._scan_dirs.split("\n")
+            self._hash_index = self._open_hash_index()
             
             # 第一步：收集所有文件并计算哈希值
             file_hashes = {}  # {hash: [(file_path, file_size), ...]}
-            all_files = []  # 存储所有符合条件的文件路径和大小
+            inodes: Dict[Tuple[int, int], Dict[str, Any]] = {}  # {(设备号, inode): {"paths", "size", "nlink", "key"}}
+            scan_complete = True
             
             # 首先收集所有文件信息，避免在遍历时计算哈希
             for scan_dir in scan_dirs:
                 if not scan_dir or not os.path.exists(scan_dir):
                     logger.warning(f"扫描目录不存在: {scan_dir}")
+                    if scan_dir:
+                        scan_complete = False
                     continue
                     
                 logger.info(f"扫描目录: {scan_dir}")
                 file_count = 0
                 
                 try:
-                    for root, dirs, files in os.walk(scan_dir):
+                    for entry in self._iter_files(scan_dir):
+                        file_count += 1
                         # 定期报告进度
-                        if file_count > 0 and file_count % 1000 == 0:
+                        if file_count % 1000 == 0:
                             logger.info(f"目录 {scan_dir} 已发现 {file_count} 个文件")
                             
-                        for file_name in files:
-                            file_count += 1
-                            file_path = os.path.join(root, file_name)
+                        # 检查排除条件
+                        if self.is_excluded(entry.path):
+                            continue
                             
-                            # 跳过符号链接
-                            if os.path.islink(file_path):
-                                continue
-                                
-                            # 检查排除条件
-                            if self.is_excluded(file_path):
-                                continue
-                                
-                            try:
-                                # 检查文件大小
-                                file_size = os.path.getsize(file_path)
-                                if file_size < self._min_size * 1024:  # 转换为字节
-                                    continue
-                                    
-                                # 添加到待处理文件列表
-                                all_files.append((file_path, file_size))
-                                
-                            except Exception as e:
-                                logger.error(f"获取文件信息失败 {file_path}: {str(e)}")
+                        try:
+                            # 检查文件大小，设备号、inode 和链接数取自同一次 stat
+                            file_stat = entry.stat(follow_symlinks=False)
+                        except OSError as e:
+                            logger.error(f"获取文件信息失败 {entry.path}: {str(e)}")
+                            continue
+                        file_size = file_stat.st_size
+                        if file_size < self._min_size * 1024:  # 转换为字节
+                            continue
+                            
+                        inode = inodes.setdefault((file_stat.st_dev, file_stat.st_ino), {
+                            "paths": [],
+                            "size": file_size,
+                            "nlink": file_stat.st_nlink,
+                            "key": (file_stat.st_dev, file_stat.st_ino, file_size, file_stat.st_mtime_ns),
+                        })
+                        # 扫描目录互相包含时同一路径会出现多次
+                        if entry.path not in inode["paths"]:
+                            inode["paths"].append(entry.path)
                     
                     logger.info(f"目录 {scan_dir} 扫描完成，共发现 {file_count} 个文件")
                 except Exception as e:
+                    scan_complete = False
                     logger.error(f"扫描目录 {scan_dir} 时出错: {str(e)}")
             
+            # 同一 inode 的多个路径已是硬链接，只取一个路径参与哈希计算，每个物理文件最多读取一次
+            all_files = []  # 存储所有符合条件的文件路径和大小，每个 inode 一个
+            file_keys: Dict[str, FileKey] = {}  # {file_path: (设备号, inode, 大小, 修改时间)}，用于查询哈希索引
+            inode_paths: Dict[str, List[str]] = {}  # {参与计算的路径: 同一 inode 在扫描目录中的全部路径}
+            inode_nlinks: Dict[str, int] = {}  # {参与计算的路径: 文件的硬链接数}
+            for inode in inodes.values():
+                paths = sorted(inode["paths"])
+                if len(paths) > 1:
+                    self._skipped_hardlinks_count += len(paths) - 1
+                    logger.debug(f"已是硬链接，只计算一次: {', '.join(paths)}")
+                all_files.append((paths[0], inode["size"]))
+                file_keys[paths[0]] = inode["key"]
+                inode_paths[paths[0]] = paths
+                inode_nlinks[paths[0]] = inode["nlink"]
+            
             # 报告收集到的文件总数
             total_files = len(all_files)
-            logger.info(f"符合条件的文件总数: {total_files}")
+            if self._hash_index:
+                self._hash_index.mark_seen(file_keys.values())
+            logger.info(f"符合条件的文件总数: {total_files + self._skipped_hardlinks_count}，"
+                        f"其中 {self._skipped_hardlinks_count} 个已是硬链接，实际需要比较 {total_files} 个文件")
             
-            # 根据文件大小排序，优先处理大文件，可以更快发现重复文件节省空间
-            all_files.sort(key=lambda x: x[1], reverse=True)
+            # 按文件大小分组，大小唯一的文件不可能有重复，无需读取
+            size_groups: Dict[int, List[Tuple[str, int]]] = {}
+            for file_path, file_size in all_files:
+                size_groups.setdefault(file_size, []).append((file_path, file_size))
+            candidate_groups = []
+            for file_size, files in size_groups.items():
+                if len(files) > 1:
+                    candidate_groups.append(files)
+                else:
+                    self._bytes_skipped += file_size
+                    self._process_count += 1
+            same_size_count = sum(len(files) for files in candidate_groups)
+            logger.info(f"大小相同的文件 {same_size_count} 个，"
+                        f"大小唯一的文件 {total_files - same_size_count} 个，"
+                        f"跳过读取 {self._format_size(self._bytes_skipped)}")
             
-            # 处理文件并计算哈希值
-            for idx, (file_path, file_size) in enumerate(all_files):
-                # 定期报告进度
-                if idx > 0 and (idx % 100 == 0 or idx == total_files - 1):
-                    logger.info(f"已处理 {idx}/{total_files} 个文件 ({(idx/total_files*100):.1f}%)")
-                
-                try:
-                    # 计算哈希值
-                    file_hash = self.calculate_file_hash(file_path)
-                    if not file_hash:
-                        continue
-                        
-                    # 记录文件信息
-                    if file_hash not in file_hashes:
-                        file_hashes[file_hash] = []
-                    file_hashes[file_hash].append((file_path, file_size))
-                    
+            # 哈希计算按文件所在设备分组并行，不同磁盘同时读取，同一磁盘限制并发
+            hash_pool = HashPool(self._hash_workers, self._hash_device_workers)
+            logger.info(f"哈希计算线程数 {self._hash_workers}，每个设备最多 {self._hash_device_workers} 个线程")
+            
+            # 大文件先比较部分指纹，指纹不同的文件内容必然不同，无需完整读取
+            candidate_files = []
+            partial_files = []
+            for files in candidate_groups:
+                if files[0][1] < self._partial_min_size:
+                    candidate_files.extend(files)
+                else:
+                    partial_files.extend(files)
+            partial_results = hash_pool.run(
+                [(file_keys[file_path][0], (file_path, file_size)) for file_path, file_size in partial_files],
+                lambda item: self.calculate_partial_hash(item[0], item[1], file_keys.get(item[0])),
+                self._hash_progress("部分指纹"))
+            partial_groups: Dict[Tuple[int, str], List[Tuple[str, int]]] = {}
+            for (file_path, file_size), partial_hash in partial_results:
+                if partial_hash:
+                    partial_groups.setdefault((file_size, partial_hash), []).append((file_path, file_size))
+            for (file_size, _), group in partial_groups.items():
+                if len(group) > 1:
+                    candidate_files.extend(group)
+                else:
+                    partial_size = sum(length for _, length in self._partial_ranges(file_size))
+                    self._bytes_skipped += file_size - partial_size
+                    self._prefiltered_count += 1
                     self._process_count += 1
+            if self._prefiltered_count:
+                logger.info(f"部分指纹排除 {self._prefiltered_count} 个文件，剩余 {len(candidate_files)} 个文件需要计算完整哈希")
+            
+            # 根据文件大小排序，优先处理大文件，可以更快发现重复文件节省空间，也避免最后只剩一个大文件在计算
+            candidate_files.sort(key=lambda x: x[1], reverse=True)
+            
+            def hash_candidate(item: Tuple[str, int]) -> Optional[str]:
+                try:
+                    return self.calculate_file_hash(item[0], file_keys.get(item[0]))
                 except Exception as e:
-                    logger.error(f"处理文件 {file_path} 时出错: {str(e)}")
+                    logger.error(f"处理文件 {item[0]} 时出错: {str(e)}")
+                    return None
             
-            # 找出重复文件的数量
-            duplicate_count = sum(len(files) - 1 for files in file_hashes.values() if len(files) > 1)
+            # 处理文件并计算哈希值
+            hash_results = hash_pool.run(
+                [(file_keys[file_path][0], (file_path, file_size)) for file_path, file_size in candidate_files],
+                hash_candidate, self._hash_progress("完整哈希"))
+            for (file_path, file_size), file_hash in hash_results:
+                if not file_hash:
+                    continue
+                # 记录文件信息
+                file_hashes.setdefault(file_hash, []).append((file_path, file_size))
+                self._process_count += 1
+            
+            # 找出重复文件的数量，重复的 inode 在扫描目录中的每个路径都需要替换
+            duplicate_count = sum(len(inode_paths[file_path])
+                                  for files in file_hashes.values() if len(files) > 1
+                                  for file_path, _ in sorted(files)[1:])
             logger.info(f"发现 {duplicate_count} 个重复文件")
             
             # 没有重复文件时发送通知 and save history
@@ -436,86 +661,80 @@ class smarthardlink(_PluginBase):
             for file_hash, files in file_hashes.items():
                 if len(files) <= 1:
                     continue  # 没有重复
-                
-                processed_count += len(files) - 1
-                if processed_count % 10 == 0 or processed_count == duplicate_count:
-                    logger.info(f"已处理 {processed_count}/{duplicate_count} 个重复文件 ({(processed_count/duplicate_count*100):.1f}%)")
                     
                 # 按文件路径排序，保持第一个文件作为源文件
                 files.sort(key=lambda x: x[0])
                 source_file, source_size = files[0]
+                # 源文件的 inode 和设备号在收集阶段已获取
+                source_dev, source_inode = file_keys[source_file][:2]
                 
                 logger.info(f"发现重复文件组 (SHA1: {file_hash}):")
                 logger.info(f"  保留源文件: {source_file}")
                 
-                # --- 获取源文件的 inode 和设备号 ---
-                try:
-                    source_stat = os.stat(source_file)
-                    source_inode = source_stat.st_ino
-                    source_dev = source_stat.st_dev
-                except OSError as e:
-                    logger.error(f"  无法获取源文件 {source_file} 的状态信息: {e}，跳过此组")
-                    continue
-                # --- 获取结束 ---
-                
-                # 处理重复文件
-                for dup_file, dup_size in files[1:]:
-                    logger.info(f"  检查重复文件: {dup_file}")
-                    
-                    # --- 检查是否已是硬链接 ---
-                    try:
-                        dup_stat = os.stat(dup_file)
-                        # 必须在同一设备上且 inode 相同
-                        if dup_stat.st_dev == source_dev and dup_stat.st_ino == source_inode:
-                            logger.info(f"  文件 {dup_file} 已是源文件的硬链接，跳过")
-                            self._skipped_hardlinks_count += 1
-                            continue # 跳过此文件，处理下一个重复文件
-                    except OSError as e:
-                        logger.warning(f"  无法获取重复文件 {dup_file} 的状态信息: {e}，继续尝试硬链接")
-                    # --- 检查结束 ---
-                    
-                    if self._dry_run:
-                        logger.info(f"  试运行模式：将创建从 {source_file} 到 {dup_file} 的硬链接")
-                        self._hardlink_count += 1
-                        self._saved_space += dup_size
-                    else:
-                        try:
-                            # 创建临时备份文件名
-                            temp_file = f"{dup_file}.temp_{int(time.time())}"
-                            
-                            # 重命名原文件为临时文件
-                            os.rename(dup_file, temp_file)
-                            
-                            # 创建硬链接（保持原文件名）
-                            os.link(source_file, dup_file)
-                            
-                            # 删除临时文件
-                            os.remove(temp_file)
-                            
-                            logger.info(f"  已创建硬链接: {dup_file} -> {source_file}")
+                # 处理重复文件，同一 inode 的所有路径都链接到源文件
+                for dup_inode_file, dup_size in files[1:]:
+                    dup_paths = inode_paths[dup_inode_file]
+                    linked_count = 0
+                    for dup_file in dup_paths:
+                        processed_count += 1
+                        if processed_count % 10 == 0 or processed_count == duplicate_count:
+                            logger.info(f"已处理 {processed_count}/{duplicate_count} 个重复文件 ({(processed_count/duplicate_count*100):.1f}%)")
+                        logger.info(f"  检查重复文件: {dup_file}")
+                        
+                        if self._dry_run:
+                            logger.info(f"  试运行模式：将创建从 {source_file} 到 {dup_file} 的硬链接")
                             self._hardlink_count += 1
+                            linked_count += 1
+                        else:
+                            try:
+                                # 创建临时备份文件名
+                                temp_file = f"{dup_file}.temp_{int(time.time())}"
+                                
+                                # 重命名原文件为临时文件
+                                os.rename(dup_file, temp_file)
+                                
+                                # 创建硬链接（保持原文件名）
+                                os.link(source_file, dup_file)
+                                
+                                # 删除临时文件
+                                os.remove(temp_file)
+                                
+                                logger.info(f"  已创建硬链接: {dup_file} -> {source_file}")
+                                self._hardlink_count += 1
+                                linked_count += 1
+                            except Exception as e:
+                                # 如果出错，尝试恢复原文件
+                                if 'temp_file' in locals() and os.path.exists(temp_file):
+                                    try:
+                                        if os.path.exists(dup_file):
+                                            # 如果硬链接意外创建成功但后续步骤失败，先删除错误的硬链接
+                                            try:
+                                                dup_stat_after_link = os.stat(dup_file)
+                                                if dup_stat_after_link.st_dev == source_dev and dup_stat_after_link.st_ino == source_inode:
+                                                    os.remove(dup_file)
+                                            except OSError:
+                                                pass # 如果获取状态或删除失败，继续尝试恢复
+                                        os.rename(temp_file, dup_file)
+                                        logger.error(f"  创建硬链接失败，已恢复原文件: {str(e)}")
+                                    except Exception as recover_err:
+                                        logger.error(f"  创建硬链接失败且恢复原文件也失败: {str(recover_err)}，原文件位于: {temp_file}")
+                                else:
+                                    logger.error(f"  创建硬链接失败: {str(e)}")
+                    
+                    # 只有 inode 的全部路径都已替换时才释放空间，扫描目录之外仍有硬链接时空间仍被占用
+                    if linked_count == len(dup_paths):
+                        if inode_nlinks[dup_inode_file] <= len(dup_paths):
                             self._saved_space += dup_size
-                        except Exception as e:
-                            # 如果出错，尝试恢复原文件
-                            if 'temp_file' in locals() and os.path.exists(temp_file):
-                                try:
-                                    if os.path.exists(dup_file):
-                                        # 如果硬链接意外创建成功但后续步骤失败，先删除错误的硬链接
-                                        try:
-                                            dup_stat_after_link = os.stat(dup_file)
-                                            if dup_stat_after_link.st_dev == source_dev and dup_stat_after_link.st_ino == source_inode:
-                                                os.remove(dup_file)
-                                        except OSError:
-                                            pass # 如果获取状态或删除失败，继续尝试恢复
-                                    os.rename(temp_file, dup_file)
-                                    logger.error(f"  创建硬链接失败，已恢复原文件: {str(e)}")
-                                except Exception as recover_err:
-                                    logger.error(f"  创建硬链接失败且恢复原文件也失败: {str(recover_err)}，原文件位于: {temp_file}")
-                            else:
-                                logger.error(f"  创建硬链接失败: {str(e)}")
+                        else:
+                            logger.info(f"  {dup_inode_file} 在扫描目录之外还有 "
+                                        f"{inode_nlinks[dup_inode_file] - len(dup_paths)} 个硬链接，空间不会释放")
             
             mode_str = "试运行" if self._dry_run else "实际运行"
             logger.info(f"处理完成！({mode_str}模式) 共处理文件 {self._process_count} 个，创建硬链接 {self._hardlink_count} 个，节省空间 {self._format_size(self._saved_space)}")
+            logger.info(f"读取 {self._format_size(self._bytes_read)}，跳过读取 {self._format_size(self._bytes_skipped)}")
+            if self._hash_index:
+                logger.info(f"哈希索引命中 {self._hash_index.hits} 次，未命中 {self._hash_index.misses} 次，"
+                            f"命中率 {self._hash_index.hit_rate:.1%}")
             run_status = f"完成 ({mode_str})"
 
             # 发送通知
@@ -541,6 +760,9 @@ class smarthardlink(_PluginBase):
                 )
             )
         finally:
+            if self._hash_index:
+                index_stats = self._hash_index.stats()
+            self._close_hash_index(prune=scan_complete and run_status != "失败")
             # --- 统一保存历史记录 (无论成功或失败) ---
             run_end_time = datetime.datetime.now()
             self._save_link_history({
@@ -554,6 +776,13 @@ class smarthardlink(_PluginBase):
                 "space_saved": self._saved_space,
                 "space_saved_formatted": self._format_size(self._saved_space), # Record saved space even in dry run
                 "mode": "试运行" if self._dry_run else "实际运行",
+                "bytes_read": self._bytes_read, # 实际读取的字节数
+                "bytes_skipped": self._bytes_skipped, # 大小唯一或部分指纹不同、无需读取的字节数
+                "prefiltered_files": self._prefiltered_count, # 部分指纹排除的文件数
+                "hash_cache_hits": index_stats["hits"], # 哈希索引命中次数
+                "hash_cache_misses": index_stats["misses"],
+                "hash_cache_hit_rate": round(index_stats["hits"] / (index_stats["hits"] + index_stats["misses"]), 3)
+                if index_stats["hits"] + index_stats["misses"] else 0,
                 "error": error_message
             })
             # --- 历史保存结束 ---
@@ -822,14 +1051,14 @@ class smarthardlink(_PluginBase):
                                     },
                                 ],
                             },
-                            # Hash Buffer Size Row (Removed dense)
+                            # Hash Buffer Size / Hash Workers Row (Removed dense)
                             {
                                 'component': 'VRow',
                                 'class': 'mb-2',
                                 'content': [
                                       {
                                         'component': 'VCol',
-                                        'props': {'cols': 12},
+                                        'props': {"cols": 12, "sm": 4},
                                         'content': [
                                             {
                                                 'component': 'VTextField',
@@ -846,6 +1075,42 @@ class smarthardlink(_PluginBase):
                                             }
                                         ],
                                     },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'hash_workers',
+                                                    'label': '哈希线程数',
+                                                    'placeholder': '4',
+                                                    'type': 'number',
+                                                    'hint': '同时计算哈希的线程总数，不同磁盘上的文件并行读取。',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
+                                    {
+                                        'component': 'VCol',
+                                        'props': {"cols": 12, "sm": 4},
+                                        'content': [
+                                            {
+                                                'component': 'VTextField',
+                                                'props': {
+                                                    'model': 'hash_device_workers',
+                                                    'label': '单盘线程数',
+                                                    'placeholder': '1',
+                                                    'type': 'number',
+                                                    'hint': '同一磁盘上同时读取的线程数。机械硬盘建议1，避免来回寻道；SSD/NVMe 可设为2-4。',
+                                                    'persistent-hint': True,
+                                                    'variant': 'outlined'
+                                                },
+                                            }
+                                        ],
+                                    },
                                 ]
                             },
                         ]
@@ -1007,6 +1272,8 @@ class smarthardlink(_PluginBase):
             "exclude_extensions": "",
             "exclude_keywords": "",
             "hash_buffer_size": 65536,
+            "hash_workers": 4,
+            "hash_device_workers": 1,
         }
 
     def get_page(self) -> List[dict]:
@@ -1066,6 +1333,13 @@ class smarthardlink(_PluginBase):
             processed_count = history.get("processed_files", 0)
             created_count = history.get("hardlinks_created", 0)
             duration_text = history.get("duration", "N/A")
+            # 旧版本的历史记录没有读取统计
+            if "bytes_read" in history:
+                io_text = f"{self._format_size(history.get('bytes_read', 0))} / {self._format_size(history.get('bytes_skipped', 0))}"
+                if history.get("hash_cache_hits") or history.get("hash_cache_misses"):
+                    io_text += f"（索引命中 {history.get('hash_cache_hit_rate', 0):.0%}）"
+            else:
+                io_text = "N/A"
 
             history_rows.append({
                 'component': 'tr',
@@ -1161,6 +1435,15 @@ class smarthardlink(_PluginBase):
                             {'component': 'span', 'props': {'class': 'text-green-darken-1 font-weight-medium'}, 'text': space_saved_fmt} # Green text
                         ]
                     },
+                    # 读取/跳过读取
+                    {
+                        'component': 'td',
+                        'props': {'class': 'text-caption'},
+                        'content': [
+                            {'component': 'VIcon', 'props': {'icon': 'mdi-harddisk', 'size': 'x-small', 'class': 'mr-1', 'color': 'grey'}},
+                            {'component': 'span', 'text': io_text}
+                        ]
+                    },
                 ]
             })
 
@@ -1315,6 +1598,20 @@ class smarthardlink(_PluginBase):
                                                                 ]
                                                             }
                                                         ]
+                                                    },
+                                                    {
+                                                        'component': 'th',
+                                                        'props': {'class': 'text-caption', 'style': 'white-space: nowrap; padding: 4px 8px;'},
+                                                        'content': [
+                                                            {
+                                                                'component': 'div',
+                                                                'props': {'class': 'd-flex align-center'},
+                                                                'content': [
+                                                                    {'component': 'VIcon', 'props': {'size': '14', 'class': 'mr-1', 'color': 'grey'}, 'text': 'mdi-harddisk'},
+                                                                    {'component': 'span', 'text': '读取/跳过'}
+                                                                ]
+                                                            }
+                                                        ]
                                                     }
                                                     # --- End of modified headers ---
                                                 ]
@@ -0,0 +1,125 @@
+"""
+哈希计算基准测试
+在指定目录中生成临时文件，按不同的线程数配置计算SHA1，比较吞吐量，用于选择哈希线程数和单盘线程数
+
+用法:
+    python -m plugins.smarthardlink.benchmark [--dirs 目录 ...] [--files N] [--size MB]
+                                              [--workers 1,2,4] [--per-device 1,2] [--buffer 字节数] [--keep-cache]
+
+--dirs 指定多个位于不同磁盘的目录时，可以观察跨设备并行的效果；未指定时使用系统临时目录。
+每轮计算前通过 posix_fadvise 丢弃测试文件的页面缓存，使结果反映磁盘读取速度；--keep-cache 时保留缓存，只测试CPU哈希速度。
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from plugins.smarthardlink.hash_pool import HashPool, sha1_file
+
+
+def generate_files(dirs: List[str], files: int, size: int) -> Tuple[List[str], List[Tuple[int, str]]]:
+    """
+    在各目录下轮流生成随机内容的测试文件
+    :param dirs: 目录列表
+    :param files: 每个目录的文件数
+    :param size: 文件大小（字节）
+    :return: (生成的临时目录列表, [(设备号, 文件路径), ...])
+    """
+    work_dirs = [tempfile.mkdtemp(prefix="smarthardlink-bench-", dir=path) for path in dirs]
+    block = os.urandom(min(size, 1024 * 1024))
+    tasks = []
+    for i in range(files):
+        for work_dir in work_dirs:
+            file_path = os.path.join(work_dir, f"{i}.bin")
+            with open(file_path, "wb") as f:
+                written = 0
+                while written < size:
+                    # 每块前写入不同的前缀，避免文件内容完全相同
+                    data = (f"{file_path}:{written}".encode() + block)[:min(len(block), size - written)]
+                    f.write(data)
+                    written += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            tasks.append((os.stat(file_path).st_dev, file_path))
+    return work_dirs, tasks
+
+
+def drop_cache(file_paths: List[str]):
+    """
+    丢弃文件的页面缓存，不支持 posix_fadvise 的系统上不做处理
+    """
+    if not hasattr(os, "posix_fadvise"):
+        return
+    for file_path in file_paths:
+        fd = os.open(file_path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def benchmark_hash(tasks: List[Tuple[int, str]], workers: int, per_device: int,
+                   buffer_size: int, keep_cache: bool = False) -> Dict[str, Any]:
+    """
+    按给定配置计算所有测试文件的SHA1
+    :param tasks: [(设备号, 文件路径), ...]
+    :param workers: 线程总数
+    :param per_device: 每个设备的线程数
+    :param buffer_size: 每次读取的字节数
+    :param keep_cache: 是否保留页面缓存
+    :return: 测试结果
+    """
+    if not keep_cache:
+        drop_cache([file_path for _, file_path in tasks])
+    total_bytes = sum(os.path.getsize(file_path) for _, file_path in tasks)
+    start = time.perf_counter()
+    results = HashPool(workers, per_device).run(tasks, lambda file_path: sha1_file(file_path, buffer_size))
+    elapsed = time.perf_counter() - start
+    return {
+        "workers": workers,
+        "per_device": per_device,
+        "files": len(results),
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "mb_per_sec": round(total_bytes / 1024 / 1024 / max(elapsed, 0.001), 1),
+    }
+
+
+def _parse_counts(value: str) -> List[int]:
+    return [max(int(item), 1) for item in value.split(",") if item.strip()]
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="智能硬链接哈希计算基准测试")
+    parser.add_argument("--dirs", nargs="+", default=[tempfile.gettempdir()],
+                        help="生成测试文件的目录，位于不同磁盘时可测试跨设备并行")
+    parser.add_argument("--files", type=int, default=8, help="每个目录生成的文件数")
+    parser.add_argument("--size", type=int, default=64, help="每个文件的大小（MB）")
+    parser.add_argument("--workers", default="1,2,4", help="要测试的线程总数，逗号分隔")
+    parser.add_argument("--per-device", default="1,2", help="要测试的单盘线程数，逗号分隔")
+    parser.add_argument("--buffer", type=int, default=65536, help="每次读取的字节数")
+    parser.add_argument("--keep-cache", action="store_true", help="不丢弃页面缓存，只测试CPU哈希速度")
+    args = parser.parse_args(argv)
+
+    work_dirs, tasks = generate_files(args.dirs, args.files, args.size * 1024 * 1024)
+    try:
+        devices = len({device for device, _ in tasks})
+        print(f"测试文件 {len(tasks)} 个，每个 {args.size}MB，分布在 {devices} 个设备上")
+        for workers in _parse_counts(args.workers):
+            for per_device in _parse_counts(args.per_device):
+                if per_device > workers:
+                    continue
+                result = benchmark_hash(tasks, workers, per_device, args.buffer, args.keep_cache)
+                print(f"    线程数 {result['workers']:>2}  单盘线程数 {result['per_device']:>2}  "
+                      f"耗时 {result['seconds']:>8}s  速度 {result['mb_per_sec']:>8} MB/s")
+    finally:
+        for work_dir in work_dirs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
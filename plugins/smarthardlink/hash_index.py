@@ -0,0 +1,162 @@
+"""
+持久化哈希索引
+按 (设备号, inode) 保存文件的完整SHA1和部分指纹，文件大小和修改时间未变化时直接复用，避免每次运行重新读取未变化的文件
+"""
+import sqlite3
+import threading
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+# 文件标识：(st_dev, st_ino, st_size, st_mtime_ns)
+FileKey = Tuple[int, int, int, int]
+
+
+class HashIndex:
+    """
+    基于SQLite的哈希索引
+
+    每个 inode 一条记录，大小或修改时间变化即视为失效；本次运行中扫描过的设备上未再出现的记录在关闭时删除。
+    """
+
+    def __init__(self, db_path: str, commit_interval: int = 500):
+        """
+        打开哈希索引
+        :param db_path: 数据库文件路径
+        :param commit_interval: 累计写入多少条后提交一次
+        """
+        self.db_path = db_path
+        self.commit_interval = commit_interval
+        self.hits = 0
+        self.misses = 0
+        self._pending = 0
+        self._devices: Set[int] = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS hashes ("
+            "dev INTEGER NOT NULL, ino INTEGER NOT NULL, size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, "
+            "sha1 TEXT, partial TEXT, partial_scheme TEXT, seen INTEGER NOT NULL, "
+            "PRIMARY KEY (dev, ino))")
+        self._conn.commit()
+        # 运行序号，标记本次运行中出现过的文件
+        self.run_id = self._conn.execute("SELECT COALESCE(MAX(seen), 0) + 1 FROM hashes").fetchone()[0]
+
+    @property
+    def hit_rate(self) -> float:
+        """
+        本次运行的命中率
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def _lookup(self, key: FileKey, column: str, scheme: Optional[str] = None) -> Optional[str]:
+        dev, ino, size, mtime_ns = key
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {column}, partial_scheme FROM hashes WHERE dev=? AND ino=? AND size=? AND mtime_ns=?",
+                (dev, ino, size, mtime_ns)).fetchone()
+            if row and row[0] and (scheme is None or row[1] == scheme):
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def get_full(self, key: FileKey) -> Optional[str]:
+        """
+        获取文件的完整SHA1
+        :param key: 文件标识
+        :return: SHA1，没有记录或文件已变化时返回None
+        """
+        return self._lookup(key, "sha1")
+
+    def get_partial(self, key: FileKey, scheme: str) -> Optional[str]:
+        """
+        获取文件的部分指纹
+        :param key: 文件标识
+        :param scheme: 指纹的采样方式，与保存时不同则视为没有记录
+        :return: 部分指纹，没有记录或文件已变化时返回None
+        """
+        return self._lookup(key, "partial", scheme)
+
+    def _upsert(self, key: FileKey, sha1: Optional[str] = None, partial: Optional[str] = None,
+                scheme: Optional[str] = None):
+        dev, ino, size, mtime_ns = key
+        with self._lock:
+            # 文件变化后旧的哈希值一并作废，未变化时只更新本次提供的字段
+            self._conn.execute(
+                "INSERT INTO hashes (dev, ino, size, mtime_ns, sha1, partial, partial_scheme, seen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(dev, ino) DO UPDATE SET "
+                "sha1 = CASE WHEN size=excluded.size AND mtime_ns=excluded.mtime_ns "
+                "THEN COALESCE(excluded.sha1, sha1) ELSE excluded.sha1 END, "
+                "partial = CASE WHEN size=excluded.size AND mtime_ns=excluded.mtime_ns AND excluded.partial IS NULL "
+                "THEN partial ELSE excluded.partial END, "
+                "partial_scheme = CASE WHEN size=excluded.size AND mtime_ns=excluded.mtime_ns "
+                "AND excluded.partial IS NULL THEN partial_scheme ELSE excluded.partial_scheme END, "
+                "size=excluded.size, mtime_ns=excluded.mtime_ns, seen=excluded.seen",
+                (dev, ino, size, mtime_ns, sha1, partial, scheme, self.run_id))
+            self._pending += 1
+            if self._pending >= self.commit_interval:
+                self._conn.commit()
+                self._pending = 0
+
+    def put_full(self, key: FileKey, sha1: str):
+        """
+        保存文件的完整SHA1
+        :param key: 文件标识
+        :param sha1: SHA1
+        """
+        self._upsert(key, sha1=sha1)
+
+    def put_partial(self, key: FileKey, partial: str, scheme: str):
+        """
+        保存文件的部分指纹
+        :param key: 文件标识
+        :param partial: 部分指纹
+        :param scheme: 指纹的采样方式
+        """
+        self._upsert(key, partial=partial, scheme=scheme)
+
+    def mark_seen(self, keys: Iterable[FileKey]):
+        """
+        标记本次运行中仍然存在的文件，关闭时不会被清理
+        :param keys: 文件标识
+        """
+        rows = []
+        for dev, ino, _, _ in keys:
+            self._devices.add(dev)
+            rows.append((self.run_id, dev, ino))
+        with self._lock:
+            self._conn.executemany("UPDATE hashes SET seen=? WHERE dev=? AND ino=?", rows)
+            self._conn.commit()
+
+    def prune(self) -> int:
+        """
+        删除本次扫描过的设备上已不存在的文件记录，未扫描到的设备（如未挂载的磁盘）保留
+        :return: 删除的记录数
+        """
+        if not self._devices:
+            return 0
+        with self._lock:
+            placeholders = ",".join("?" * len(self._devices))
+            cursor = self._conn.execute(
+                f"DELETE FROM hashes WHERE seen < ? AND dev IN ({placeholders})",
+                (self.run_id, *self._devices))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """
+        获取本次运行的命中统计
+        :return: {"hits": 命中数, "misses": 未命中数}
+        """
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        """
+        提交并关闭数据库
+        """
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
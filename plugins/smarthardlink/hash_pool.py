@@ -0,0 +1,110 @@
+"""
+哈希计算线程池
+按文件所在设备（st_dev）分组调度：不同设备之间并行读取，同一设备内限制并发数，避免机械硬盘因多个线程交替读取而来回寻道
+hashlib 处理较大的数据块时会释放GIL，多个线程可以同时利用多块磁盘和多个CPU核心
+"""
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+def sha1_file(file_path: str, buffer_size: int = 65536,
+              ranges: Optional[Sequence[Tuple[int, int]]] = None,
+              on_read: Optional[Callable[[int], None]] = None) -> str:
+    """
+    计算文件的SHA1
+    :param file_path: 文件路径
+    :param buffer_size: 每次读取的字节数
+    :param ranges: 只读取指定的区域 [(偏移, 长度), ...]，默认读取整个文件
+    :param on_read: 每读取一块数据后以其字节数调用，用于统计读取量，可能在多个线程中同时调用
+    :return: SHA1
+    """
+    hash_sha1 = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for offset, length in ranges or [(0, None)]:
+            f.seek(offset)
+            while length is None or length > 0:
+                data = f.read(buffer_size if length is None else min(length, buffer_size))
+                if not data:
+                    break
+                hash_sha1.update(data)
+                if on_read:
+                    on_read(len(data))
+                if length is not None:
+                    length -= len(data)
+    return hash_sha1.hexdigest()
+
+
+class HashPool:
+    """
+    按设备分组的哈希计算线程池
+
+    - 每个设备的任务放在各自的队列中，按提交顺序执行
+    - 同一设备最多 per_device 个线程同时读取，机械硬盘设为1，SSD/NVMe 可适当增大
+    - 所有设备的线程总数不超过 max_workers，线程不足时每个设备先分到一个线程
+    """
+
+    def __init__(self, max_workers: int = 4, per_device: int = 1, progress_interval: float = 10.0):
+        """
+        初始化线程池
+        :param max_workers: 线程总数上限
+        :param per_device: 每个设备的线程数上限
+        :param progress_interval: 报告进度的间隔（秒）
+        """
+        self.max_workers = max(int(max_workers), 1)
+        self.per_device = max(int(per_device), 1)
+        self.progress_interval = progress_interval
+
+    def run(self, tasks: Iterable[Tuple[int, Any]], func: Callable[[Any], Any],
+            on_progress: Optional[Callable[[int, int], None]] = None) -> List[Tuple[Any, Any]]:
+        """
+        执行任务，全部完成后返回
+        :param tasks: [(设备号, 任务参数), ...]
+        :param func: 任务函数，在工作线程中以任务参数调用，需自行处理预期内的错误；抛出异常时停止剩余任务并在调用线程中重新抛出
+        :param on_progress: 在调用线程中定期以 (已完成任务数, 总任务数) 调用，结束时再调用一次
+        :return: [(任务参数, 任务结果), ...]，按完成顺序
+        """
+        queues: Dict[int, Deque[Any]] = {}
+        for device, item in tasks:
+            queues.setdefault(device, deque()).append(item)
+        total = sum(len(queue) for queue in queues.values())
+        results: List[Tuple[Any, Any]] = []
+        if not total:
+            return results
+
+        results_lock = threading.Lock()
+        stop = threading.Event()
+
+        def worker(queue: Deque[Any]):
+            while not stop.is_set():
+                try:
+                    item = queue.popleft()
+                except IndexError:
+                    return
+                result = func(item)
+                with results_lock:
+                    results.append((item, result))
+
+        # 按轮次为每个设备分配线程，线程总数不足时排在后面的线程等前面的设备完成后再开始
+        slots = [queue for i in range(self.per_device) for queue in queues.values() if len(queue) > i]
+        last_report = time.monotonic()
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(slots)),
+                                thread_name_prefix="smarthardlink-hash") as executor:
+            pending = {executor.submit(worker, queue) for queue in slots}
+            try:
+                while pending:
+                    done, pending = wait(pending, timeout=self.progress_interval, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        future.result()
+                    if on_progress and pending and time.monotonic() - last_report >= self.progress_interval:
+                        last_report = time.monotonic()
+                        on_progress(len(results), total)
+            except BaseException:
+                stop.set()
+                raise
+        if on_progress:
+            on_progress(len(results), total)
+        return results